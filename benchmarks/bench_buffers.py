@@ -0,0 +1,64 @@
+"""Cost of sending large buffers to a child process and back.
+
+Each transport echoes a ``memoryview`` of the given size; ``in-band`` disables
+out-of-band buffers by raising the threshold above the payload size.
+
+Run with ``python benchmarks/bench_buffers.py [size_mib ...]``.
+"""
+
+import multiprocessing
+import statistics
+import sys
+import time
+
+from flexplan.datastructures.processqueue import ProcessQueue
+from flexplan.datastructures.shmqueue import ShmQueue
+
+
+def echo_loop(inbox, outbox):
+    while (item := inbox.get()) is not None:
+        outbox.put(item)
+
+
+def bench(transport: str, oob: bool, size: int, rounds: int = 20):
+    ctx = multiprocessing.get_context("spawn")
+    threshold = 1 << 17 if oob else size + 1
+    if transport == "shm":
+        inbox = ShmQueue(mp_context=ctx, oob_threshold=threshold)
+        outbox = ShmQueue(mp_context=ctx, oob_threshold=threshold)
+    else:
+        inbox = ProcessQueue(mp_context=ctx, oob_threshold=threshold)
+        outbox = ProcessQueue(mp_context=ctx, oob_threshold=threshold)
+    process = ctx.Process(target=echo_loop, args=(inbox, outbox), daemon=True)
+    process.start()
+    payload = memoryview(bytearray(size))
+    inbox.put(b"")
+    outbox.get()
+
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        inbox.put(payload)
+        outbox.get()
+        timings.append(time.perf_counter() - start)
+
+    inbox.put(None)
+    process.join()
+    if transport == "shm":
+        inbox.unlink()
+        outbox.unlink()
+    return statistics.median(timings) * 1e3
+
+
+def main(argv):
+    sizes = [int(arg) for arg in argv] or [1, 16, 64]
+    print(f"{'size MiB':>8} {'transport':>10} {'in-band ms':>11} {'oob ms':>8}")
+    for mib in sizes:
+        for transport in ("process", "shm"):
+            in_band = bench(transport, False, mib << 20)
+            oob = bench(transport, True, mib << 20)
+            print(f"{mib:>8} {transport:>10} {in_band:>11.2f} {oob:>8.2f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
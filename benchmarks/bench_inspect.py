@@ -0,0 +1,60 @@
+"""Cold versus warm resolution of ``get_method_class``.
+
+Run with ``python benchmarks/bench_inspect.py``.
+"""
+
+import sys
+import timeit
+from functools import partial, wraps
+
+from flexplan.utils.inspect import clear_method_class_cache, get_method_class
+
+
+def decorate(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        return fn(*args, **kwargs)
+
+    return wrapper
+
+
+class Target:
+    def method(self): ...
+
+    @decorate
+    def wrapped(self): ...
+
+
+def main(number: int = 100_000):
+    target = Target()
+    cases = {
+        "function": lambda: Target.method,
+        "bound method": lambda: target.method,
+        "partial": lambda: partial(Target.method, target),
+        "wrapped": lambda: Target.wrapped,
+    }
+    print(f"{'callable':>14} {'cold ns':>10} {'warm ns':>10} {'speedup':>8}")
+    for name, make in cases.items():
+        cold = timeit.timeit(
+            "clear(); resolve(make())",
+            globals={
+                "clear": clear_method_class_cache,
+                "resolve": get_method_class,
+                "make": make,
+            },
+            number=number,
+        )
+        warm = timeit.timeit(
+            "resolve(make())",
+            globals={"resolve": get_method_class, "make": make},
+            number=number,
+        )
+        # creating the callable (and clearing the cache for cold runs) is included
+        print(
+            f"{name:>14} {cold / number * 1e9:>10.0f} {warm / number * 1e9:>10.0f} "
+            f"{cold / warm:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,108 @@
+"""Round trip latency and throughput of process station transports.
+
+The ``queue`` rows ping-pong a small message with a child process over a bare
+``multiprocessing.Queue`` pair and a bare :class:`ShmQueue` pair; the ``station``
+rows do the same through a :class:`Workshop` with ``"process"`` and ``"shm"``
+stations.
+
+Run with ``python benchmarks/bench_shm.py [round_trips]``.
+"""
+
+import contextlib
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+
+from flexplan import Worker, Workshop
+from flexplan.datastructures.shmqueue import ShmQueue
+
+MAIL = ("echo", (1,), {})
+
+
+class Echo(Worker):
+    def echo(self, value):
+        return value
+
+
+def echo_loop(inbox, outbox):
+    while (item := inbox.get()) is not None:
+        outbox.put(item)
+
+
+def summarize(kind, transport, latencies, elapsed):
+    latencies.sort()
+    return {
+        "kind": kind,
+        "transport": transport,
+        "latency_p50_us": statistics.median(latencies) * 1e6,
+        "latency_p99_us": latencies[int(len(latencies) * 0.99)] * 1e6,
+        "throughput_per_s": len(latencies) / elapsed,
+    }
+
+
+def bench_queue(transport: str, round_trips: int):
+    ctx = multiprocessing.get_context("spawn")
+    if transport == "shm":
+        inbox, outbox = ShmQueue(mp_context=ctx), ShmQueue(mp_context=ctx)
+    else:
+        inbox, outbox = ctx.Queue(), ctx.Queue()
+    process = ctx.Process(target=echo_loop, args=(inbox, outbox), daemon=True)
+    process.start()
+    inbox.put(MAIL)
+    outbox.get()
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(round_trips):
+        sent = time.perf_counter()
+        inbox.put(MAIL)
+        outbox.get()
+        latencies.append(time.perf_counter() - sent)
+    elapsed = time.perf_counter() - start
+
+    inbox.put(None)
+    process.join()
+    if transport == "shm":
+        inbox.unlink()
+        outbox.unlink()
+    return summarize("queue", transport, latencies, elapsed)
+
+
+def bench_station(station: str, round_trips: int):
+    workshop = Workshop()
+    workshop.register(Echo, station=station)
+    with workshop:
+        workshop.submit(Echo.echo, 0).result()
+        latencies = []
+        start = time.perf_counter()
+        for i in range(round_trips):
+            sent = time.perf_counter()
+            workshop.submit(Echo.echo, i).result()
+            latencies.append(time.perf_counter() - sent)
+        elapsed = time.perf_counter() - start
+    return summarize("station", station, latencies, elapsed)
+
+
+def main(argv):
+    round_trips = int(argv[0]) if argv else 5000
+    results = [
+        bench_queue("mp", round_trips),
+        bench_queue("shm", round_trips),
+    ]
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results.append(bench_station("process", round_trips))
+        results.append(bench_station("shm", round_trips))
+    print(
+        f"{'kind':>8} {'transport':>10} {'p50 us':>10} {'p99 us':>10} {'calls/s':>10}"
+    )
+    for r in results:
+        print(
+            f"{r['kind']:>8} {r['transport']:>10} {r['latency_p50_us']:>10.1f} "
+            f"{r['latency_p99_us']:>10.1f} {r['throughput_per_s']:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,79 @@
+"""Latency of mails with heavy-tailed durations spread over replicas, with and
+without work stealing.
+
+Run with ``python benchmarks/bench_stealing.py [station ...]``.
+"""
+
+import contextlib
+import os
+import random
+import statistics
+import sys
+import time
+
+from flexplan import Worker, Workshop
+
+
+class Sleeper(Worker):
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+def durations(n: int, seed: int = 0):
+    # Pareto distributed, most mails take about a millisecond, a few take up to 200
+    # times as long, 4 ms on average
+    rng = random.Random(seed)
+    return [min(0.001 * rng.paretovariate(1.2), 0.2) for _ in range(n)]
+
+
+def bench(station: str, steal: bool, replicas: int = 4, calls: int = 1000):
+    workshop = Workshop()
+    workshop.register(Sleeper, station=station, replicas=replicas, steal=steal)
+    with workshop:
+        workshop.submit(Sleeper.sleep, 0).result()
+        latencies = []
+
+        def record(sent, _):
+            latencies.append(time.perf_counter() - sent)
+
+        start = time.perf_counter()
+        futures = []
+        for seconds in durations(calls):
+            sent = time.perf_counter()
+            future = workshop.submit(Sleeper.sleep, seconds)
+            future.add_done_callback(lambda f, sent=sent: record(sent, f))
+            futures.append(future)
+            # arrivals keep 4 replicas about 70% busy
+            time.sleep(0.0015)
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "station": station,
+        "steal": steal,
+        "elapsed_s": elapsed,
+        "latency_p50_ms": statistics.median(latencies) * 1e3,
+        "latency_p99_ms": latencies[int(len(latencies) * 0.99)] * 1e3,
+    }
+
+
+def main(argv):
+    stations = argv or ["thread", "process"]
+    results = []
+    for station in stations:
+        for steal in (False, True):
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                results.append(bench(station, steal))
+    print(
+        f"{'station':>8} {'steal':>6} {'elapsed s':>10} {'p50 ms':>10} {'p99 ms':>10}"
+    )
+    for r in results:
+        print(
+            f"{r['station']:>8} {r['steal']!s:>6} {r['elapsed_s']:>10.2f} "
+            f"{r['latency_p50_ms']:>10.2f} {r['latency_p99_ms']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
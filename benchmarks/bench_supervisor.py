@@ -0,0 +1,78 @@
+"""Idle CPU usage and relay latency of the supervisor loop.
+
+Run with ``python benchmarks/bench_supervisor.py [n_stations ...]``.
+"""
+
+import contextlib
+import os
+import statistics
+import sys
+import time
+
+from flexplan import Message, Worker, Workshop
+
+
+def make_workers(n: int):
+    workers = []
+    module = sys.modules[__name__]
+    for i in range(n):
+        name = f"Echo{i}"
+        cls = getattr(module, name, None)
+        if cls is None:
+
+            def echo(self, value):
+                return value
+
+            echo.__qualname__ = f"{name}.echo"
+            cls = type(name, (Worker,), {"echo": echo, "__module__": __name__})
+            cls.__qualname__ = name
+            setattr(module, name, cls)
+        workers.append(cls)
+    return workers
+
+
+def bench(n_stations: int, idle_seconds: float = 2.0, calls: int = 2000):
+    workers = make_workers(n_stations)
+    workshop = Workshop()
+    for worker in workers:
+        workshop.register(worker)
+    with workshop:
+        time.sleep(0.5)
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        time.sleep(idle_seconds)
+        idle_cpu = (time.process_time() - cpu_start) / (
+            time.perf_counter() - wall_start
+        )
+
+        latencies = []
+        for i in range(calls):
+            worker = workers[i % n_stations]
+            start = time.perf_counter()
+            workshop.submit(Message(worker.echo).params(i)).result()
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        "stations": n_stations,
+        "idle_cpu_percent": idle_cpu * 100,
+        "latency_p50_us": statistics.median(latencies) * 1e6,
+        "latency_p99_us": latencies[int(len(latencies) * 0.99)] * 1e6,
+    }
+
+
+def main(argv):
+    sizes = [int(arg) for arg in argv] or [1, 10, 100]
+    results = []
+    for n in sizes:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            results.append(bench(n))
+    print(f"{'stations':>8} {'idle cpu %':>10} {'p50 us':>10} {'p99 us':>10}")
+    for r in results:
+        print(
+            f"{r['stations']:>8} {r['idle_cpu_percent']:>10.1f} "
+            f"{r['latency_p50_us']:>10.1f} {r['latency_p99_us']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
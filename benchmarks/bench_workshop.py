@@ -0,0 +1,247 @@
+"""Latency, throughput, startup time and memory of the workshop, for every
+combination of station and workbench, and for chains of workers passing mails on
+with ``Message.emit``.
+
+Run with ``python benchmarks/bench_workshop.py [--quick] [--only STATION[:WORKBENCH]]
+[--output FILE]``, or ``nox -s benchmark -- [...]``. The results are written as
+JSON (by default to ``benchmarks/results/<commit>.json``) to compare runs across
+commits.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from flexplan import Message, Worker, Workshop
+
+STATIONS = ["thread", "fork", "forkserver", "spawn", "shm", "zmq"]
+WORKBENCHES = ["loop", "concurrent", "asyncloop"]
+
+
+class Echo(Worker):
+    def echo(self, value):
+        return value
+
+
+class Head(Worker):
+    def start(self, sent_ns):
+        Message(Middle.pass_on).params(sent_ns).emit()
+
+
+class Middle(Worker):
+    def pass_on(self, sent_ns):
+        Message(Tail.arrive).params(sent_ns).emit()
+
+
+class Tail(Worker):
+    def __init__(self):
+        super().__init__()
+        self.latencies = []
+
+    def arrive(self, sent_ns):
+        # monotonic clocks are shared by the processes of a host
+        self.latencies.append(time.monotonic_ns() - sent_ns)
+
+    def collect(self):
+        latencies, self.latencies = self.latencies, []
+        return latencies
+
+    def count(self):
+        return len(self.latencies)
+
+
+def percentiles(values):
+    values = sorted(values)
+    return {
+        "mean": statistics.fmean(values),
+        "p50": values[len(values) // 2],
+        "p90": values[int(len(values) * 0.9)],
+        "p99": values[int(len(values) * 0.99)],
+    }
+
+
+def tree_rss():
+    """Get the resident memory of this process and all its descendants in bytes,
+    or ``None`` where ``/proc`` is not available."""
+    try:
+        children = {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as file:
+                    stat = file.read()
+            except OSError:
+                continue
+            # the command name in parentheses may contain spaces
+            ppid = int(stat[stat.rindex(")") + 2 :].split()[1])
+            children.setdefault(ppid, []).append(int(entry))
+        page_size = os.sysconf("SC_PAGE_SIZE")
+        total = 0
+        pending = [os.getpid()]
+        while pending:
+            pid = pending.pop()
+            pending.extend(children.get(pid, ()))
+            try:
+                with open(f"/proc/{pid}/statm") as file:
+                    total += int(file.read().split()[1]) * page_size
+            except OSError:
+                continue
+        return total
+    except OSError:
+        return None
+
+
+def bench(station, workbench, calls, chains):
+    workshop = Workshop()
+    for worker in (Echo, Head, Middle, Tail):
+        workshop.register(worker, station=station, workbench=workbench)
+
+    started = time.perf_counter()
+    with workshop:
+        workshop.submit(Echo.echo, 0).result()
+        startup = time.perf_counter() - started
+
+        latencies = []
+        for i in range(calls):
+            sent = time.perf_counter()
+            workshop.submit(Echo.echo, i).result()
+            latencies.append((time.perf_counter() - sent) * 1e6)
+
+        sent = time.perf_counter()
+        futures = [workshop.submit(Echo.echo, i) for i in range(calls * 5)]
+        for future in futures:
+            future.result()
+        throughput = len(futures) / (time.perf_counter() - sent)
+
+        # chains one at a time, so that they do not queue behind each other
+        for _ in range(chains):
+            workshop.submit(Head.start, time.monotonic_ns()).result()
+            time.sleep(0.002)
+        deadline = time.monotonic() + 30
+        while workshop.submit(Tail.count).result() < chains:
+            if time.monotonic() > deadline:
+                raise TimeoutError("Chains did not arrive")
+            time.sleep(0.01)
+        chain_latencies = [ns / 1e3 for ns in workshop.submit(Tail.collect).result()]
+
+        total = chains * 5
+        sent = time.perf_counter()
+        for _ in range(total):
+            workshop.submit(Head.start, time.monotonic_ns())
+        while workshop.submit(Tail.count).result() < total:
+            time.sleep(0.001)
+        chain_throughput = total / (time.perf_counter() - sent)
+
+        rss = tree_rss()
+    return {
+        "station": station,
+        "workbench": workbench,
+        "startup_s": startup,
+        "latency_us": percentiles(latencies),
+        "throughput_per_s": throughput,
+        "chain_latency_us": percentiles(chain_latencies),
+        "chain_throughput_per_s": chain_throughput,
+        "rss_mb": None if rss is None else rss / 2**20,
+    }
+
+
+def configurations(only):
+    stations = list(STATIONS)
+    try:
+        import zmq  # noqa: F401
+    except ImportError:
+        stations.remove("zmq")
+    configs = [
+        (station, workbench) for station in stations for workbench in WORKBENCHES
+    ]
+    if only:
+        configs = [
+            (station, workbench)
+            for station, workbench in configs
+            if any(
+                station == name and (not bench or workbench == bench)
+                for name, _, bench in (item.partition(":") for item in only)
+            )
+        ]
+    return configs
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--quick", action="store_true", help="fewer calls per run")
+    parser.add_argument(
+        "--only",
+        action="append",
+        default=[],
+        metavar="STATION[:WORKBENCH]",
+        help="run only these configurations",
+    )
+    parser.add_argument("--output", help="JSON file to write the results to")
+    args = parser.parse_args(argv)
+    calls, chains = (200, 50) if args.quick else (2000, 200)
+
+    results = []
+    print(
+        f"{'station':>10} {'workbench':>10} {'start s':>8} {'p50 us':>8} "
+        f"{'p99 us':>8} {'calls/s':>9} {'chain p50':>9} {'chains/s':>9} {'rss MB':>7}"
+    )
+    for station, workbench in configurations(args.only):
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            result = bench(station, workbench, calls, chains)
+        results.append(result)
+        rss = result["rss_mb"]
+        print(
+            f"{station:>10} {workbench:>10} {result['startup_s']:>8.3f} "
+            f"{result['latency_us']['p50']:>8.1f} {result['latency_us']['p99']:>8.1f} "
+            f"{result['throughput_per_s']:>9.0f} "
+            f"{result['chain_latency_us']['p50']:>9.1f} "
+            f"{result['chain_throughput_per_s']:>9.0f} "
+            f"{'-' if rss is None else format(rss, '.1f'):>7}"
+        )
+
+    revision = commit()
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "results",
+        f"{revision[:12] if revision else 'unknown'}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(
+            {
+                "commit": revision,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "time": time.time(),
+                "calls": calls,
+                "chains": chains,
+                "results": results,
+            },
+            file,
+            indent=2,
+        )
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
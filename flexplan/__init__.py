@@ -1,3 +1,4 @@
+from flexplan import hooks
 from flexplan.datastructures.future import Future
 from flexplan.messages.message import Message
 from flexplan.workbench.base import Workbench
@@ -13,4 +14,5 @@ __all__ = (
     "Workbench",
     "Worker",
     "Workshop",
+    "hooks",
 )
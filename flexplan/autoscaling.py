@@ -0,0 +1,178 @@
+import time
+from functools import partial
+from threading import Lock
+
+from typing_extensions import TYPE_CHECKING, Dict, Optional, Sequence, Set, Tuple, final
+
+from flexplan.balancers import Balancer
+
+if TYPE_CHECKING:
+    from flexplan.datastructures.future import Future
+    from flexplan.stations.base import Station
+
+__all__ = (
+    "AutoscalePolicy",
+    "Autoscaler",
+)
+
+
+@final
+class AutoscalePolicy:
+    """When to add replicas of a worker and when to remove them.
+
+    The load of a worker is the mean number of mails queued or in flight per
+    replica. A replica is added when the load exceeds ``scale_up_load``, or the
+    smoothed latency of calls exceeds ``scale_up_latency`` seconds, and removed
+    when the load drops below ``scale_down_load``. Scaling up waits
+    ``scale_up_cooldown`` seconds after the last change, scaling down
+    ``scale_down_cooldown`` seconds. The load is checked every ``interval``
+    seconds.
+    """
+
+    __slots__ = (
+        "min_replicas",
+        "max_replicas",
+        "scale_up_load",
+        "scale_up_latency",
+        "scale_down_load",
+        "scale_up_cooldown",
+        "scale_down_cooldown",
+        "interval",
+    )
+
+    def __init__(
+        self,
+        *,
+        min_replicas: int = 1,
+        max_replicas: int,
+        scale_up_load: float = 4.0,
+        scale_up_latency: Optional[float] = None,
+        scale_down_load: float = 0.5,
+        scale_up_cooldown: float = 5.0,
+        scale_down_cooldown: float = 60.0,
+        interval: float = 0.5,
+    ):
+        if min_replicas < 1:
+            raise ValueError("min_replicas must be >= 1")
+        if max_replicas < min_replicas:
+            raise ValueError("max_replicas must be >= min_replicas")
+        if scale_down_load >= scale_up_load:
+            raise ValueError("scale_down_load must be below scale_up_load")
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self.min_replicas = min_replicas
+        self.max_replicas = max_replicas
+        self.scale_up_load = scale_up_load
+        self.scale_up_latency = scale_up_latency
+        self.scale_down_load = scale_down_load
+        self.scale_up_cooldown = scale_up_cooldown
+        self.scale_down_cooldown = scale_down_cooldown
+        self.interval = interval
+
+
+class Autoscaler(Balancer):
+    """A balancer which measures the load of the replicas it spreads mails over
+    and tells the supervisor how many of them to run.
+
+    Selection is left to the wrapped ``balancer``.
+    """
+
+    # weight of the latest call in the smoothed latency
+    latency_smoothing: float = 0.2
+
+    def __init__(self, balancer: Balancer, policy: AutoscalePolicy) -> None:
+        super().__init__()
+        self._balancer = balancer
+        self._policy = policy
+        self._lock = Lock()
+        self._outstanding: "Dict[Station, int]" = {}
+        self._stolen: "Set[Tuple[Station, Future]]" = set()
+        self._latency: Optional[float] = None
+        self._last_change = time.monotonic()
+
+    @property
+    def policy(self) -> AutoscalePolicy:
+        return self._policy
+
+    def bind(self, stations: "Sequence[Station]") -> None:
+        super().bind(stations)
+        self._balancer.bind(stations)
+        self._last_change = time.monotonic()
+
+    def select(self) -> "Station":
+        return self._balancer.select()
+
+    def on_sent(self, station: "Station", future: "Optional[Future]") -> None:
+        self._balancer.on_sent(station, future)
+        if future is None:
+            return
+        with self._lock:
+            self._outstanding[station] = self._outstanding.get(station, 0) + 1
+        future.add_done_callback(partial(self._on_done, station, time.monotonic()))
+
+    def on_stolen(self, station: "Station", future: "Optional[Future]") -> None:
+        self._balancer.on_stolen(station, future)
+        if future is None:
+            return
+        with self._lock:
+            if station in self._outstanding and not future.done():
+                self._outstanding[station] -= 1
+                self._stolen.add((station, future))
+
+    def _on_done(self, station: "Station", sent: float, future: "Future") -> None:
+        latency = time.monotonic() - sent
+        with self._lock:
+            if self._stolen and (station, future) in self._stolen:
+                # counted, and timed, for the replica which took it
+                self._stolen.remove((station, future))
+                return
+            if station in self._outstanding:
+                self._outstanding[station] -= 1
+            if self._latency is None:
+                self._latency = latency
+            else:
+                self._latency += self.latency_smoothing * (latency - self._latency)
+
+    def outstanding(self, station: "Station") -> int:
+        """Get the number of futures of ``station`` not completed yet."""
+        return self._outstanding.get(station, 0)
+
+    def load(self) -> float:
+        stations = self._stations
+        if not stations:
+            return 0.0
+        total = sum(
+            max(station.inbox_depth(), self.outstanding(station))
+            for station in stations
+        )
+        return total / len(stations)
+
+    def decide(self, now: Optional[float] = None) -> int:
+        """Get ``1`` to add a replica, ``-1`` to remove one, or ``0``."""
+        policy = self._policy
+        if now is None:
+            now = time.monotonic()
+        replicas = len(self._stations)
+        load = self.load()
+        elapsed = now - self._last_change
+        latency = self._latency
+        if replicas < policy.max_replicas and elapsed >= policy.scale_up_cooldown:
+            if load > policy.scale_up_load or (
+                policy.scale_up_latency is not None
+                and latency is not None
+                and latency > policy.scale_up_latency
+                and load >= 1
+            ):
+                return 1
+        if (
+            replicas > policy.min_replicas
+            and elapsed >= policy.scale_down_cooldown
+            and load < policy.scale_down_load
+        ):
+            return -1
+        return 0
+
+    def forget(self, station: "Station") -> None:
+        """Stop counting futures of a replica which has been stopped."""
+        with self._lock:
+            self._outstanding.pop(station, None)
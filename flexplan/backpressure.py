@@ -0,0 +1,80 @@
+import asyncio
+from threading import Event, Lock
+
+from typing_extensions import List, Literal, Tuple, final, get_args
+
+__all__ = (
+    "Gate",
+    "InboxLimit",
+    "Overflow",
+)
+
+Overflow = Literal["block", "fail", "drop_oldest", "drop_newest"]
+_OVERFLOWS: Tuple[str, ...] = get_args(Overflow)
+
+
+@final
+class InboxLimit:
+    """How many mails may wait in the inbox of each replica of a worker, and what
+    becomes of a mail sent to a full one:
+
+    ``"block"``: the supervisor holds the mail back until there is room, and calls
+    to the worker block in :meth:`Workshop.submit` from then on (calls submitted
+    before the supervisor got to it are held back as well).
+    ``"fail"``: the future of the mail fails with :class:`InboxFullError`.
+    ``"drop_oldest"``: the oldest mail of the lowest priority in the inbox makes
+    room and its future is cancelled; stations which cannot give mails back (see
+    :meth:`Station.steal`) drop the new mail instead.
+    ``"drop_newest"``: the future of the new mail is cancelled.
+
+    Only stations which can tell the depth of their inbox are limited.
+    """
+
+    __slots__ = ("max_inbox", "overflow")
+
+    def __init__(self, max_inbox: int, overflow: Overflow = "block"):
+        if not isinstance(max_inbox, int) or max_inbox < 1:
+            raise ValueError("max_inbox must be a positive integer")
+        if overflow not in _OVERFLOWS:
+            raise ValueError(f"Unexpected overflow: {overflow!r}")
+        self.max_inbox = max_inbox
+        self.overflow = overflow
+
+
+def _wake(waiter: "asyncio.Future[None]") -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+@final
+class Gate(Event):
+    """An event which keeps calls to a worker waiting while it is clear, and which
+    event loops can await without blocking (see :meth:`wait_async`)."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._waiters: "List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]" = []
+        self._waiters_lock = Lock()
+
+    def set(self) -> None:
+        super().set()
+        with self._waiters_lock:
+            waiters, self._waiters = self._waiters, []
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                # the loop has been closed
+                pass
+
+    async def wait_async(self) -> None:
+        """Wait until the gate is set, in the running event loop."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._waiters_lock:
+                # checked under the lock, so that set() cannot slip in between
+                if self.is_set():
+                    return
+                waiter: "asyncio.Future[None]" = loop.create_future()
+                self._waiters.append((loop, waiter))
+            await waiter
@@ -0,0 +1,152 @@
+import random
+from abc import ABC, abstractmethod
+from functools import partial
+from threading import Lock
+
+from typing_extensions import (
+    TYPE_CHECKING,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+)
+
+if TYPE_CHECKING:
+    from flexplan.datastructures.future import Future
+    from flexplan.stations.base import Station
+
+__all__ = (
+    "Balancer",
+    "LeastOutstandingBalancer",
+    "PowerOfTwoBalancer",
+    "RoundRobinBalancer",
+    "balancer_specs",
+)
+
+
+class Balancer(ABC):
+    """Chooses which replica of a worker takes the next mail.
+
+    The supervisor binds the stations running the replicas with :meth:`bind`
+    (again whenever they change), asks :meth:`select` for the station of every
+    mail and reports each mail sent with :meth:`on_sent`, and each mail taken
+    back out of an inbox to go to another replica with :meth:`on_stolen`.
+    """
+
+    def __init__(self) -> None:
+        self._stations: "List[Station]" = []
+
+    def bind(self, stations: "Sequence[Station]") -> None:
+        self._stations = list(stations)
+
+    @property
+    def stations(self) -> "List[Station]":
+        return self._stations
+
+    @abstractmethod
+    def select(self) -> "Station": ...
+
+    def on_sent(self, station: "Station", future: "Optional[Future]") -> None:
+        """Called once a mail has been sent to ``station``, with the future the
+        caller waits on, if any."""
+
+    def on_stolen(self, station: "Station", future: "Optional[Future]") -> None:
+        """Called once a mail sent to ``station`` has been taken out of its inbox
+        again; :meth:`on_sent` follows for the replica it is sent to instead."""
+
+
+class RoundRobinBalancer(Balancer):
+    """Hand mails to the replicas in turn."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._next = 0
+
+    def select(self) -> "Station":
+        stations = self._stations
+        index = self._next
+        if index >= len(stations):
+            index = 0
+        self._next = index + 1
+        return stations[index]
+
+
+class LeastOutstandingBalancer(Balancer):
+    """Hand mails to the replica with the fewest futures not completed yet.
+
+    Mails sent without a future are not counted.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._outstanding: "Dict[Station, int]" = {}
+        # futures counted for another replica than the one they were sent to first
+        self._stolen: "Set[Tuple[Station, Future]]" = set()
+        # futures of thread stations complete in the threads of their workers
+        self._lock = Lock()
+
+    def bind(self, stations: "Sequence[Station]") -> None:
+        super().bind(stations)
+        with self._lock:
+            self._outstanding = {
+                station: self._outstanding.get(station, 0) for station in stations
+            }
+
+    def select(self) -> "Station":
+        outstanding = self._outstanding
+        return min(self._stations, key=lambda station: outstanding.get(station, 0))
+
+    def on_sent(self, station: "Station", future: "Optional[Future]") -> None:
+        if future is None:
+            return
+        with self._lock:
+            if station not in self._outstanding:
+                return
+            self._outstanding[station] += 1
+        future.add_done_callback(partial(self._on_done, station))
+
+    def on_stolen(self, station: "Station", future: "Optional[Future]") -> None:
+        if future is None:
+            return
+        with self._lock:
+            if station in self._outstanding and not future.done():
+                self._outstanding[station] -= 1
+                self._stolen.add((station, future))
+
+    def _on_done(self, station: "Station", future: "Future") -> None:
+        with self._lock:
+            if self._stolen and (station, future) in self._stolen:
+                self._stolen.remove((station, future))
+            elif station in self._outstanding:
+                self._outstanding[station] -= 1
+
+
+class PowerOfTwoBalancer(Balancer):
+    """Pick two replicas at random and hand the mail to the one whose inbox holds
+    fewer mails (see :meth:`Station.inbox_depth`)."""
+
+    def __init__(self, seed: Optional[int] = None) -> None:
+        super().__init__()
+        self._random = random.Random(seed)
+
+    def select(self) -> "Station":
+        stations = self._stations
+        n = len(stations)
+        if n == 1:
+            return stations[0]
+        first = self._random.randrange(n)
+        second = self._random.randrange(n - 1)
+        if second >= first:
+            second += 1
+        a, b = stations[first], stations[second]
+        return a if a.inbox_depth() <= b.inbox_depth() else b
+
+
+balancer_specs: "Dict[str, Type[Balancer]]" = {
+    "round_robin": RoundRobinBalancer,
+    "least_outstanding": LeastOutstandingBalancer,
+    "power_of_two": PowerOfTwoBalancer,
+}
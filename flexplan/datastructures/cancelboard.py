@@ -0,0 +1,37 @@
+from multiprocessing import get_context
+
+from typing_extensions import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from flexplan.stations.process import AnyContext
+
+__all__ = ("CancelBoard",)
+
+
+class CancelBoard:
+    """Correlation IDs of cancelled futures, in shared memory read by a worker
+    process.
+
+    Cancelling writes the ID into the slot it maps to, checking reads the slot
+    back, so neither side takes a lock or makes a system call. A later cancel may
+    overwrite an earlier one whose mail has not been looked at yet, in which case
+    that mail is run after all; a mail which has not been cancelled is never
+    reported as such.
+    """
+
+    def __init__(
+        self,
+        size: int = 4096,
+        *,
+        mp_context: "Optional[AnyContext]" = None,
+    ) -> None:
+        mp_ctx = get_context("spawn") if mp_context is None else mp_context
+        self._size = size
+        # IDs are stored plus one, as the slots start out as zeros
+        self._slots = mp_ctx.RawArray("q", size)
+
+    def cancel(self, correlation_id: int) -> None:
+        self._slots[correlation_id % self._size] = correlation_id + 1
+
+    def is_cancelled(self, correlation_id: int) -> bool:
+        return self._slots[correlation_id % self._size] == correlation_id + 1
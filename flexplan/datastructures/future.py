@@ -1,18 +1,11 @@
+import asyncio
+from collections import deque
 from concurrent.futures import Future as BuiltinFuture
-from concurrent.futures._base import _STATE_TO_DESCRIPTION_MAP, FINISHED
-from multiprocessing.managers import SyncManager
-
-from typing_extensions import (
-    Any,
-    Callable,
-    Dict,
-    Generic,
-    List,
-    Optional,
-    Tuple,
-    Type,
-    TypeVar,
-)
+from functools import partial
+from threading import Lock
+from weakref import WeakKeyDictionary
+
+from typing_extensions import Any, Deque, Generator, Generic, Optional, Tuple, TypeVar
 
 T = TypeVar("T")
 
@@ -22,153 +15,79 @@ class Future(BuiltinFuture, Generic[T]):
         return super().result(timeout=timeout)
 
     def get_state(self) -> str:
-        """Get future internal state.
-
-        This is only for convenience to get the state when ``Future`` is registered in
-        a :class:`multiprocessing.Manager`.
-        """
+        """Get future internal state."""
         return self._state  # type: ignore
 
+    def __await__(self) -> Generator[Any, None, T]:
+        """Wait for the future from a coroutine, without blocking a thread.
 
-def _proxy_impl(
-    method,
-    method_name: str,
-    class_name: str,
-    module_name: str,
-    invoke_callback: bool,
-):
-    from flexplan.utils.pickle import get_pickle
-
-    _pickle = get_pickle()
-
-    if method_name == "set_result":
-
-        def wrapped(self: "FutureProxy", result: Any):  # type: ignore
-            self._future.set_result(_pickle.dumps(result))
-            self._invoke_callbacks()  # type: ignore
-
-    elif method_name == "result":
-
-        def wrapped(  # type: ignore
-            self: "FutureProxy",
-            timeout: Optional[float] = None,
-        ):
-            try:
-                if self._simple:
-                    return self._future.result(timeout=timeout)
-                else:
-                    raw = self._future.result(timeout=timeout)
-                    return _pickle.loads(raw)
-            finally:
-                self = None  # type: ignore
-
-    elif invoke_callback:
-
-        def wrapped(self: "FutureProxy", *args, **kwargs):  # type: ignore
-            res = getattr(self._future, method_name)(*args, **kwargs)
-            self._invoke_callbacks()  # type: ignore
-            return res
-
-    else:
-
-        def wrapped(self: "FutureProxy", *args, **kwargs):  # type: ignore
-            return getattr(self._future, method_name)(*args, **kwargs)
-
-    setattr(wrapped, "__module__", module_name)
-    setattr(wrapped, "__name__", method_name)
-    setattr(wrapped, "__qualname__", f"{class_name}.{method_name}")
-    for attr in ("__doc__", "__annotations__"):
+        Cancelling the awaiting task cancels the future as well.
+        """
+        loop = asyncio.get_running_loop()
+        return _get_loop_notifier(loop).watch(self).__await__()
+
+
+class _LoopNotifier:
+    """Completes the asyncio counterparts of futures awaited in one event loop.
+
+    Futures completed by other threads are collected and handed over to the loop
+    with a single ``call_soon_threadsafe`` per burst, rather than one wakeup each.
+    """
+
+    __slots__ = ("_loop", "_lock", "_completed", "_scheduled")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._lock = Lock()
+        self._completed: "Deque[Tuple[asyncio.Future, BuiltinFuture]]" = deque()
+        self._scheduled = False
+
+    def watch(self, future: BuiltinFuture) -> asyncio.Future:
+        waiter = self._loop.create_future()
+        waiter.add_done_callback(partial(self._on_waiter_done, future))
+        future.add_done_callback(partial(self._on_done, waiter))
+        return waiter
+
+    @staticmethod
+    def _on_waiter_done(future: BuiltinFuture, waiter: asyncio.Future) -> None:
+        if waiter.cancelled():
+            future.cancel()
+
+    def _on_done(self, waiter: asyncio.Future, future: BuiltinFuture) -> None:
+        with self._lock:
+            self._completed.append((waiter, future))
+            if self._scheduled:
+                return
+            self._scheduled = True
         try:
-            value = getattr(method, attr)
-        except AttributeError:
+            self._loop.call_soon_threadsafe(self._flush)
+        except RuntimeError:
+            # the loop is closed, nobody awaits anymore
             pass
-        else:
-            setattr(wrapped, attr, value)
-    getattr(wrapped, "__dict__").update(getattr(method, "__dict__", {}))
-    return wrapped
-
-
-class FutureProxyMeta(type):
-    def __new__(
-        cls,
-        name: str,
-        bases: Tuple[Type, ...],
-        namespace: Dict[str, Any],
-        **kwargs,
-    ):
-        class_name = namespace["__qualname__"]
-        module_name = namespace["__module__"]
-        for attr_name, attr, invoke_callback in [
-            ("cancel", Future.cancel, True),
-            ("cancelled", Future.cancelled, False),
-            ("running", Future.running, False),
-            ("done", Future.done, False),
-            ("result", Future.result, False),
-            ("exception", Future.exception, False),
-            ("get_state", Future.get_state, False),
-            (
-                "set_running_or_notify_cancel",
-                Future.set_running_or_notify_cancel,
-                False,
-            ),
-            ("set_result", Future.set_result, True),
-            ("set_exception", Future.set_exception, True),
-        ]:
-            namespace[attr_name] = _proxy_impl(
-                method=attr,
-                method_name=attr_name,
-                class_name=class_name,
-                module_name=module_name,
-                invoke_callback=invoke_callback,
-            )
-
-        return super().__new__(cls, name, bases, namespace, **kwargs)
-
-
-class FutureProxy(Future, metaclass=FutureProxyMeta):
-    def __init__(self, future: BuiltinFuture) -> None:
-        self._future = future
-        self._simple = isinstance(future, BuiltinFuture)
-        self._done_callbacks: List[Callable[["FutureProxy"], Any]] = []
-
-    def __repr__(self) -> str:
-        # reimplement to avoid calling self._condition and self._state
-        state = self.get_state()
-        if state == FINISHED:
-            try:
-                res = self.result()
-                return (
-                    f"<{self.__class__.__name__} at "
-                    f"{id(self):#x} state={_STATE_TO_DESCRIPTION_MAP[state]} "
-                    f"returned {res.__class__.__name__}>"
-                )
-            except Exception as exc:
-                return (
-                    f"<{self.__class__.__name__} at "
-                    f"{id(self):#x} state={_STATE_TO_DESCRIPTION_MAP[state]} "
-                    f"raised {exc.__class__.__name__}>"
-                )
-        return (
-            f"<{self.__class__.__name__} at "
-            f"{id(self):#x} state={_STATE_TO_DESCRIPTION_MAP[state]} "
-        )
-
-    def add_done_callback(self, fn):
-        if not self.done():
-            self._done_callbacks.append(fn)
-            return
-        try:
-            fn(self)
-        except Exception:
-            print("exception calling callback for %r", self)
-
-    def unwrap(self) -> BuiltinFuture:
-        return self._future
 
-
-class ProcessFutureManager(SyncManager):
-    def Future(self) -> FutureProxy:
-        raise NotImplementedError()
+    def _flush(self) -> None:
+        with self._lock:
+            completed, self._completed = self._completed, deque()
+            self._scheduled = False
+        for waiter, future in completed:
+            if waiter.done():
+                continue
+            if future.cancelled():
+                waiter.cancel()
+            elif (exc := future.exception()) is not None:
+                waiter.set_exception(exc)
+            else:
+                waiter.set_result(future.result())
+
+
+_loop_notifiers: "WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopNotifier]" = (
+    WeakKeyDictionary()
+)
 
 
-ProcessFutureManager.register("Future", Future)
+def _get_loop_notifier(loop: asyncio.AbstractEventLoop) -> _LoopNotifier:
+    # only called from the loop's own thread
+    notifier = _loop_notifiers.get(loop)
+    if notifier is None:
+        notifier = _loop_notifiers[loop] = _LoopNotifier(loop)
+    return notifier
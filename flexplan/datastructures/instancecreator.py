@@ -15,6 +15,8 @@ from typing_extensions import (
     overload,
 )
 
+from flexplan.hooks import INSTANCE_CREATED
+
 T = TypeVar("T")
 T_cov = TypeVar("T_cov", covariant=True)
 
@@ -85,7 +87,7 @@ class InstanceCreator(Creator[T]):
         return self._kwargs
 
     def create(self) -> T:
-        print(f"Create {self._creator}, {self.args}, {self.kwargs}")
         instance = self._creator(*self.args, **self.kwargs)  # type: ignore
-        print(f"Created {instance}")
+        if INSTANCE_CREATED:
+            INSTANCE_CREATED.fire(self, instance)
         return instance
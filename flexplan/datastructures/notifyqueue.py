@@ -0,0 +1,106 @@
+import socket
+from queue import Empty, Queue
+
+from typing_extensions import Any, Optional, Protocol
+
+from flexplan.datastructures.prioritylevels import PriorityLevels
+
+
+class Selectable(Protocol):
+    def fileno(self) -> int: ...
+
+
+class Doorbell:
+    """A selectable wakeup flag backed by a socket pair.
+
+    Ringing a doorbell that has already been rung (and not yet cleared) costs a
+    single attribute check, so producers can ring it for every item they push
+    without flooding the socket.
+    """
+
+    __slots__ = ("_rsock", "_wsock", "_pending")
+
+    def __init__(self) -> None:
+        self._rsock, self._wsock = socket.socketpair()
+        self._rsock.setblocking(False)
+        self._wsock.setblocking(False)
+        self._pending = False
+
+    def fileno(self) -> int:
+        return self._rsock.fileno()
+
+    def ring(self) -> None:
+        if self._pending:
+            return
+        self._pending = True
+        try:
+            self._wsock.send(b"\0")
+        except OSError:
+            # a full buffer is already readable, a closed one has no listener
+            pass
+
+    def clear(self) -> None:
+        # drain before resetting the flag, so that a ring racing with clear either
+        # sees the flag still set (and its item is picked up by the consumer which
+        # drains after clearing) or writes a fresh byte
+        try:
+            while self._rsock.recv(4096):
+                pass
+        except OSError:
+            pass
+        self._pending = False
+
+    def close(self) -> None:
+        self._rsock.close()
+        self._wsock.close()
+
+    def __del__(self) -> None:
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class NotifyQueue(Queue):
+    """A :class:`queue.Queue` that can be waited on with :mod:`selectors`.
+
+    The underlying :class:`Doorbell` is only created on the first call to
+    :meth:`fileno`, so queues nobody selects on never pay for it. Consumers which
+    use the file descriptor must call :meth:`acknowledge` before draining the queue
+    with non-blocking gets.
+    """
+
+    def __init__(self, maxsize: int = 0) -> None:
+        super().__init__(maxsize)
+        self._doorbell: Optional[Doorbell] = None
+
+    def fileno(self) -> int:
+        if self._doorbell is None:
+            self._doorbell = Doorbell()
+        return self._doorbell.fileno()
+
+    def acknowledge(self) -> None:
+        if self._doorbell is not None:
+            self._doorbell.clear()
+
+    def _put(self, item: Any) -> None:
+        super()._put(item)
+        if self._doorbell is not None:
+            self._doorbell.ring()
+
+
+class PriorityNotifyQueue(NotifyQueue):
+    """A :class:`NotifyQueue` which hands out items of higher ``priority`` first,
+    and items of the same priority in order (see :class:`PriorityLevels`)."""
+
+    def _init(self, maxsize: int) -> None:
+        self.queue = PriorityLevels()  # type: ignore[assignment]
+
+    def take_nowait(self) -> Any:
+        """Take the oldest item of the lowest priority, rather than the next one."""
+        with self.not_empty:
+            if not self._qsize():
+                raise Empty
+            item = self.queue.popleft_lowest()  # type: ignore[attr-defined]
+            self.not_full.notify()
+            return item
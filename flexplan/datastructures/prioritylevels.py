@@ -0,0 +1,50 @@
+from collections import deque
+
+from typing_extensions import Any, Deque, Dict, List
+
+__all__ = ("PriorityLevels",)
+
+
+class PriorityLevels:
+    """First-in-first-out queues, one per priority, which hand out items of the
+    highest priority first.
+
+    The priority of an item is its ``priority`` attribute, or ``0`` if it has none.
+    """
+
+    __slots__ = ("_levels", "_order", "_size")
+
+    def __init__(self) -> None:
+        self._levels: Dict[int, Deque[Any]] = {}
+        # levels are kept once created, there are usually only a few of them
+        self._order: List[Deque[Any]] = []
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, item: Any) -> None:
+        priority = getattr(item, "priority", 0)
+        if (level := self._levels.get(priority)) is None:
+            level = self._levels[priority] = deque()
+            self._order = [
+                self._levels[key] for key in sorted(self._levels, reverse=True)
+            ]
+        level.append(item)
+        self._size += 1
+
+    def popleft(self) -> Any:
+        for level in self._order:
+            if level:
+                self._size -= 1
+                return level.popleft()
+        raise IndexError("pop from empty PriorityLevels")
+
+    def popleft_lowest(self) -> Any:
+        """Pop the oldest item of the lowest priority, one of those handed out
+        last."""
+        for level in reversed(self._order):
+            if level:
+                self._size -= 1
+                return level.popleft()
+        raise IndexError("pop from empty PriorityLevels")
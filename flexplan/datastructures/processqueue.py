@@ -0,0 +1,103 @@
+from multiprocessing import get_context
+from queue import Empty
+
+from typing_extensions import TYPE_CHECKING, Any, Optional
+
+from flexplan.datastructures.prioritylevels import PriorityLevels
+from flexplan.utils import buffers
+
+if TYPE_CHECKING:
+    from flexplan.stations.process import AnyContext
+
+
+class ProcessQueue:
+    """A ``multiprocessing.Queue`` which pickles items with :mod:`flexplan.utils.buffers`.
+
+    Items are pickled in the calling thread rather than in the feeder thread, so
+    errors surface from :meth:`put`, and large buffers travel out of band through
+    shared memory instead of through the pipe.
+    """
+
+    def __init__(
+        self,
+        *,
+        mp_context: "Optional[AnyContext]" = None,
+        oob_threshold: int = buffers.OOB_THRESHOLD,
+    ) -> None:
+        mp_ctx = get_context("spawn") if mp_context is None else mp_context
+        self._queue = mp_ctx.Queue()
+        self._oob_threshold = oob_threshold
+
+    def fileno(self) -> int:
+        # the read end of the pipe behind the queue
+        return self._queue._reader.fileno()  # type: ignore[attr-defined]
+
+    def put(
+        self,
+        obj: Any,
+        block: bool = True,
+        timeout: Optional[float] = None,
+    ) -> None:
+        self._queue.put(buffers.dumps(obj, self._oob_threshold), block, timeout)
+
+    def put_nowait(self, obj: Any) -> None:
+        self.put(obj, block=False)
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
+        return buffers.loads(self._queue.get(block, timeout))
+
+    def get_nowait(self) -> Any:
+        return self.get(block=False)
+
+    def empty(self) -> bool:
+        return self._queue.empty()
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+
+class PriorityProcessQueue(ProcessQueue):
+    """A :class:`ProcessQueue` whose consumer gets items of higher ``priority``
+    first, and items of the same priority in order.
+
+    The pipe itself is first-in-first-out, so on every :meth:`get` the consumer
+    moves whatever has arrived into :class:`PriorityLevels` of its own. Items moved
+    aside still count towards :meth:`qsize`, but only the consumer can get them;
+    other processes take the oldest item left in the pipe with :meth:`take_nowait`.
+    """
+
+    def __init__(
+        self,
+        *,
+        mp_context: "Optional[AnyContext]" = None,
+        oob_threshold: int = buffers.OOB_THRESHOLD,
+    ) -> None:
+        super().__init__(mp_context=mp_context, oob_threshold=oob_threshold)
+        mp_ctx = get_context("spawn") if mp_context is None else mp_context
+        # written by the consumer only
+        self._moved_aside = mp_ctx.RawValue("q", 0)
+        self._levels = PriorityLevels()
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
+        levels = self._levels
+        if not levels:
+            levels.append(super().get(block, timeout))
+        # whatever else has arrived meanwhile competes on priority
+        while True:
+            try:
+                levels.append(super().get(False))
+            except Empty:
+                break
+        item = levels.popleft()
+        self._moved_aside.value = len(levels)
+        return item
+
+    def take_nowait(self) -> Any:
+        """Take the oldest item left in the pipe, from any process."""
+        return super().get(False)
+
+    def empty(self) -> bool:
+        return not self._moved_aside.value and super().empty()
+
+    def qsize(self) -> int:
+        return super().qsize() + self._moved_aside.value
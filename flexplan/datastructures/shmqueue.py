@@ -0,0 +1,322 @@
+import os
+import sys
+import threading
+import time
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from queue import Empty, Full
+from select import select
+
+from typing_extensions import TYPE_CHECKING, Any, Callable, List, Optional
+
+from flexplan.utils import buffers
+
+if TYPE_CHECKING:
+    from flexplan.stations.process import AnyContext
+
+# header slots, in units of 8 bytes; the producer and consumer counters live on
+# separate cache lines so that the two sides do not invalidate each other
+_HEAD = 0
+_SENT = 1
+_TAIL = 8
+_RECEIVED = 9
+_WAITING = 16
+_HEADER_SIZE = 24 * 8
+
+_CHUNK_PREFIX = 4
+_MORE_CHUNKS = 1 << 31
+
+_NOTHING = object()
+
+# spinning only pays off when the peer can run on another core meanwhile
+DEFAULT_SPIN_TIME = 0.0 if (os.cpu_count() or 1) < 2 else 50e-6
+
+
+class ShmQueue:
+    """A single-producer, single-consumer queue over a shared memory ring buffer.
+
+    Items are pickled into length-prefixed chunks that are appended to a byte
+    ring; items larger than half of the ring are split into several chunks, while
+    buffers of ``oob_threshold`` bytes or more bypass the ring altogether (see
+    :mod:`flexplan.utils.buffers`). The
+    producer publishes a chunk by advancing ``head`` and the consumer releases it
+    by advancing ``tail``, so no lock is shared between processes.
+
+    A pipe serves as the doorbell. A consumer that finds the ring empty raises the
+    ``waiting`` flag before it sleeps, and only then does the producer write to the
+    pipe, which keeps the common case free of system calls. The read end of the
+    pipe can be registered with :mod:`selectors` through :meth:`fileno`.
+
+    Several threads of the producing (or consuming) process may use the queue,
+    they are serialized by process-local locks. When the ring is full, the
+    producer backs off and calls ``on_full`` (if given), which lets it drain the
+    opposite direction instead of deadlocking with a peer blocked on it.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1 << 20,
+        *,
+        mp_context: "Optional[AnyContext]" = None,
+        on_full: Optional[Callable[[], None]] = None,
+        spin_time: float = DEFAULT_SPIN_TIME,
+        oob_threshold: int = buffers.OOB_THRESHOLD,
+    ) -> None:
+        if capacity < 4096:
+            raise ValueError("capacity must be >= 4096")
+        mp_ctx = get_context("spawn") if mp_context is None else mp_context
+        self._shm = SharedMemory(create=True, size=_HEADER_SIZE + capacity)
+        self._owner = True
+        self._capacity = capacity
+        self._reader, self._writer = mp_ctx.Pipe(duplex=False)
+        self._spin_time = spin_time
+        self._oob_threshold = oob_threshold
+        self.on_full = on_full
+        self._setup()
+
+    def _setup(self) -> None:
+        buf = self._shm.buf
+        assert buf is not None
+        self._header = buf[:_HEADER_SIZE].cast("Q")
+        self._data = buf[_HEADER_SIZE : _HEADER_SIZE + self._capacity]
+        self._max_chunk = self._capacity // 2 - _CHUNK_PREFIX
+        self._put_lock = threading.Lock()
+        self._get_lock = threading.Lock()
+        # acquiring and releasing a lock is a full memory barrier
+        self._fence = threading.Lock()
+        self._partial: List[bytes] = []
+        self._closed = False
+        if sys.platform != "win32":
+            # the doorbell carries no data, so its pipe is used at the fd level
+            self._reader_fd = self._reader.fileno()
+            self._writer_fd = self._writer.fileno()
+            os.set_blocking(self._reader_fd, False)
+            os.set_blocking(self._writer_fd, False)
+
+    def __getstate__(self):
+        return {
+            "name": self._shm.name,
+            "capacity": self._capacity,
+            "reader": self._reader,
+            "writer": self._writer,
+            "spin_time": self._spin_time,
+            "oob_threshold": self._oob_threshold,
+        }
+
+    def __setstate__(self, state) -> None:
+        self._shm = SharedMemory(name=state["name"])
+        self._owner = False
+        self._capacity = state["capacity"]
+        self._reader = state["reader"]
+        self._writer = state["writer"]
+        self._spin_time = state["spin_time"]
+        self._oob_threshold = state["oob_threshold"]
+        self.on_full = None
+        self._setup()
+
+    def fileno(self) -> int:
+        return self._reader.fileno()
+
+    def acknowledge(self) -> None:
+        if sys.platform == "win32":
+            reader = self._reader
+            while reader.poll():
+                reader.recv_bytes()
+            return
+        try:
+            while os.read(self._reader_fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def ring(self) -> None:
+        """Wake up the consumer even if it has not asked for it."""
+        if sys.platform == "win32":
+            self._writer.send_bytes(b"")
+            return
+        try:
+            os.write(self._writer_fd, b"\0")
+        except BlockingIOError:
+            # a full pipe wakes the consumer up all the same
+            pass
+
+    def _wait(self, timeout: Optional[float]) -> None:
+        if sys.platform == "win32":
+            self._reader.poll(timeout)
+        else:
+            select((self._reader_fd,), (), (), timeout)
+
+    def _write(self, pos: int, data: Any) -> None:
+        offset = pos % self._capacity
+        size = len(data)
+        end = offset + size
+        if end <= self._capacity:
+            self._data[offset:end] = data
+        else:
+            split = self._capacity - offset
+            self._data[offset:] = data[:split]
+            self._data[: size - split] = data[split:]
+
+    def _read(self, pos: int, size: int) -> bytes:
+        offset = pos % self._capacity
+        end = offset + size
+        if end <= self._capacity:
+            return self._data[offset:end].tobytes()
+        return self._data[offset:].tobytes() + self._data[: end - self._capacity]
+
+    def _wait_for_space(self, size: int, deadline: Optional[float]) -> None:
+        header = self._header
+        delay = 0.0
+        while header[_HEAD] - header[_TAIL] + size > self._capacity:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise Full
+            if header[_WAITING]:
+                # the consumer is waiting for the rest of a split item
+                header[_WAITING] = 0
+                self.ring()
+            if self.on_full is not None:
+                self.on_full()
+            time.sleep(delay)
+            delay = min(delay * 2 or 0.00005, 0.001)
+
+    def put(
+        self,
+        obj: Any,
+        block: bool = True,
+        timeout: Optional[float] = None,
+    ) -> None:
+        if self._closed:
+            raise ValueError("Queue is closed")
+        data = memoryview(buffers.dumps(obj, self._oob_threshold))
+        deadline = None
+        if not block:
+            deadline = time.monotonic()
+        elif timeout is not None:
+            deadline = time.monotonic() + timeout
+
+        header = self._header
+        max_chunk = self._max_chunk
+        with self._put_lock:
+            sent = 0
+            total = len(data)
+            while True:
+                chunk = data[sent : sent + max_chunk]
+                sent += len(chunk)
+                more = sent < total
+                size = _CHUNK_PREFIX + len(chunk)
+                # only the first chunk may time out, later ones must follow it
+                self._wait_for_space(size, deadline if sent == len(chunk) else None)
+                head = header[_HEAD]
+                prefix = len(chunk) | (_MORE_CHUNKS if more else 0)
+                self._write(head, prefix.to_bytes(_CHUNK_PREFIX, "little"))
+                self._write(head + _CHUNK_PREFIX, chunk)
+                header[_HEAD] = head + size
+                if not more:
+                    break
+            header[_SENT] += 1
+        # releasing the lock above is a full memory barrier, so the consumer either
+        # sees the new head or its waiting flag is visible here
+        if header[_WAITING]:
+            header[_WAITING] = 0
+            self.ring()
+
+    def put_nowait(self, obj: Any) -> None:
+        self.put(obj, block=False)
+
+    def _take(self) -> Any:
+        header = self._header
+        capacity = self._capacity
+        while (tail := header[_TAIL]) != header[_HEAD]:
+            prefix = int.from_bytes(self._read(tail, _CHUNK_PREFIX), "little")
+            size = prefix & ~_MORE_CHUNKS
+            start = tail + _CHUNK_PREFIX
+            offset = start % capacity
+            if prefix & _MORE_CHUNKS:
+                self._partial.append(self._read(start, size))
+                header[_TAIL] = start + size
+                continue
+            if self._partial:
+                self._partial.append(self._read(start, size))
+                header[_TAIL] = start + size
+                data = b"".join(self._partial)
+                self._partial.clear()
+                obj = buffers.loads(data)
+            elif offset + size <= capacity:
+                # unpickle straight from the ring before releasing the space
+                try:
+                    obj = buffers.loads(self._data[offset : offset + size])
+                finally:
+                    header[_TAIL] = start + size
+            else:
+                data = self._read(start, size)
+                header[_TAIL] = start + size
+                obj = buffers.loads(data)
+            header[_RECEIVED] += 1
+            return obj
+        return _NOTHING
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
+        if self._closed:
+            raise ValueError("Queue is closed")
+        header = self._header
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._get_lock:
+            while True:
+                if (obj := self._take()) is not _NOTHING:
+                    return obj
+                if block and self._spin_time:
+                    spin_until = time.perf_counter() + self._spin_time
+                    while (
+                        header[_HEAD] == header[_TAIL]
+                        and time.perf_counter() < spin_until
+                    ):
+                        pass
+                    if (obj := self._take()) is not _NOTHING:
+                        return obj
+                # ask for a doorbell, then look again, as the producer may have
+                # published right before it could see the flag
+                header[_WAITING] = 1
+                with self._fence:
+                    pass
+                if (obj := self._take()) is not _NOTHING:
+                    return obj
+                if not block:
+                    raise Empty
+                if deadline is None:
+                    self._wait(None)
+                elif (remaining := deadline - time.monotonic()) <= 0:
+                    raise Empty
+                else:
+                    self._wait(remaining)
+                self.acknowledge()
+
+    def get_nowait(self) -> Any:
+        return self.get(block=False)
+
+    def empty(self) -> bool:
+        return self._header[_HEAD] == self._header[_TAIL]
+
+    def qsize(self) -> int:
+        return self._header[_SENT] - self._header[_RECEIVED]
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._header.release()
+        self._data.release()
+        self._shm.close()
+        self._reader.close()
+        self._writer.close()
+
+    def __del__(self) -> None:
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def unlink(self) -> None:
+        """Close the queue and, in the creating process, free the shared memory."""
+        self.close()
+        if self._owner:
+            self._shm.unlink()
@@ -167,6 +167,6 @@ class BoundMethodLike(Protocol[T]):
 
 
 class PickleLike(Protocol):
-    def loads(self, data: bytes) -> Any: ...
+    def loads(self, data: bytes, **kwargs) -> Any: ...
 
-    def dumps(self, obj: Any) -> bytes: ...
+    def dumps(self, obj: Any, protocol: Optional[int] = ..., **kwargs) -> bytes: ...
@@ -14,3 +14,9 @@ class WorkerNotFoundError(FlexplanError): ...
 
 
 class WorkerRuntimeError(FlexplanError): ...
+
+
+class InboxFullError(FlexplanError): ...
+
+
+class DeadlineExceededError(FlexplanError, TimeoutError): ...
@@ -0,0 +1,123 @@
+"""Hooks into the life cycle of stations, mails and workers.
+
+Each hook is a list of subscribers, called in order with the arguments of the
+event as it happens::
+
+    from flexplan import hooks
+
+    unsubscribe = hooks.subscribe(hooks.MAIL_RELAYED, print)
+
+Call sites check the hook before firing it (``if MAIL_RELAYED: ...``), so an
+event nobody subscribes to costs a single truth test. Subscribers are called in
+the thread of the event and should return quickly; an exception they raise
+propagates to that thread.
+
+Hooks belong to a process. Workers in other processes see the subscribers
+inherited on fork only; subscribe from the worker (e.g. in ``__post_init__``)
+otherwise.
+"""
+
+import logging
+
+from typing_extensions import Any, Callable, Optional
+
+__all__ = (
+    "FUTURE_CREATED",
+    "HANDLER_ENDED",
+    "HANDLER_STARTED",
+    "HOOKS",
+    "INSTANCE_CREATED",
+    "MAIL_RELAYED",
+    "STATION_STARTED",
+    "STATION_STOPPED",
+    "Hook",
+    "log_events",
+    "subscribe",
+)
+
+
+class Hook(list):
+    """Subscribers of an event, true if there are any."""
+
+    def __init__(self, name: str) -> None:
+        super().__init__()
+        self.name = name
+
+    def fire(self, *args: Any) -> None:
+        for subscriber in tuple(self):
+            subscriber(*args)
+
+    def __repr__(self) -> str:
+        return f"<Hook {self.name} ({len(self)} subscribers)>"
+
+    # hooks are singletons, they do not compare equal by their subscribers
+    __eq__ = object.__eq__  # type: ignore[assignment]
+    __ne__ = object.__ne__  # type: ignore[assignment]
+    __hash__ = object.__hash__  # type: ignore[assignment]
+
+
+# (station) after the supervisor has started a station
+STATION_STARTED = Hook("station_started")
+# (station) after the supervisor has stopped a station
+STATION_STOPPED = Hook("station_stopped")
+# (mail, station) after the supervisor has put a mail into the inbox of a station
+MAIL_RELAYED = Hook("mail_relayed")
+# (context, mail) before a worker handles a mail
+HANDLER_STARTED = Hook("handler_started")
+# (context, mail, result) after a worker has handled a mail; result is FAILED or
+# SKIPPED from flexplan.workbench.base if the mail failed or was skipped
+HANDLER_ENDED = Hook("handler_ended")
+# (future) a worker has created the future of a mail it submits
+FUTURE_CREATED = Hook("future_created")
+# (creator, instance) an instance creator has created a worker, workbench or station
+INSTANCE_CREATED = Hook("instance_created")
+
+HOOKS = (
+    STATION_STARTED,
+    STATION_STOPPED,
+    MAIL_RELAYED,
+    HANDLER_STARTED,
+    HANDLER_ENDED,
+    FUTURE_CREATED,
+    INSTANCE_CREATED,
+)
+
+
+def subscribe(hook: Hook, subscriber: Callable[..., Any]) -> Callable[[], None]:
+    """Call ``subscriber`` whenever ``hook`` fires.
+
+    :return: A function which unsubscribes it again.
+    """
+    hook.append(subscriber)
+
+    def unsubscribe() -> None:
+        try:
+            hook.remove(subscriber)
+        except ValueError:
+            pass
+
+    return unsubscribe
+
+
+def log_events(
+    logger: Optional[logging.Logger] = None, level: int = logging.DEBUG
+) -> Callable[[], None]:
+    """Log every event to ``logger`` (``flexplan`` by default).
+
+    :return: A function which stops logging them again.
+    """
+    if logger is None:
+        logger = logging.getLogger("flexplan")
+    unsubscribes = []
+    for hook in HOOKS:
+
+        def log(*args: Any, name: str = hook.name) -> None:
+            logger.log(level, "%s %r", name, args)
+
+        unsubscribes.append(subscribe(hook, log))
+
+    def unsubscribe() -> None:
+        for unsubscribe_one in unsubscribes:
+            unsubscribe_one()
+
+    return unsubscribe
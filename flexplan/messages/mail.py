@@ -1,3 +1,7 @@
+import copyreg
+import time
+from pickle import PickleBuffer
+
 from typing_extensions import (
     Any,
     Callable,
@@ -6,39 +10,84 @@ from typing_extensions import (
     Optional,
     Self,
     Sequence,
+    Tuple,
     Union,
+    cast,
     final,
 )
 
-from flexplan.datastructures.deferredbox import DeferredBox
 from flexplan.datastructures.future import Future
 from flexplan.datastructures.types import QueueLike
+from flexplan.errors import DeadlineExceededError, WorkerRuntimeError
 from flexplan.messages.message import Message
+from flexplan.serializers import CloudPickleSerializer, Serializer, loads
+from flexplan.utils.buffers import wrap_large_bytes
+
+# for replies whose station has not handed over a serializer
+_serializer = CloudPickleSerializer()
+# rebuilds an object from its class and state, like the default reduction
+_newobj = copyreg.__newobj__  # type: ignore[attr-defined]
 
 
 @final
 class ContactInfo:
-    # TODO
-    ...
+    """Where a mail has been: the name of a worker (or of the workshop or the
+    supervisor), the process it runs in and, as several replicas may run in one
+    process, the ID of the station it runs at."""
+
+    __slots__ = ("name", "pid", "station")
+
+    def __init__(self, name: str = "", pid: int = 0, station: str = "") -> None:
+        self.name = name
+        self.pid = pid
+        self.station = station
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.name!r}, pid={self.pid})"
 
 
 @final
 class MailTrace:
-    __slots__ = ("contact_info", "invocation")
+    """A hop of a traced mail: what happened to it, when (a
+    :func:`time.monotonic_ns` timestamp) and where."""
+
+    __slots__ = ("hop", "timestamp", "contact_info")
 
     def __init__(
         self,
-        *,
+        hop: str,
+        timestamp: int,
         contact_info: ContactInfo,
-        invocation: Callable,
     ):
+        self.hop = hop
+        self.timestamp = timestamp
         self.contact_info = contact_info
-        self.invocation = invocation
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}({self.hop!r}, {self.timestamp}, "
+            f"{self.contact_info!r})"
+        )
 
 
 @final
 class MailMeta:
-    __slots__ = ("sender", "receivers", "trace")
+    """Who sent a mail and, if it is traced, the hops it has taken so far.
+
+    ``trace`` is ``None`` for mails which are not traced. A traced mail is a span
+    ``span_id``, named after its instruction, in the trace ``trace_id``; mails sent
+    by a worker while it handles a traced mail are traced as child spans of it.
+    """
+
+    __slots__ = (
+        "sender",
+        "receivers",
+        "trace",
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+    )
 
     def __init__(
         self,
@@ -46,15 +95,41 @@ class MailMeta:
         sender: ContactInfo,
         receivers: List[ContactInfo],
         trace: Optional[List[MailTrace]] = None,
+        name: str = "",
+        trace_id: int = 0,
+        span_id: int = 0,
+        parent_id: Optional[int] = None,
     ):
         self.sender = sender
         self.receivers = receivers
-        self.trace = trace or []
+        self.trace = trace
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+
+    def record(self, hop: str, contact_info: ContactInfo) -> None:
+        """Add a hop taken now to the trace."""
+        assert self.trace is not None
+        self.trace.append(MailTrace(hop, time.monotonic_ns(), contact_info))
+
+
+# shared by all mails which are not traced
+UNTRACED = MailMeta(sender=ContactInfo(), receivers=[])
 
 
 @final
 class Mail:
-    __slots__ = ("instruction", "args", "kwargs", "future", "meta")
+    __slots__ = (
+        "instruction",
+        "args",
+        "kwargs",
+        "future",
+        "meta",
+        "priority",
+        "deadline",
+        "sent_at",
+    )
 
     def __init__(
         self,
@@ -63,7 +138,9 @@ class Mail:
         args: Sequence[Any] = (),
         kwargs: Optional[Dict[str, Any]] = None,
         meta: MailMeta,
-        future: Optional[Union[DeferredBox, Future]] = None,
+        future: "Optional[Union[Future, RemoteFuture]]" = None,
+        priority: int = 0,
+        deadline: Optional[float] = None,
     ) -> None:
         self.instruction = instruction
         self.args = tuple(args)
@@ -72,13 +149,17 @@ class Mail:
         self.kwargs = dict(kwargs)
         self.future = future
         self.meta = meta
+        self.priority = priority
+        self.deadline = deadline
+        # time.monotonic_ns() when the mail was sent, stamped if metrics are recorded
+        self.sent_at: Optional[int] = None
 
     @classmethod
     def new(
         cls,
         *,
         message: Message,
-        future: Optional[Union[DeferredBox, Future]] = None,
+        future: "Optional[Union[Future, RemoteFuture]]" = None,
     ) -> Self:
         args = message.args
         if args is None:
@@ -91,21 +172,363 @@ class Mail:
             instruction=message.instruction,
             args=args,
             kwargs=kwargs,
-            # TODO
-            meta=MailMeta(
-                sender=ContactInfo(),
-                receivers=[ContactInfo()],
-                trace=[],
-            ),
+            meta=UNTRACED,
             future=future,
+            priority=message.meta.priority,
+            deadline=message.meta.deadline,
         )
 
+    def __reduce_oob__(self, threshold: int):
+        args = wrap_large_bytes(self.args, threshold)
+        kwargs = wrap_large_bytes(self.kwargs.values(), threshold)
+        if args is None and kwargs is None:
+            return None
+        state = {name: getattr(self, name) for name in self.__slots__}
+        if args is not None:
+            state["args"] = tuple(args)
+        if kwargs is not None:
+            state["kwargs"] = dict(zip(self.kwargs, kwargs))
+        return _newobj, (self.__class__,), (None, state)
+
     def __repr__(self) -> str:
+        # the ID of a method, for mails sent compactly (see CompactMail)
+        name = getattr(self.instruction, "__qualname__", self.instruction)
         return (
             f"{self.__class__.__name__}"
-            f"({self.instruction.__qualname__}, args={self.args!r}, kwargs={self.kwargs!r})"
+            f"({name}, args={self.args!r}, kwargs={self.kwargs!r})"
+        )
+
+
+def _rebuild_mail(
+    method_id: int,
+    args: Tuple[Any, ...],
+    kwargs: Optional[Dict[str, Any]],
+    correlation_id: Optional[int],
+) -> Mail:
+    return Mail(
+        method_id,
+        args=args,
+        kwargs=kwargs,
+        meta=UNTRACED,
+        future=None if correlation_id is None else RemoteFuture(correlation_id),
+    )
+
+
+@final
+class CompactMail:
+    """A mail on its way to a worker in another process, pickled as no more than
+    ``(method_id, args, kwargs, correlation_id)``.
+
+    The method is known by its position in the table of methods the station has
+    handed the worker at start (see :attr:`StationSpec.methods`), and the worker
+    gets a :class:`Mail` whose instruction is that ID. Only mails which carry
+    nothing else are sent this way: untraced, of the default priority, without a
+    deadline or metrics timestamp, and with a :class:`RemoteFuture` or no future.
+    """
+
+    __slots__ = ("method_id", "args", "kwargs", "correlation_id")
+
+    def __init__(
+        self,
+        method_id: int,
+        args: Tuple[Any, ...],
+        kwargs: Optional[Dict[str, Any]],
+        correlation_id: Optional[int],
+    ) -> None:
+        self.method_id = method_id
+        self.args = args
+        self.kwargs = kwargs
+        self.correlation_id = correlation_id
+
+    @classmethod
+    def encode(
+        cls, mail: "Union[Mail, MailBatch]", method_ids: Dict[Any, int]
+    ) -> "Union[Mail, MailBatch, CompactMail]":
+        """Get ``mail`` in compact form if it can be, otherwise as it is."""
+        if (
+            type(mail) is not Mail
+            or mail.meta is not UNTRACED
+            or mail.priority
+            or mail.deadline is not None
+            or mail.sent_at is not None
+        ):
+            return mail
+        future = mail.future
+        if future is None:
+            correlation_id = None
+        elif type(future) is RemoteFuture:
+            correlation_id = future.correlation_id
+        else:
+            return mail
+        instruction = mail.instruction
+        if type(instruction) is int:
+            # taken from the inbox of another replica
+            method_id = instruction
+        else:
+            try:
+                method_id = method_ids[instruction]
+            except (KeyError, TypeError):
+                return mail
+        return cls(method_id, mail.args, mail.kwargs or None, correlation_id)
+
+    def __reduce__(self):
+        return _rebuild_mail, (
+            self.method_id,
+            self.args,
+            self.kwargs,
+            self.correlation_id,
+        )
+
+    def __reduce_oob__(self, threshold: int):
+        args = wrap_large_bytes(self.args, threshold)
+        kwargs = None
+        if self.kwargs:
+            kwargs = wrap_large_bytes(self.kwargs.values(), threshold)
+        if args is None and kwargs is None:
+            return None
+        return _rebuild_mail, (
+            self.method_id,
+            self.args if args is None else tuple(args),
+            self.kwargs if kwargs is None else dict(zip(self.kwargs or {}, kwargs)),
+            self.correlation_id,
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}({self.method_id}, args={self.args!r}, "
+            f"kwargs={self.kwargs!r})"
         )
 
 
-MailOrError = Optional[Union[Mail, BaseException]]
+# outcome of a single call in a batch: ``(True, result)`` or ``(False, exception)``
+Outcome = Tuple[bool, Any]
+
+
+@final
+class MailBatch:
+    """Several calls to the same worker relayed and queued as a single item.
+
+    The batch is routed by its first instruction and unpacked by the workbench,
+    which sets a list with the :data:`Outcome` of every call on ``future``.
+    ``deadlines`` holds the deadline of every call, or None for a call without
+    one; a call which has not started by its deadline fails with
+    :class:`DeadlineExceededError`, and the whole batch is skipped once the
+    ``deadline`` of its last call has passed.
+    """
+
+    __slots__ = ("calls", "future", "priority", "deadline", "deadlines", "sent_at")
+
+    def __init__(
+        self,
+        calls: Sequence[Tuple[Callable, Tuple[Any, ...], Dict[str, Any]]],
+        *,
+        future: "Optional[Union[Future, RemoteFuture]]" = None,
+        priority: int = 0,
+        deadline: Optional[float] = None,
+        deadlines: Optional[Sequence[Optional[float]]] = None,
+    ) -> None:
+        if not calls:
+            raise ValueError("A batch must contain at least one call")
+        self.calls = list(calls)
+        self.future = future
+        self.priority = priority
+        self.deadlines: Optional[List[Optional[float]]] = None
+        if deadlines is not None:
+            if len(deadlines) != len(self.calls):
+                raise ValueError("A batch needs a deadline (or None) for every call")
+            if any(d is not None for d in deadlines):
+                self.deadlines = list(deadlines)
+                if deadline is None and None not in self.deadlines:
+                    deadline = max(cast(List[float], self.deadlines))
+        self.deadline = deadline
+        self.sent_at: Optional[int] = None
+
+    @property
+    def instruction(self) -> Callable:
+        return self.calls[0][0]
+
+    def expired(self, index: int) -> Optional[DeadlineExceededError]:
+        """Return the error to fail call ``index`` with if its deadline has
+        passed, or None if it may still run."""
+        if self.deadlines is None:
+            return None
+        deadline = self.deadlines[index]
+        if deadline is None or time.time() < deadline:
+            return None
+        return DeadlineExceededError(f"Deadline of call {index} of {self!r} has passed")
+
+    def __reduce_oob__(self, threshold: int):
+        calls = None
+        for i, (instruction, args, kwargs) in enumerate(self.calls):
+            wrapped_args = wrap_large_bytes(args, threshold)
+            wrapped_kwargs = wrap_large_bytes(kwargs.values(), threshold)
+            if wrapped_args is None and wrapped_kwargs is None:
+                continue
+            if calls is None:
+                calls = list(self.calls)
+            calls[i] = (
+                instruction,
+                args if wrapped_args is None else tuple(wrapped_args),
+                kwargs if wrapped_kwargs is None else dict(zip(kwargs, wrapped_kwargs)),
+            )
+        if calls is None:
+            return None
+        return (
+            _newobj,
+            (self.__class__,),
+            (
+                None,
+                {
+                    "calls": calls,
+                    "future": self.future,
+                    "priority": self.priority,
+                    "deadline": self.deadline,
+                    "deadlines": self.deadlines,
+                    "sent_at": self.sent_at,
+                },
+            ),
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}"
+            f"({self.instruction.__qualname__}, calls={len(self.calls)})"
+        )
+
+
+@final
+class Reply:
+    """Outcome of a mail, sent back to the process owning the mail's future."""
+
+    __slots__ = ("correlation_id", "payload", "is_exception", "buffers")
+
+    def __init__(
+        self,
+        correlation_id: int,
+        payload: Union[bytes, bytearray, memoryview],
+        is_exception: bool,
+        buffers: Optional[List[PickleBuffer]] = None,
+    ) -> None:
+        self.correlation_id = correlation_id
+        self.payload = payload
+        self.is_exception = is_exception
+        # out-of-band buffers of the payload, passed on as they are by the queue
+        # that carries the reply
+        self.buffers = buffers
+
+    @classmethod
+    def new(
+        cls,
+        correlation_id: int,
+        *,
+        result: Any = None,
+        exception: Optional[BaseException] = None,
+        serializer: Optional[Serializer] = None,
+    ) -> Self:
+        if serializer is None:
+            serializer = _serializer
+        # serialize eagerly, so that an unpicklable result is reported to the
+        # caller instead of being lost in the feeder thread of a queue
+        if exception is None:
+            buffers: List[PickleBuffer] = []
+            try:
+                payload = serializer.dumps(result, buffers)
+                return cls(correlation_id, payload, False, buffers or None)
+            except Exception as exc:
+                exception = WorkerRuntimeError(f"Failed to serialize result: {exc!r}")
+        try:
+            payload = serializer.dumps(exception)
+        except Exception:
+            payload = serializer.dumps(WorkerRuntimeError(repr(exception)))
+        return cls(correlation_id, payload, True)
+
+    def __reduce_oob__(self, threshold: int):
+        if len(self.payload) < threshold:
+            return None
+        # unpickling works on any buffer, so the receiver keeps the view as it is
+        return self.__class__, (
+            self.correlation_id,
+            PickleBuffer(self.payload),
+            self.is_exception,
+            self.buffers,
+        )
+
+    def resolve(self, future: Future, serializer: Optional[Serializer] = None) -> None:
+        if serializer is None:
+            value = loads(self.payload, self.buffers)
+        else:
+            value = serializer.loads(self.payload, self.buffers)
+        if self.is_exception:
+            future.set_exception(value)
+        else:
+            future.set_result(value)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}({self.correlation_id}, "
+            f"is_exception={self.is_exception})"
+        )
+
+
+@final
+class RemoteFuture:
+    """Stand-in for a :class:`Future` owned by another process.
+
+    It travels with a mail in place of the future. Completing it puts a
+    :class:`Reply` tagged with ``correlation_id`` into the outbox it has been bound
+    to, so that the owner of the future can complete the real one. Like a
+    :class:`Future`, it tells whether it is done, but it is never cancelled itself:
+    cancelling the real future is announced through
+    :attr:`StationSpec.cancellations`.
+    """
+
+    __slots__ = ("correlation_id", "_outbox", "_serializer", "_done")
+
+    def __init__(self, correlation_id: int) -> None:
+        self.correlation_id = correlation_id
+        self._outbox: "Optional[MailBox]" = None
+        self._serializer: Optional[Serializer] = None
+        self._done = False
+
+    def __reduce__(self):
+        return (self.__class__, (self.correlation_id,))
+
+    def bind(
+        self, outbox: "Optional[MailBox]", serializer: Optional[Serializer] = None
+    ) -> None:
+        """Reply to ``outbox``, with the outcome serialized by ``serializer``."""
+        self._outbox = outbox
+        self._serializer = serializer
+
+    def set_result(self, result: Any) -> None:
+        self._reply(
+            Reply.new(self.correlation_id, result=result, serializer=self._serializer)
+        )
+
+    def set_exception(self, exception: BaseException) -> None:
+        self._reply(
+            Reply.new(
+                self.correlation_id, exception=exception, serializer=self._serializer
+            )
+        )
+
+    def done(self) -> bool:
+        return self._done
+
+    def cancelled(self) -> bool:
+        return False
+
+    def _reply(self, reply: Reply) -> None:
+        if self._outbox is None:
+            raise WorkerRuntimeError(f"{self!r} is not bound to an outbox")
+        self._outbox.put(reply)
+        self._done = True
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.correlation_id})"
+
+
+MailOrError = Optional[Union[Mail, MailBatch, Reply, BaseException]]
 MailBox = QueueLike[MailOrError]
+# what a workbench takes from its inbox, None to stop
+Inbox = QueueLike[Optional[Union[Mail, MailBatch]]]
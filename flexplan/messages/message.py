@@ -1,3 +1,5 @@
+import time
+
 from typing_extensions import (
     Any,
     Callable,
@@ -23,6 +25,8 @@ R = TypeVar("R")
 class MessageMeta:
     def __init__(self):
         self.receivers: List[Tuple[Any, bool]] = []
+        self.priority = 0
+        self.deadline: Optional[float] = None
 
 
 @final
@@ -51,9 +55,34 @@ class Message(Generic[P, R]):
         self.kwargs = kwargs
         return self
 
+    def priority(self, priority: int) -> Self:
+        """Let the mail overtake mails of lower priority waiting in the same inbox.
+
+        Mails of the same priority keep their order, the default is ``0``.
+        """
+        if not isinstance(priority, int):
+            raise TypeError(f"Unexpected priority type: {type(priority)}")
+        self.meta.priority = priority
+        return self
+
+    def deadline(self, deadline: float) -> Self:
+        """Skip the call if it has not started by ``deadline``, a :func:`time.time`
+        timestamp, and fail its future with :class:`DeadlineExceededError`."""
+        self.meta.deadline = deadline
+        return self
+
+    def timeout(self, timeout: float) -> Self:
+        """Set the deadline ``timeout`` seconds from now (see :meth:`deadline`)."""
+        return self.deadline(time.time() + timeout)
+
     def submit(self) -> Future[R]:
         return self._send(use_future=True)  # type: ignore[return-value]
 
+    async def asubmit(self) -> R:
+        """Submit the message and await its result without blocking the event
+        loop, for workers with coroutine methods."""
+        return await self.submit()
+
     def emit(self) -> None:
         self._send(use_future=False)
 
@@ -65,16 +94,13 @@ class Message(Generic[P, R]):
         context = WorkbenchContext.get_context(2)
         if context is None:
             raise RuntimeError("Message should be sent from a running Worker")
-        outbox = context._outbox_ref()
-        if outbox is None:
-            raise RuntimeError("Worker context is corrupted")
 
         if use_future:
             future: Optional[Future] = context.create_future()
         else:
             future = None
         mail = Mail.new(message=self, future=future)
-        outbox.put(mail)
+        context.send(mail)
         return future
 
     def __repr__(self) -> str:
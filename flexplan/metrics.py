@@ -0,0 +1,239 @@
+from typing_extensions import Any, Dict, List, Optional, Sequence, Tuple, final
+
+from flexplan.serializers import SerializerStats
+
+__all__ = (
+    "METRICS_BATCH",
+    "Histogram",
+    "MethodMetrics",
+    "WorkerMetrics",
+)
+
+# every power of two is split into 2**_SUB_BITS buckets, so a value is known within
+# 1/8 of itself; values below _LINEAR have a bucket each
+_SUB_BITS = 3
+_LINEAR = 2 << _SUB_BITS
+# enough buckets for any value below 2**63
+_BUCKETS = (64 - _SUB_BITS) << _SUB_BITS
+# calls recorded before their times are counted
+METRICS_BATCH = 256
+
+
+def _bucket_high(index: int) -> int:
+    """Get the highest value counted in bucket ``index``."""
+    if index < _LINEAR:
+        return index
+    shift = (index >> _SUB_BITS) - 1
+    return ((index - (shift << _SUB_BITS) + 1) << shift) - 1
+
+
+@final
+class Histogram:
+    """Counts of durations in nanoseconds, over buckets fixed in advance whose
+    width grows with the values they count, in the manner of HdrHistogram."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self) -> None:
+        self.counts: List[int] = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value: int) -> None:
+        self.record_many((value,))
+
+    def record_many(self, values: Sequence[int]) -> None:
+        counts = self.counts
+        for value in values:
+            if value < _LINEAR:
+                counts[value if value > 0 else 0] += 1
+            else:
+                shift = value.bit_length() - _SUB_BITS - 1
+                counts[(shift << _SUB_BITS) + (value >> shift)] += 1
+        self.add_totals(values)
+
+    def add_totals(self, values: Sequence[int]) -> None:
+        """Account for ``values`` which have been counted into their buckets."""
+        if not values:
+            return
+        self.count += len(values)
+        self.total += sum(values)
+        if (high := max(values)) > self.max:
+            self.max = high
+
+    def merge(self, other: "Histogram") -> None:
+        counts = self.counts
+        for index, n in enumerate(other.counts):
+            if n:
+                counts[index] += n
+        self.count += other.count
+        self.total += other.total
+        if other.max > self.max:
+            self.max = other.max
+
+    def percentile(self, percent: float) -> int:
+        """Get the value ``percent`` percent of the recorded values do not exceed,
+        rounded up to the bucket it falls in."""
+        if not self.count:
+            return 0
+        rank = max(1, round(self.count * percent / 100))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(_bucket_high(index), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        """Get the count of values, and their mean, percentiles and maximum in
+        seconds."""
+        count = self.count
+        return {
+            "count": count,
+            "mean": self.total / count / 1e9 if count else 0.0,
+            "p50": self.percentile(50) / 1e9,
+            "p90": self.percentile(90) / 1e9,
+            "p99": self.percentile(99) / 1e9,
+            "max": self.max / 1e9,
+        }
+
+
+@final
+class MethodMetrics:
+    """What became of the mails of one method.
+
+    ``received`` mails are ``completed``, failed with one of the ``errors``, or
+    ``skipped`` as nobody waits for them anymore. ``queue_wait`` is the time from
+    sending a mail to handling it, ``execution`` the time handling took.
+
+    The times of handled mails are put aside in ``pending`` as pairs of queue wait
+    (``None`` if unknown) and execution time, and counted in batches.
+    """
+
+    __slots__ = (
+        "received",
+        "completed",
+        "errors",
+        "skipped",
+        "queue_wait",
+        "execution",
+        "pending",
+    )
+
+    def __init__(self) -> None:
+        self.received = 0
+        self.completed = 0
+        self.errors = 0
+        self.skipped = 0
+        self.queue_wait = Histogram()
+        self.execution = Histogram()
+        self.pending: List[Tuple[Optional[int], int]] = []
+
+    def record(self, queue_wait: Optional[int], execution: int) -> None:
+        pending = self.pending
+        pending.append((queue_wait, execution))
+        if len(pending) >= METRICS_BATCH:
+            self.flush()
+
+    def flush(self) -> None:
+        """Count the times put aside."""
+        pending, self.pending = self.pending, []
+        self._count(pending)
+
+    def _count(self, pending: List[Tuple[Optional[int], int]]) -> None:
+        if not pending:
+            return
+        # both histograms are counted in a single pass, with the bucket of a value
+        # worked out as in Histogram.record_many
+        wait_counts = self.queue_wait.counts
+        execution_counts = self.execution.counts
+        waits: List[int] = []
+        for wait, execution in pending:
+            if wait is not None:
+                waits.append(wait)
+                if wait < _LINEAR:
+                    wait_counts[wait if wait > 0 else 0] += 1
+                else:
+                    shift = wait.bit_length() - _SUB_BITS - 1
+                    wait_counts[(shift << _SUB_BITS) + (wait >> shift)] += 1
+            if execution < _LINEAR:
+                execution_counts[execution if execution > 0 else 0] += 1
+            else:
+                shift = execution.bit_length() - _SUB_BITS - 1
+                execution_counts[(shift << _SUB_BITS) + (execution >> shift)] += 1
+        self.queue_wait.add_totals(waits)
+        self.execution.add_totals([execution for _, execution in pending])
+
+    def merge(self, other: "MethodMetrics") -> None:
+        # the other metrics may be recorded into meanwhile, they are left as they are
+        self.received += other.received
+        self.completed += other.completed
+        self.errors += other.errors
+        self.skipped += other.skipped
+        self.queue_wait.merge(other.queue_wait)
+        self.execution.merge(other.execution)
+        self._count(list(other.pending))
+
+    def summary(self) -> Dict[str, Any]:
+        self.flush()
+        return {
+            "received": self.received,
+            "completed": self.completed,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "queue_wait": self.queue_wait.summary(),
+            "execution": self.execution.summary(),
+        }
+
+
+@final
+class WorkerMetrics:
+    """Metrics of the mails handled by a worker, per instruction.
+
+    Updates are not locked, so workbenches handling several mails at once may miss
+    an update now and then.
+    """
+
+    __slots__ = ("methods", "serialization")
+
+    def __init__(self) -> None:
+        self.methods: Dict[Any, MethodMetrics] = {}
+        # of a worker in another process, whose serializer is not at hand
+        self.serialization = SerializerStats()
+
+    def method(self, instruction: Any) -> MethodMetrics:
+        try:
+            return self.methods[instruction]
+        except KeyError:
+            metrics = self.methods[instruction] = MethodMetrics()
+            return metrics
+
+    def handled(self) -> int:
+        """Get the number of mails received and finished, which grows with every
+        update."""
+        return sum(
+            m.received + m.completed + m.errors + m.skipped
+            for m in list(self.methods.values())
+        )
+
+    def merge(self, other: "WorkerMetrics") -> None:
+        for instruction, metrics in list(other.methods.items()):
+            self.method(instruction).merge(metrics)
+        self.serialization.merge(other.serialization)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Get the metrics of every method by its name."""
+        methods: Dict[str, MethodMetrics] = {}
+        for instruction, metrics in list(self.methods.items()):
+            name = _method_name(instruction)
+            if (merged := methods.get(name)) is None:
+                merged = methods[name] = MethodMetrics()
+            merged.merge(metrics)
+        return {name: metrics.summary() for name, metrics in methods.items()}
+
+
+def _method_name(instruction: Optional[Any]) -> str:
+    if instruction is None:
+        return "<reply>"
+    return getattr(instruction, "__name__", None) or repr(instruction)
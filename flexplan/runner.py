@@ -0,0 +1,56 @@
+"""Run the worker of a ZeroMQ station in this process.
+
+Usage: ``python -m flexplan.runner [--hwm N] [--server-key KEY --secret-key-file
+FILE] ENDPOINT``, where ``ENDPOINT`` is the endpoint of a started
+:class:`~flexplan.stations.zmq.ZmqStation`. The modules defining the worker and
+workbench classes must be importable by the runner.
+
+Stations with a CURVE secret key take runners which connect with the station's
+public key (``--server-key``) and a secret key (read from ``--secret-key-file``)
+whose public key the station authorizes.
+"""
+
+import argparse
+
+from typing_extensions import List, Optional
+
+from flexplan.stations.zmq import DEFAULT_HWM, run_runner
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m flexplan.runner",
+        description="Run a worker for a ZeroMQ station until the station stops.",
+    )
+    parser.add_argument(
+        "endpoint", help="endpoint of the station, e.g. tcp://host:port"
+    )
+    parser.add_argument(
+        "--hwm",
+        type=int,
+        default=DEFAULT_HWM,
+        help="high-water mark of the runner's socket",
+    )
+    parser.add_argument(
+        "--server-key",
+        help="CURVE public key of the station, in Z85",
+    )
+    parser.add_argument(
+        "--secret-key-file",
+        help="file holding the runner's CURVE secret key, in Z85",
+    )
+    args = parser.parse_args(argv)
+    if (args.server_key is None) != (args.secret_key_file is None):
+        parser.error("--server-key and --secret-key-file go together")
+    server_key = secret_key = None
+    if args.server_key is not None:
+        server_key = args.server_key.encode()
+        with open(args.secret_key_file, "rb") as file:
+            secret_key = file.read().strip()
+    run_runner(
+        args.endpoint, hwm=args.hwm, server_key=server_key, secret_key=secret_key
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""Serializers for the outcomes of mails handled in another process.
+
+A worker in another process sends the result (or exception) of a mail back as a
+:class:`Reply`, whose payload the serializer of the station produces. Payloads
+tell their format by their first byte, so any of them can be read with
+:func:`loads` whatever serializer wrote them:
+
+``"pickle"``: :mod:`pickle` at the highest protocol, with buffers out of band.
+``"cloudpickle"`` (the default): the same, falling back to cloudpickle (or dill)
+for what pickle refuses, such as lambdas and closures. cloudpickle is several
+times slower on plain data, so it is only paid for where it is needed.
+``"marshal"``: :mod:`marshal` for values made of the built-in types only (None,
+bool, int, float, complex, str, bytes, tuple, list, dict, set, frozenset, and not
+their subclasses), which is faster still for small values; anything else is
+pickled as with ``"cloudpickle"``, and so are values holding ``bytes`` of
+``oob_threshold`` bytes or more, which pickle hands over out of band.
+``"msgpack"``: the same with msgpack, if it is installed, for None, bool, int,
+float, str, bytes, list and dict.
+"""
+
+import marshal
+import pickle
+from abc import ABC, abstractmethod
+from pickle import PickleBuffer
+from time import perf_counter_ns
+
+from typing_extensions import Any, ClassVar, Dict, List, Optional, Type, Union, final
+
+from flexplan.utils.buffers import OOB_THRESHOLD, wrap_large_bytes
+from flexplan.utils.pickle import get_pickle
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+__all__ = (
+    "CloudPickleSerializer",
+    "MarshalSerializer",
+    "MsgpackSerializer",
+    "PickleSerializer",
+    "Serializer",
+    "SerializerStats",
+    "get_serializer",
+    "loads",
+    "serializer_specs",
+)
+
+# every pickle stream of protocol 2 or later starts with the PROTO opcode
+_PICKLE_MARK = 0x80
+_MARSHAL_MARK = b"M"
+_MSGPACK_MARK = b"K"
+
+# what pickle raises for objects it cannot find by reference, like lambdas
+_UNPICKLABLE = (pickle.PicklingError, AttributeError, TypeError)
+
+Payload = Union[bytes, bytearray, memoryview]
+
+# what _inspect finds in a value
+_PLAIN = 0
+_FOREIGN = 1  # an object of another type
+_LARGE = 2  # bytes to hand over out of band
+
+_MARSHAL_TYPES = frozenset(
+    (
+        type(None),
+        bool,
+        int,
+        float,
+        complex,
+        str,
+        bytes,
+        tuple,
+        list,
+        dict,
+        set,
+        frozenset,
+    )
+)
+_MSGPACK_TYPES = frozenset((type(None), bool, int, float, str, bytes, list, dict))
+_CONTAINERS = (tuple, list, set, frozenset)
+
+
+@final
+class SerializerStats:
+    """Number of payloads, their bytes (buffers included) and the nanoseconds
+    spent producing and reading them.
+
+    Updates are not locked, so threads serializing at once may miss an update now
+    and then.
+    """
+
+    __slots__ = (
+        "dumps",
+        "dumps_bytes",
+        "dumps_ns",
+        "loads",
+        "loads_bytes",
+        "loads_ns",
+        "fallbacks",
+    )
+
+    def __init__(self) -> None:
+        self.dumps = 0
+        self.dumps_bytes = 0
+        self.dumps_ns = 0
+        self.loads = 0
+        self.loads_bytes = 0
+        self.loads_ns = 0
+        # times a slower format had to be used, see the module documentation
+        self.fallbacks = 0
+
+    def merge(self, other: "SerializerStats") -> None:
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "dumps": self.dumps,
+            "dumps_bytes": self.dumps_bytes,
+            "dumps_time": self.dumps_ns / 1e9,
+            "loads": self.loads,
+            "loads_bytes": self.loads_bytes,
+            "loads_time": self.loads_ns / 1e9,
+            "fallbacks": self.fallbacks,
+        }
+
+
+def _size(data: Payload, buffers: Optional[List[PickleBuffer]]) -> int:
+    size = len(data)
+    if buffers:
+        size += sum(memoryview(buffer).nbytes for buffer in buffers)
+    return size
+
+
+def _inspect(obj: Any, types: "frozenset[type]", threshold: int) -> int:
+    """Tell whether ``obj`` is made of objects of exactly ``types`` only, and
+    whether it holds ``bytes`` of ``threshold`` bytes or more.
+
+    marshal and msgpack take instances of subclasses, bytearray and memoryview as
+    well, and give back instances of the base types instead.
+    """
+    stack = [obj]
+    # containers are looked at once, they may be shared or hold themselves
+    seen = set()
+    while stack:
+        value = stack.pop()
+        t = type(value)
+        if t not in types:
+            return _FOREIGN
+        if t is bytes:
+            if len(value) >= threshold:
+                return _LARGE
+        elif t in _CONTAINERS or t is dict:
+            if id(value) in seen:
+                continue
+            seen.add(id(value))
+            if t is dict:
+                stack.extend(value.keys())
+                stack.extend(value.values())
+            else:
+                stack.extend(value)
+    return _PLAIN
+
+
+def _wrap_large(obj: Any, threshold: int) -> Any:
+    """Get ``obj`` with its large ``bytes``, by themselves or right in a tuple,
+    list or dict, set to be pickled out of band."""
+    t = type(obj)
+    if t is bytes:
+        wrapped = wrap_large_bytes((obj,), threshold)
+        return obj if wrapped is None else wrapped[0]
+    if t is tuple or t is list:
+        wrapped = wrap_large_bytes(obj, threshold)
+        return obj if wrapped is None else t(wrapped)
+    if t is dict:
+        wrapped = wrap_large_bytes(obj.values(), threshold)
+        return obj if wrapped is None else dict(zip(obj, wrapped))
+    return obj
+
+
+def loads(data: Payload, buffers: Optional[List[Any]] = None) -> Any:
+    """Read a payload any of the serializers has produced."""
+    mark = data[0]
+    if mark == _PICKLE_MARK:
+        return pickle.loads(data, buffers=buffers)
+    view = memoryview(data)[1:]
+    if mark == _MARSHAL_MARK[0]:
+        return marshal.loads(view)
+    if mark == _MSGPACK_MARK[0]:
+        if msgpack is None:
+            raise ImportError("msgpack is required to read this payload")
+        return msgpack.unpackb(view, raw=False, strict_map_key=False)
+    raise ValueError(f"Unexpected payload mark: {mark!r}")
+
+
+class Serializer(ABC):
+    """Turns values into payloads and back, counting the bytes and time it takes
+    in :attr:`stats`.
+
+    Buffers of the value which support it are appended to ``buffers`` rather than
+    copied into the payload, if a list is given; they have to be handed to
+    :meth:`loads` along with it. So are ``bytes`` of ``oob_threshold`` bytes or
+    more, by themselves or right in a tuple, list or dict.
+    """
+
+    name: ClassVar[str]
+
+    def __init__(self, oob_threshold: int = OOB_THRESHOLD) -> None:
+        self.stats = SerializerStats()
+        self.oob_threshold = oob_threshold
+
+    def dumps(self, obj: Any, buffers: Optional[List[PickleBuffer]] = None) -> Payload:
+        start = perf_counter_ns()
+        data = self._dumps(obj, buffers)
+        stats = self.stats
+        stats.dumps_ns += perf_counter_ns() - start
+        stats.dumps += 1
+        stats.dumps_bytes += _size(data, buffers)
+        return data
+
+    def loads(self, data: Payload, buffers: Optional[List[Any]] = None) -> Any:
+        start = perf_counter_ns()
+        obj = loads(data, buffers)
+        stats = self.stats
+        stats.loads_ns += perf_counter_ns() - start
+        stats.loads += 1
+        stats.loads_bytes += _size(data, buffers)
+        return obj
+
+    @abstractmethod
+    def _dumps(self, obj: Any, buffers: Optional[List[PickleBuffer]]) -> Payload: ...
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}()"
+
+
+class PickleSerializer(Serializer):
+    """Pickle at the highest protocol, with nothing to fall back on."""
+
+    name = "pickle"
+
+    def _dumps(self, obj: Any, buffers: Optional[List[PickleBuffer]]) -> Payload:
+        if buffers is None:
+            return pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+        return pickle.dumps(
+            _wrap_large(obj, self.oob_threshold),
+            pickle.HIGHEST_PROTOCOL,
+            buffer_callback=buffers.append,
+        )
+
+
+class CloudPickleSerializer(PickleSerializer):
+    """Pickle, or cloudpickle (dill if it is missing) for what pickle refuses."""
+
+    name = "cloudpickle"
+
+    def _dumps(self, obj: Any, buffers: Optional[List[PickleBuffer]]) -> Payload:
+        try:
+            return super()._dumps(obj, buffers)
+        except _UNPICKLABLE:
+            try:
+                fallback = get_pickle("cloudpickle", "dill")
+            except ImportError:
+                fallback = None
+            if fallback is None:
+                raise
+            if buffers:
+                # left over from the failed attempt
+                del buffers[:]
+            self.stats.fallbacks += 1
+            if buffers is None:
+                return fallback.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+            return fallback.dumps(
+                obj, protocol=pickle.HIGHEST_PROTOCOL, buffer_callback=buffers.append
+            )
+
+
+class MarshalSerializer(CloudPickleSerializer):
+    """Marshal values of built-in types, pickle the rest."""
+
+    name = "marshal"
+
+    def _dumps(self, obj: Any, buffers: Optional[List[PickleBuffer]]) -> Payload:
+        found = _inspect(obj, _MARSHAL_TYPES, self.oob_threshold)
+        if found == _PLAIN:
+            try:
+                return _MARSHAL_MARK + marshal.dumps(obj)
+            except ValueError:
+                # nested too deeply
+                pass
+        if found != _LARGE:
+            self.stats.fallbacks += 1
+        return super()._dumps(obj, buffers)
+
+
+class MsgpackSerializer(CloudPickleSerializer):
+    """Pack values of built-in types with msgpack, pickle the rest.
+
+    Tuples and sets are pickled, as msgpack would turn them into lists, and so are
+    integers out of the 64-bit range.
+    """
+
+    name = "msgpack"
+
+    def __init__(self, oob_threshold: int = OOB_THRESHOLD) -> None:
+        if msgpack is None:
+            raise ImportError("msgpack is required by MsgpackSerializer")
+        super().__init__(oob_threshold)
+
+    def _dumps(self, obj: Any, buffers: Optional[List[PickleBuffer]]) -> Payload:
+        found = _inspect(obj, _MSGPACK_TYPES, self.oob_threshold)
+        if found == _PLAIN:
+            try:
+                return _MSGPACK_MARK + msgpack.packb(
+                    obj, use_bin_type=True, strict_types=True
+                )
+            except (TypeError, ValueError, OverflowError):
+                # integers out of range, or nested too deeply
+                pass
+        if found != _LARGE:
+            self.stats.fallbacks += 1
+        return super()._dumps(obj, buffers)
+
+
+serializer_specs: "Dict[str, Type[Serializer]]" = {
+    "pickle": PickleSerializer,
+    "cloudpickle": CloudPickleSerializer,
+    "marshal": MarshalSerializer,
+    "msgpack": MsgpackSerializer,
+}
+
+
+def get_serializer(serializer: "Union[str, Serializer, None]" = None) -> Serializer:
+    """Get a serializer by its name in :data:`serializer_specs`, the default
+    (``"cloudpickle"``) if it is ``None``."""
+    if serializer is None:
+        return CloudPickleSerializer()
+    if isinstance(serializer, Serializer):
+        return serializer
+    if isinstance(serializer, str):
+        if (serializer_t := serializer_specs.get(serializer)) is None:
+            raise ValueError(f"Serializer name not found: {serializer}")
+        return serializer_t()
+    raise TypeError(f"Unexpected serializer type: {type(serializer)}")
@@ -1,26 +1,82 @@
 from abc import ABC, abstractmethod
 from types import TracebackType
 
-from typing_extensions import TYPE_CHECKING, Optional, Self, Type
-
+from typing_extensions import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Self,
+    Tuple,
+    Type,
+    Union,
+)
+
+from flexplan.serializers import Serializer, get_serializer
 from flexplan.utils.atexit import stop_station_atexit
+from flexplan.utils.inspect import get_public_methods
 
 if TYPE_CHECKING:
+    from flexplan.backpressure import InboxLimit
+    from flexplan.datastructures.cancelboard import CancelBoard
     from flexplan.datastructures.instancecreator import Creator
-    from flexplan.messages.mail import Mail
+    from flexplan.datastructures.notifyqueue import Selectable
+    from flexplan.messages.mail import Mail, MailBatch, MailOrError, Reply
     from flexplan.workbench.base import Workbench
     from flexplan.workers.base import Worker
 
 
 class StationSpec:
-    __slots__ = ("use_process_future",)
+    """Capabilities of a station.
+
+    ``use_process_future``: the worker lives in another process, so futures are
+    kept on this side and travel as :class:`RemoteFuture` correlation IDs.
+
+    ``cancellations``: where the correlation IDs of cancelled futures are posted
+    for the worker, which skips their mails; ``None`` if it cannot be told.
+
+    ``metrics_interval``: the worker records :class:`WorkerMetrics` and reports them
+    to the supervisor at most this often, in seconds; ``None`` records nothing. Set
+    by the supervisor before the station starts.
+
+    ``tracing``: the worker records the hops of traced mails (see
+    :mod:`flexplan.tracing`). Set by the supervisor before the station starts.
+
+    ``serializer``: what the outcomes of mails handled in another process are sent
+    back with (see :mod:`flexplan.serializers`), the default one unless given.
+
+    ``methods``: names of the public methods of the worker, whose positions are the
+    IDs mails sent as :class:`CompactMail` refer to them by; ``None`` if mails are
+    not sent that way. Set by the station as it starts, see
+    :meth:`Station.agree_method_ids`.
+    """
+
+    __slots__ = (
+        "use_process_future",
+        "cancellations",
+        "metrics_interval",
+        "tracing",
+        "serializer",
+        "methods",
+    )
 
     def __init__(
         self,
         *,
         use_process_future: bool,
+        cancellations: "Optional[CancelBoard]" = None,
+        metrics_interval: Optional[float] = None,
+        tracing: bool = False,
+        serializer: Optional[Serializer] = None,
     ):
         self.use_process_future = use_process_future
+        self.cancellations = cancellations
+        self.metrics_interval = metrics_interval
+        self.tracing = tracing
+        self.serializer = get_serializer(serializer)
+        self.methods: Optional[Tuple[str, ...]] = None
 
 
 class Station(ABC):
@@ -34,6 +90,22 @@ class Station(ABC):
         self._workbench_creator = workbench_creator
         self._worker_creator = worker_creator
         self._worker_class = worker_creator.type
+        # IDs of the worker's methods, for stations which send mails compactly
+        self._method_ids: "Dict[Callable[..., Any], int]" = {}
+
+    def agree_method_ids(self) -> None:
+        """Number the public methods of the worker before it starts in another
+        process, which gets their names in :attr:`StationSpec.methods`.
+
+        The worker resolves the names against its own class, so that an ID means
+        the same method on both sides even if the class is not quite the same
+        there. Mails to those methods can then be sent as :class:`CompactMail`.
+        """
+        methods = get_public_methods(self._worker_class)
+        self.spec.methods = tuple(name for name, _ in methods)
+        self._method_ids = {
+            func: method_id for method_id, (_, func) in enumerate(methods)
+        }
 
     @abstractmethod
     def start(self) -> None: ...
@@ -58,10 +130,52 @@ class Station(ABC):
     def is_running(self) -> bool: ...
 
     @abstractmethod
-    def send(self, mail: "Mail") -> None: ...
+    def send(self, mail: "Union[Mail, MailBatch]") -> None: ...
 
     @abstractmethod
-    def recv(self, timeout: Optional[float] = None) -> "Optional[Mail]": ...
+    def recv(self, timeout: Optional[float] = None) -> "MailOrError": ...
+
+    def send_reply(self, reply: "Reply") -> None:
+        """Complete a future that a worker of this station is waiting on.
+
+        Only stations which replace futures with correlation IDs (see
+        :attr:`StationSpec.use_process_future`) need to implement it.
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} does not take replies")
+
+    def inbox_depth(self) -> int:
+        """Get the number of mails sent to the station and not taken by its
+        workbench yet, or 0 if the station cannot tell."""
+        return 0
+
+    def steal(self, max_mails: int) -> "List[Mail]":
+        """Take up to ``max_mails`` mails out of the inbox before the workbench
+        starts them, so they can be sent to another replica instead.
+
+        Mails of the lowest priority are taken first, the oldest of them first;
+        stations which cannot tell priorities apart take the oldest mails.
+
+        Stations whose inbox only the workbench may read return an empty list.
+        """
+        return []
+
+    def default_inbox_limit(self) -> "Optional[InboxLimit]":
+        """Get the limit the supervisor puts on the inbox of the station when the
+        worker is registered without ``max_inbox``, ``None`` for no limit.
+
+        Stations which can only take so many mails at once without blocking
+        :meth:`send` return one, so that the supervisor holds further mails back.
+        """
+        return None
+
+    def recv_handle(self) -> "Optional[Selectable]":
+        """Get an object whose ``fileno()`` becomes readable when :meth:`recv` may
+        return a mail, or ``None`` if the station can only be polled.
+
+        If the handle also has an ``acknowledge()`` method, it is called before the
+        station is drained.
+        """
+        return None
 
     @property
     def worker_class(self) -> "Type[Worker]":
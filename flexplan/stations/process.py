@@ -1,12 +1,24 @@
+import sys
+from collections import deque
 from multiprocessing import get_context
 from queue import Empty
 
-from typing_extensions import TYPE_CHECKING, Optional, Union, override
-
+from typing_extensions import (
+    TYPE_CHECKING,
+    Deque,
+    List,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+    override,
+)
+
+from flexplan.datastructures.cancelboard import CancelBoard
 from flexplan.datastructures.instancecreator import Creator
-from flexplan.messages.mail import Mail
+from flexplan.datastructures.processqueue import PriorityProcessQueue, ProcessQueue
+from flexplan.messages.mail import CompactMail, Mail, MailBatch, Reply
 from flexplan.stations.base import Station, StationSpec
-from flexplan.stations.mixins import NotifyRuntimeInfoMixin, RuntimeInfo
 from flexplan.utils.atexit import stop_joinable_atexit
 from flexplan.workbench.base import Workbench
 from flexplan.workers.base import Worker
@@ -15,10 +27,13 @@ if TYPE_CHECKING:
     from multiprocessing.context import ForkContext, ForkServerContext, SpawnContext
     from multiprocessing.process import BaseProcess
 
+    from flexplan.datastructures.notifyqueue import Selectable
+    from flexplan.messages.mail import Inbox, MailBox, MailOrError
+
     AnyContext = Union[ForkContext, ForkServerContext, SpawnContext]
 
 
-class ProcessStation(Station, NotifyRuntimeInfoMixin):
+class ProcessStation(Station):
     def __init__(
         self,
         *,
@@ -32,32 +47,43 @@ class ProcessStation(Station, NotifyRuntimeInfoMixin):
         )
         mp_ctx = get_context("spawn") if mp_context is None else mp_context
         self._mp_ctx = mp_ctx
-        self._inbox = mp_ctx.Queue()
-        self._outbox = mp_ctx.Queue()
+        self._inbox: "Inbox"
+        self._outbox: "MailBox"
+        self._replybox: "MailBox"
+        self._inbox, self._outbox, self._replybox = self._create_mailboxes()
         self._invoked: bool = False
         self._running_event = mp_ctx.Event()
         self._terminate_event = mp_ctx.Event()
         self._process: "Optional[BaseProcess]" = None
-        self._process_future_manager_address: Optional[str] = None
-        self._spec = StationSpec(use_process_future=True)
+        self._buffered_mails: "Deque[MailOrError]" = deque()
+        self._spec = StationSpec(
+            use_process_future=True,
+            cancellations=CancelBoard(mp_context=mp_ctx),
+        )
 
-    @override
-    def notify_runtime_info(self, info: RuntimeInfo) -> None:
-        try:
-            if info.process_future_manager_address is None:
-                raise ValueError("process_future_manager_address is None")
-            self._process_future_manager_address = info.process_future_manager_address
-        except Exception as e:
-            print(e)
-            raise
+    def _create_mailboxes(self) -> "Tuple[Inbox, MailBox, MailBox]":
+        """Create the inbox, the outbox and the reply box shared with the worker
+        process.
+
+        Replies to futures created by the worker have a box of their own, so they
+        are received even while the worker is busy waiting for them. The inbox
+        hands out mails by priority.
+        """
+        return (
+            PriorityProcessQueue(mp_context=self._mp_ctx),
+            ProcessQueue(mp_context=self._mp_ctx),
+            ProcessQueue(mp_context=self._mp_ctx),
+        )
+
+    def _close_mailboxes(self) -> None:
+        """Release the mailboxes once the worker process has exited."""
 
     @override
     def start(self):
         if self.is_running():
             raise RuntimeError(f"{self.__class__.__name__} is already running")
-        elif self._process_future_manager_address is None:
-            raise ValueError("process_future_manager_address is None")
         self._invoked = True
+        self.agree_method_ids()
         workbench = self._workbench_creator.create()
         self._process = self._mp_ctx.Process(
             target=workbench.run,
@@ -68,7 +94,7 @@ class ProcessStation(Station, NotifyRuntimeInfoMixin):
                 "outbox": self._outbox,
                 "running_event": self._running_event,
                 "terminate_event": self._terminate_event,
-                "process_future_manager_address": self._process_future_manager_address,
+                "replybox": self._replybox,
             },
             daemon=True,
         )
@@ -90,24 +116,72 @@ class ProcessStation(Station, NotifyRuntimeInfoMixin):
         if not self._invoked or self._process is None:
             return
         self._inbox.put(None)
+        self._replybox.put(None)
+        # keep draining the outbox, the process cannot exit while its feeder thread
+        # is blocked on a full pipe
+        while self._process.is_alive():
+            try:
+                self._buffered_mails.append(self._outbox.get(timeout=0.05))
+            except Empty:
+                continue
         self._process.join()
         self._process = None
+        self._close_mailboxes()
 
     @override
     def is_running(self) -> bool:
         return self._running_event.is_set()
 
     @override
-    def send(self, mail: Mail) -> None:
-        self._inbox.put(mail)
+    def send(self, mail: Union[Mail, MailBatch]) -> None:
+        # a CompactMail is unpickled as a Mail
+        self._inbox.put(
+            CompactMail.encode(mail, self._method_ids)  # type: ignore[arg-type]
+        )
 
     @override
-    def recv(self, timeout: Optional[float] = None) -> Optional[Mail]:
+    def send_reply(self, reply: Reply) -> None:
+        self._replybox.put(reply)
+
+    @override
+    def recv(self, timeout: Optional[float] = None) -> "MailOrError":
+        if self._buffered_mails:
+            return self._buffered_mails.popleft()
         try:
             return self._outbox.get(timeout=timeout)
         except Empty:
             return None
 
+    @override
+    def inbox_depth(self) -> int:
+        try:
+            return self._inbox.qsize()
+        except NotImplementedError:
+            # multiprocessing queues cannot count their items on macOS
+            return 0
+
+    @override
+    def steal(self, max_mails: int) -> List[Mail]:
+        # the queue may be read from any process, mails taken here are unpickled
+        # and pickled again by the station they are sent to; those the worker has
+        # already moved aside stay with it, the rest are taken in the order they were
+        # sent, as the pipe cannot be searched by priority
+        mails: List[Mail] = []
+        take = cast(PriorityProcessQueue, self._inbox).take_nowait
+        while len(mails) < max_mails:
+            try:
+                mails.append(take())
+            except Empty:
+                break
+        return mails
+
+    @override
+    def recv_handle(self) -> "Optional[Selectable]":
+        if sys.platform == "win32":
+            # pipe handles cannot be waited on with selectors on Windows
+            return None
+        return self._outbox  # type: ignore[return-value]
+
     @property
     @override
     def spec(self) -> StationSpec:
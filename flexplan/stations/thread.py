@@ -1,15 +1,23 @@
-from queue import Empty, Queue
+from queue import Empty
 from threading import Event, Thread
 
-from typing_extensions import Optional, override
+from typing_extensions import TYPE_CHECKING, List, Optional, Union, override
 
 from flexplan.datastructures.instancecreator import Creator
-from flexplan.messages.mail import Mail
+from flexplan.datastructures.notifyqueue import (
+    NotifyQueue,
+    PriorityNotifyQueue,
+    Selectable,
+)
+from flexplan.messages.mail import Mail, MailBatch
 from flexplan.stations.base import Station, StationSpec
 from flexplan.utils.atexit import stop_joinable_atexit
 from flexplan.workbench.base import Workbench
 from flexplan.workers.base import Worker
 
+if TYPE_CHECKING:
+    from flexplan.messages.mail import MailOrError
+
 
 class ThreadStation(Station):
     def __init__(
@@ -22,8 +30,8 @@ class ThreadStation(Station):
             workbench_creator=workbench_creator,
             worker_creator=worker_creator,
         )
-        self._inbox: Queue = Queue()
-        self._outbox: Queue = Queue()
+        self._inbox = PriorityNotifyQueue()
+        self._outbox = NotifyQueue()
         self._invoked: bool = False
         self._running_event = Event()
         self._terminate_event = Event()
@@ -74,16 +82,40 @@ class ThreadStation(Station):
         return self._running_event.is_set()
 
     @override
-    def send(self, mail: Mail) -> None:
+    def send(self, mail: Union[Mail, MailBatch]) -> None:
         self._inbox.put(mail)
 
     @override
-    def recv(self, timeout: Optional[float] = None) -> Optional[Mail]:
+    def recv(self, timeout: Optional[float] = None) -> "MailOrError":
         try:
             return self._outbox.get(timeout=timeout)
         except Empty:
             return None
 
+    @override
+    def inbox_depth(self) -> int:
+        return self._inbox.qsize()
+
+    @override
+    def steal(self, max_mails: int) -> List[Mail]:
+        mails: List[Mail] = []
+        inbox = self._inbox
+        while len(mails) < max_mails:
+            try:
+                mail = inbox.take_nowait()
+            except Empty:
+                break
+            if mail is None:
+                # the stop sentinel stays last
+                inbox.put(None)
+                break
+            mails.append(mail)
+        return mails
+
+    @override
+    def recv_handle(self) -> Selectable:
+        return self._outbox
+
     @property
     @override
     def spec(self) -> StationSpec:
@@ -0,0 +1,847 @@
+import ipaddress
+import os
+import sys
+import tempfile
+import time
+import uuid
+from array import array
+from collections import deque
+from itertools import count
+from multiprocessing import get_context
+from queue import Empty, Queue
+from threading import Condition, Event, Thread
+
+from typing_extensions import (
+    TYPE_CHECKING,
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+    override,
+)
+
+from flexplan.backpressure import InboxLimit
+from flexplan.datastructures.instancecreator import Creator
+from flexplan.datastructures.notifyqueue import NotifyQueue
+from flexplan.errors import WorkerRuntimeError
+from flexplan.messages.mail import CompactMail, Mail, MailBatch, RemoteFuture, Reply
+from flexplan.stations.base import Station, StationSpec
+from flexplan.utils import buffers
+from flexplan.utils.atexit import stop_joinable_atexit
+from flexplan.workbench.base import Workbench
+from flexplan.workers.base import Worker
+
+try:
+    import zmq
+except ImportError:  # pragma: no cover
+    zmq = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    from multiprocessing.process import BaseProcess
+
+    from flexplan.datastructures.notifyqueue import Selectable
+    from flexplan.messages.mail import MailOrError
+    from flexplan.stations.process import AnyContext
+
+__all__ = (
+    "ZmqStation",
+    "run_runner",
+)
+
+DEFAULT_HWM = 1000
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_HEARTBEAT_TIMEOUT = 10.0
+DEFAULT_STOP_TIMEOUT = 30.0
+
+# first frame of every message (after the routing id on the station side)
+_HELLO = b"H"  # runner -> station: connected, asks for its setup
+_SETUP = b"S"  # station -> runner: what to run
+_READY = b"R"  # runner -> station: the worker is running
+_ERROR = b"E"  # runner -> station: the worker failed to start or run
+_ITEMS = b"I"  # both ways: mails, replies and stop sentinels
+_BYE = b"B"  # runner -> station: the workbench has exited; station -> runner: leave
+_HEARTBEAT = b"P"  # runner -> station: still there
+
+# interval to retry batches that hit the high-water mark of a socket
+_STALL_INTERVAL_MS = 1
+# interval to look after runners while a station is stopping
+_STOP_INTERVAL_MS = 100
+
+_STOP = object()
+
+# a pickled mail or reply: the pickle stream followed by its large buffers
+Frames = List[Any]
+
+
+def _require_zmq() -> None:
+    if zmq is None:
+        raise ImportError(
+            "pyzmq is required for ZeroMQ stations, install flexplan[extra]"
+        )
+
+
+def _default_endpoint() -> str:
+    if sys.platform == "win32":
+        return "tcp://127.0.0.1:*"
+    return f"ipc://{tempfile.gettempdir()}/flexplan-{uuid.uuid4().hex}.sock"
+
+
+def _is_local(endpoint: str) -> bool:
+    """Tell whether only processes of this host can connect to ``endpoint``."""
+    transport, _, address = endpoint.partition("://")
+    if transport in ("ipc", "inproc"):
+        return True
+    if transport != "tcp":
+        return False
+    host = address.rpartition(":")[0].strip("[]")
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        # interfaces, wildcards and host names
+        return False
+
+
+def _pack(items: Iterable[Frames]) -> List[Any]:
+    """Join pickled items into the frames of one multipart message."""
+    counts = array("I")
+    frames: List[Any] = [_ITEMS, b""]
+    for item in items:
+        counts.append(len(item))
+        frames.extend(item)
+    frames[1] = counts.tobytes()
+    return frames
+
+
+def _unpack(frames: List[Any]) -> List[Any]:
+    """Unpickle the items of a message produced by :func:`_pack`, without its
+    first frame."""
+    counts = array("I")
+    counts.frombytes(frames[0].buffer)
+    items: List[Any] = []
+    start = 1
+    for n in counts:
+        items.append(
+            buffers.loads_frames([frame.buffer for frame in frames[start : start + n]])
+        )
+        start += n
+    return items
+
+
+# a pickled item, whether it is a mail counted in the inbox depth of the station,
+# and the correlation id of the mail's future
+_Item = Tuple[Frames, bool, Optional[int]]
+
+
+class _Peer:
+    __slots__ = (
+        "identity",
+        "ready",
+        "seen",
+        "backlog",
+        "stalled",
+        "stalled_items",
+        "in_flight",
+    )
+
+    def __init__(self, identity: bytes, seen: float) -> None:
+        self.identity = identity
+        self.ready = False
+        # when the runner was last heard of
+        self.seen = seen
+        # items waiting to be sent
+        self.backlog: Deque[_Item] = deque()
+        # a batch that has hit the high-water mark, retried as it is, and its items
+        self.stalled: Optional[List[Any]] = None
+        self.stalled_items: List[_Item] = []
+        # correlation ids of the mails sent to the runner and not replied to yet
+        self.in_flight: Set[int] = set()
+
+
+class _KeyRing:
+    """The public keys of the runners allowed to connect, for the authenticator."""
+
+    def __init__(self, keys: Iterable[bytes]) -> None:
+        self.keys = set(keys)
+
+    def callback(self, domain: str, key: bytes) -> bool:
+        return key in self.keys
+
+
+class ZmqStation(Station):
+    """A station whose workers run in runner processes connected over ZeroMQ.
+
+    The station binds a ``ROUTER`` socket to ``endpoint`` (``ipc://`` or
+    ``tcp://``, a private ``ipc://`` path by default) and starts ``processes``
+    local runners. More runners, on this host or others, join with
+    ``python -m flexplan.runner <endpoint>``; each creates a worker of its own and
+    mails are spread over the runners in turn.
+
+    Runners are sent pickles to load and load what the station sends them, so
+    whoever can connect to the endpoint can run code in the station's process,
+    and the other way round. Endpoints other than ``ipc://`` and loopback
+    ``tcp://`` are refused unless the station has a CURVE ``secret_key`` (a Z85
+    key, e.g. from :func:`zmq.curve_keypair`): its socket then only admits the
+    local runners and those whose public key is in ``authorized_keys``, which
+    connect with :attr:`public_key` and a secret key of their own (see
+    :func:`run_runner`). ``insecure=True`` drops the check, for networks whose
+    hosts are all trusted.
+
+    Runners which have not been heard of for ``heartbeat_timeout`` seconds are
+    given up, along with the futures of the mails they had not replied to yet.
+    :meth:`stop` waits up to ``stop_timeout`` seconds (forever if ``None``) for
+    the runners to finish the mails they have got, then terminates local ones.
+
+    Mails travel in batches of up to ``batch_size`` per multipart message, large
+    buffers in frames of their own. Runners whose socket reaches the high-water
+    mark ``hwm`` are skipped. :meth:`send` never blocks: up to ``hwm`` mails wait
+    in the station for a runner to take them, and unless the worker is registered
+    with a ``max_inbox`` of its own, the supervisor holds further mails back (see
+    :meth:`default_inbox_limit`).
+    """
+
+    def __init__(
+        self,
+        *,
+        workbench_creator: Creator[Workbench],
+        worker_creator: Creator[Worker],
+        endpoint: Optional[str] = None,
+        processes: int = 1,
+        hwm: int = DEFAULT_HWM,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        mp_context: "Optional[AnyContext]" = None,
+        oob_threshold: int = buffers.OOB_THRESHOLD,
+        secret_key: Optional[bytes] = None,
+        authorized_keys: Iterable[bytes] = (),
+        insecure: bool = False,
+        heartbeat_timeout: float = DEFAULT_HEARTBEAT_TIMEOUT,
+        stop_timeout: Optional[float] = DEFAULT_STOP_TIMEOUT,
+    ):
+        _require_zmq()
+        super().__init__(
+            workbench_creator=workbench_creator,
+            worker_creator=worker_creator,
+        )
+        if processes < 0:
+            raise ValueError("processes must be >= 0")
+        if hwm < 1 or batch_size < 1:
+            raise ValueError("hwm and batch_size must be >= 1")
+        if heartbeat_timeout <= 0:
+            raise ValueError("heartbeat_timeout must be > 0")
+        self._bind_endpoint = _default_endpoint() if endpoint is None else endpoint
+        self._private_ipc = endpoint is None and sys.platform != "win32"
+        if secret_key is None:
+            if not insecure and not _is_local(self._bind_endpoint):
+                raise ValueError(
+                    f"Endpoint {self._bind_endpoint} is reachable from other hosts, "
+                    "whose runners could run code in this process: pass a CURVE "
+                    "secret_key, or insecure=True if all of them are trusted"
+                )
+            self._public_key: Optional[bytes] = None
+        else:
+            if not zmq.has("curve"):
+                raise ImportError("libzmq is built without CURVE support")
+            self._public_key = zmq.curve_public(secret_key)
+        self._secret_key = secret_key
+        self._key_ring = _KeyRing(authorized_keys)
+        self._authenticator: Any = None
+        self._heartbeat_timeout = heartbeat_timeout
+        self._endpoint: Optional[str] = None
+        self._processes = processes
+        self._hwm = hwm
+        self._batch_size = batch_size
+        self._mp_ctx = get_context("spawn") if mp_context is None else mp_context
+        self._oob_threshold = oob_threshold
+        self._stop_timeout = stop_timeout
+        self._stop_deadline: Optional[float] = None
+        self._spec = StationSpec(use_process_future=True)
+
+        self._invoked = False
+        self._running = False
+        self._context: Any = None
+        self._socket: Any = None
+        self._io_thread: Optional[Thread] = None
+        self._runners: "List[BaseProcess]" = []
+        self._outgoing: "NotifyQueue" = NotifyQueue()
+        self._incoming: "NotifyQueue" = NotifyQueue()
+        # mails sent to the station, and those written to a runner's socket or
+        # given up; each is only counted up by one thread
+        self._sent = 0
+        self._delivered = 0
+        self._started = Condition()
+        self._ready_count = 0
+        self._start_error: Optional[BaseException] = None
+
+        # state of the I/O thread
+        self._peers: Dict[bytes, _Peer] = {}
+        self._rotation: List[_Peer] = []
+        self._turn = 0
+        self._unassigned: Deque[Tuple[Frames, Optional[int]]] = deque()
+        self._stopping = False
+        # correlation ids of futures owned by runners are only unique per runner,
+        # so mails from runners get ids of the station's own
+        self._correlation_ids = count()
+        self._reply_routes: Dict[int, Tuple[bytes, int]] = {}
+
+    @property
+    def endpoint(self) -> Optional[str]:
+        """The endpoint runners connect to, available once the station started."""
+        return self._endpoint
+
+    @property
+    def public_key(self) -> Optional[bytes]:
+        """The CURVE public key runners connect with, if the station has a secret
+        key."""
+        return self._public_key
+
+    @override
+    def start(self):
+        if self.is_running():
+            raise RuntimeError(f"{self.__class__.__name__} is already running")
+        self._invoked = True
+        self._stopping = False
+        self._sent = self._delivered = 0
+        self._stop_deadline = None
+        self.agree_method_ids()
+        self._context = zmq.Context()
+        runner_keys: List[Tuple[bytes, bytes]] = []
+        if self._secret_key is not None:
+            from zmq.auth.thread import ThreadAuthenticator
+
+            # local runners are admitted with keys of their own
+            runner_keys = [zmq.curve_keypair() for _ in range(self._processes)]
+            self._key_ring.keys.update(public for public, _ in runner_keys)
+            self._authenticator = ThreadAuthenticator(self._context)
+            self._authenticator.start()
+            self._authenticator.configure_curve_callback(
+                credentials_provider=self._key_ring
+            )
+        socket = self._context.socket(zmq.ROUTER)
+        if self._secret_key is not None:
+            socket.curve_secretkey = self._secret_key
+            socket.curve_server = True
+        # fail instead of silently dropping mails to runners that went away, and
+        # let sends hit the high-water mark instead of dropping
+        socket.setsockopt(zmq.ROUTER_MANDATORY, 1)
+        socket.setsockopt(zmq.SNDHWM, self._hwm)
+        socket.setsockopt(zmq.RCVHWM, self._hwm)
+        socket.setsockopt(zmq.LINGER, 0)
+        try:
+            socket.bind(self._bind_endpoint)
+            self._endpoint = socket.getsockopt_string(zmq.LAST_ENDPOINT)
+            if self._private_ipc:
+                # keep other users of the host out of the temporary directory's
+                # socket
+                os.chmod(self._endpoint[len("ipc://") :], 0o600)
+        except BaseException:
+            socket.close()
+            self._stop_authenticator()
+            self._context.term()
+            raise
+        self._socket = socket
+
+        self._io_thread = Thread(target=self._serve, name="flexplan-zmq", daemon=True)
+        stop_joinable_atexit(self._io_thread)
+        self._io_thread.start()
+        for i in range(self._processes):
+            kwargs: Dict[str, Any] = {"hwm": self._hwm}
+            if runner_keys:
+                kwargs["server_key"] = self._public_key
+                kwargs["secret_key"] = runner_keys[i][1]
+            process = self._mp_ctx.Process(
+                target=run_runner,
+                args=(self._endpoint,),
+                kwargs=kwargs,
+                daemon=True,
+            )
+            stop_joinable_atexit(process)
+            process.start()
+            self._runners.append(process)
+
+        with self._started:
+            while self._ready_count < self._processes and self._start_error is None:
+                if self._started.wait(0.05):
+                    continue
+                if any(not process.is_alive() for process in self._runners):
+                    self._start_error = WorkerRuntimeError(
+                        "A runner exited before its worker started"
+                    )
+            error, self._start_error = self._start_error, None
+        if error is not None:
+            self.stop()
+            raise error
+        self._running = True
+
+    @override
+    def stop(self):
+        if not self._invoked or self._io_thread is None:
+            return
+        self._running = False
+        if self._stop_timeout is not None:
+            self._stop_deadline = time.monotonic() + self._stop_timeout
+        self._outgoing.put((_STOP, None, None))
+        self._io_thread.join()
+        self._io_thread = None
+        for process in self._runners:
+            if self._stop_deadline is not None:
+                process.join(max(0.0, self._stop_deadline - time.monotonic()))
+                if process.is_alive():
+                    process.terminate()
+            process.join()
+        self._runners.clear()
+        self._stop_authenticator()
+        self._context.term()
+        self._context = None
+
+    def _stop_authenticator(self) -> None:
+        if self._authenticator is not None:
+            self._authenticator.stop()
+            self._authenticator = None
+
+    @override
+    def is_running(self) -> bool:
+        return self._running
+
+    @override
+    def send(self, mail: Union[Mail, MailBatch]) -> None:
+        # pickled here, so that errors are reported to the sender
+        frames = buffers.dumps_frames(
+            CompactMail.encode(mail, self._method_ids), self._oob_threshold
+        )
+        future = mail.future
+        correlation_id = future.correlation_id if type(future) is RemoteFuture else None
+        self._sent += 1
+        self._outgoing.put((None, frames, correlation_id))
+
+    @override
+    def send_reply(self, reply: Reply) -> None:
+        route = self._reply_routes.pop(reply.correlation_id, None)
+        if route is None:
+            # the runner has left, nobody waits for the reply anymore
+            return
+        identity, reply.correlation_id = route
+        self._outgoing.put(
+            (identity, buffers.dumps_frames(reply, self._oob_threshold), None)
+        )
+
+    @override
+    def recv(self, timeout: Optional[float] = None) -> "MailOrError":
+        try:
+            return self._incoming.get(timeout=timeout)
+        except Empty:
+            return None
+
+    @override
+    def inbox_depth(self) -> int:
+        # mails not written to a runner's socket yet
+        return self._sent - self._delivered
+
+    @override
+    def default_inbox_limit(self) -> Optional[InboxLimit]:
+        return InboxLimit(self._hwm)
+
+    @override
+    def recv_handle(self) -> "Selectable":
+        return self._incoming
+
+    @property
+    @override
+    def spec(self) -> StationSpec:
+        return self._spec
+
+    def _serve(self) -> None:
+        socket = self._socket
+        outgoing = self._outgoing
+        poller = zmq.Poller()
+        poller.register(socket, zmq.POLLIN)
+        poller.register(outgoing, zmq.POLLIN)
+        heartbeat_ms = int(self._heartbeat_timeout * 1000 / 2)
+        try:
+            while True:
+                self._recv_all()
+                outgoing.acknowledge()
+                while True:
+                    try:
+                        target, frames, correlation_id = outgoing.get_nowait()
+                    except Empty:
+                        break
+                    if target is None:
+                        self._unassigned.append((frames, correlation_id))
+                    elif target is _STOP:
+                        self._begin_stop()
+                    elif (peer := self._peers.get(target)) is not None:
+                        peer.backlog.append((frames, False, None))
+                self._give_up_silent()
+                self._dispatch()
+                if self._stopping:
+                    if not self._peers and not any(
+                        process.is_alive() for process in self._runners
+                    ):
+                        break
+                    deadline = self._stop_deadline
+                    if deadline is not None and time.monotonic() > deadline:
+                        break
+                if any(peer.stalled is not None for peer in self._peers.values()):
+                    timeout: Optional[int] = _STALL_INTERVAL_MS
+                elif self._stopping:
+                    timeout = _STOP_INTERVAL_MS
+                elif self._peers:
+                    timeout = heartbeat_ms
+                else:
+                    timeout = None
+                poller.poll(timeout)
+        finally:
+            socket.close()
+
+    def _recv_all(self) -> None:
+        socket = self._socket
+        now = time.monotonic()
+        while True:
+            try:
+                identity, kind, *frames = socket.recv_multipart(zmq.NOBLOCK, copy=False)
+            except zmq.Again:
+                return
+            identity = identity.bytes
+            kind = kind.bytes
+            if kind == _HELLO:
+                self._welcome(identity, now)
+                continue
+            if (peer := self._peers.get(identity)) is None:
+                if kind in (_ITEMS, _HEARTBEAT):
+                    # a runner which has been given up, whose mails have been
+                    # failed already
+                    self._dismiss(identity)
+                continue
+            peer.seen = now
+            if kind == _ITEMS:
+                self._receive_items(peer, _unpack(frames))
+            elif kind == _READY:
+                peer.ready = True
+                self._rotation.append(peer)
+                with self._started:
+                    self._ready_count += 1
+                    self._started.notify_all()
+            elif kind == _ERROR:
+                error = buffers.loads_frames([frame.buffer for frame in frames])
+                with self._started:
+                    if self._start_error is None and not self._running:
+                        self._start_error = error
+                    self._started.notify_all()
+            elif kind == _BYE:
+                self._forget(identity)
+
+    def _welcome(self, identity: bytes, now: float) -> None:
+        if self._stopping:
+            self._socket.send_multipart([identity, _BYE])
+            return
+        setup = {
+            "station_spec": self._spec,
+            "workbench_creator": self._workbench_creator,
+            "worker_creator": self._worker_creator,
+            "batch_size": self._batch_size,
+            "oob_threshold": self._oob_threshold,
+            "heartbeat_interval": self._heartbeat_timeout / 4,
+        }
+        self._peers[identity] = _Peer(identity, now)
+        self._socket.send_multipart(
+            [identity, _SETUP, *buffers.dumps_frames(setup)], copy=False
+        )
+
+    def _dismiss(self, identity: bytes) -> None:
+        try:
+            self._socket.send_multipart(
+                [identity, *_pack([buffers.dumps_frames(None)])], zmq.NOBLOCK
+            )
+        except zmq.ZMQError:
+            # gone or busy, it is told again when it is heard of next
+            pass
+
+    def _receive_items(self, peer: _Peer, items: List[Any]) -> None:
+        incoming = self._incoming
+        for item in items:
+            if type(item) is Reply:
+                peer.in_flight.discard(item.correlation_id)
+            elif type(future := getattr(item, "future", None)) is RemoteFuture:
+                correlation_id = next(self._correlation_ids)
+                self._reply_routes[correlation_id] = (
+                    peer.identity,
+                    future.correlation_id,
+                )
+                item.future = RemoteFuture(correlation_id)
+            incoming.put(item)
+
+    def _give_up_silent(self) -> None:
+        """Forget the runners which have not been heard of for too long, having
+        died or lost their connection."""
+        limit = time.monotonic() - self._heartbeat_timeout
+        for peer in list(self._peers.values()):
+            if peer.seen < limit:
+                self._forget(peer.identity)
+
+    def _forget(self, identity: bytes) -> None:
+        peer = self._peers.pop(identity, None)
+        if peer is None:
+            return
+        if peer.ready:
+            self._rotation.remove(peer)
+        # mails the runner never got are handed to the others
+        requeued = [
+            (frames, correlation_id)
+            for frames, counted, correlation_id in (*peer.stalled_items, *peer.backlog)
+            if counted
+        ]
+        if self._stopping:
+            self._delivered += len(requeued)
+        else:
+            self._unassigned.extendleft(reversed(requeued))
+        # and those it got are not replied to anymore
+        if peer.in_flight:
+            error = WorkerRuntimeError("The runner was lost before replying")
+            for correlation_id in peer.in_flight:
+                self._incoming.put(Reply.new(correlation_id, exception=error))
+
+    def _begin_stop(self) -> None:
+        self._stopping = True
+        # nobody takes these mails anymore, their futures fail when the supervisor
+        # stops
+        self._delivered += len(self._unassigned)
+        self._unassigned.clear()
+        stop = buffers.dumps_frames(None)
+        for peer in self._peers.values():
+            peer.backlog.append((stop, False, None))
+
+    def _dispatch(self) -> None:
+        """Hand mails to runners in turn, then send what each runner has got."""
+        unassigned = self._unassigned
+        rotation = self._rotation
+        while unassigned:
+            # start from the next runner every time, so that single mails are
+            # spread as well
+            self._turn = (self._turn + 1) % len(rotation) if rotation else 0
+            available = [
+                peer
+                for peer in rotation[self._turn :] + rotation[: self._turn]
+                if peer.stalled is None
+            ]
+            if not available:
+                break
+            share = min(self._batch_size, -(-len(unassigned) // len(available)))
+            for peer in available:
+                for _ in range(min(share, len(unassigned))):
+                    frames, correlation_id = unassigned.popleft()
+                    peer.backlog.append((frames, True, correlation_id))
+                self._flush(peer)
+        for peer in list(self._peers.values()):
+            self._flush(peer)
+
+    def _flush(self, peer: _Peer) -> None:
+        socket = self._socket
+        backlog = peer.backlog
+        while True:
+            if peer.stalled is None:
+                if not backlog:
+                    return
+                items: List[_Item] = []
+                while backlog and len(items) < self._batch_size:
+                    items.append(backlog.popleft())
+                peer.stalled = [peer.identity, *_pack(item[0] for item in items)]
+                peer.stalled_items = items
+            try:
+                socket.send_multipart(peer.stalled, zmq.NOBLOCK, copy=False)
+            except zmq.Again:
+                return
+            except zmq.ZMQError as exc:
+                if exc.errno != zmq.EHOSTUNREACH:
+                    raise
+                self._forget(peer.identity)
+                return
+            for _, counted, correlation_id in peer.stalled_items:
+                if counted:
+                    self._delivered += 1
+                    if correlation_id is not None:
+                        peer.in_flight.add(correlation_id)
+            peer.stalled = None
+            peer.stalled_items = []
+
+
+class _Outbox(NotifyQueue):
+    """The outbox of a runner, pickling mails in the thread which puts them."""
+
+    def __init__(self, oob_threshold: int) -> None:
+        super().__init__()
+        self._oob_threshold = oob_threshold
+
+    def put(self, obj: Any, block: bool = True, timeout: Optional[float] = None):
+        frames = buffers.dumps_frames(obj, self._oob_threshold)
+        super().put((_ITEMS, frames), block, timeout)
+
+    def put_control(self, kind: bytes, frames: Sequence[Any] = ()) -> None:
+        super().put((kind, list(frames)))
+
+
+class _RunningEvent(Event):
+    """A running event which tells the station once the worker runs."""
+
+    def __init__(self, outbox: _Outbox) -> None:
+        super().__init__()
+        self._outbox = outbox
+        self._reported = False
+
+    def set(self) -> None:
+        super().set()
+        if not self._reported:
+            self._reported = True
+            self._outbox.put_control(_READY)
+
+
+class _Runner:
+    def __init__(self, socket: Any, setup: Dict[str, Any]) -> None:
+        self._socket = socket
+        self._setup = setup
+        self._batch_size: int = setup["batch_size"]
+        self._heartbeat_interval: float = setup["heartbeat_interval"]
+        self._inbox: Queue = Queue()
+        self._replybox: Queue = Queue()
+        self._outbox = _Outbox(setup["oob_threshold"])
+
+    def run(self) -> None:
+        work_thread = Thread(target=self._work, name="flexplan-runner", daemon=True)
+        work_thread.start()
+        try:
+            self._serve()
+        finally:
+            self._inbox.put(None)
+            work_thread.join()
+
+    def _work(self) -> None:
+        setup = self._setup
+        outbox = self._outbox
+        try:
+            workbench = setup["workbench_creator"].create()
+            workbench.run(
+                station_spec=setup["station_spec"],
+                worker_creator=setup["worker_creator"],
+                inbox=self._inbox,
+                outbox=outbox,
+                running_event=_RunningEvent(outbox),
+                replybox=self._replybox,
+            )
+        except BaseException as exc:
+            try:
+                frames = buffers.dumps_frames(exc)
+            except Exception:
+                frames = buffers.dumps_frames(WorkerRuntimeError(repr(exc)))
+            outbox.put_control(_ERROR, frames)
+        finally:
+            self._replybox.put(None)
+            outbox.put_control(_BYE)
+
+    def _serve(self) -> None:
+        socket = self._socket
+        outbox = self._outbox
+        poller = zmq.Poller()
+        poller.register(socket, zmq.POLLIN)
+        poller.register(outbox, zmq.POLLIN)
+        # messages waiting for the high-water mark of the socket to clear
+        pending: Deque[List[Any]] = deque()
+        leaving = False
+        heartbeat_ms = int(self._heartbeat_interval * 1000)
+        next_heartbeat = time.monotonic() + self._heartbeat_interval
+        while True:
+            while True:
+                try:
+                    kind, *frames = socket.recv_multipart(zmq.NOBLOCK, copy=False)
+                except zmq.Again:
+                    break
+                if kind.bytes != _ITEMS:
+                    continue
+                for item in _unpack(frames):
+                    if type(item) is Reply:
+                        self._replybox.put(item)
+                    else:
+                        self._inbox.put(item)
+
+            outbox.acknowledge()
+            items: List[Frames] = []
+            while True:
+                try:
+                    kind, frames = outbox.get_nowait()
+                except Empty:
+                    break
+                if kind == _ITEMS:
+                    items.append(frames)
+                    if len(items) < self._batch_size:
+                        continue
+                if items:
+                    pending.append(_pack(items))
+                    items = []
+                if kind != _ITEMS:
+                    pending.append([kind, *frames])
+                    leaving = leaving or kind == _BYE
+            if items:
+                pending.append(_pack(items))
+
+            if not pending and time.monotonic() >= next_heartbeat:
+                # the station gives up on runners it has not heard of for a while
+                pending.append([_HEARTBEAT])
+            while pending:
+                try:
+                    socket.send_multipart(pending[0], zmq.NOBLOCK, copy=False)
+                except zmq.Again:
+                    break
+                pending.popleft()
+                next_heartbeat = time.monotonic() + self._heartbeat_interval
+            if leaving and not pending:
+                return
+            poller.poll(_STALL_INTERVAL_MS if pending else heartbeat_ms)
+
+
+def run_runner(
+    endpoint: str,
+    *,
+    hwm: int = DEFAULT_HWM,
+    linger: int = 5000,
+    server_key: Optional[bytes] = None,
+    secret_key: Optional[bytes] = None,
+) -> None:
+    """Connect to the :class:`ZmqStation` bound to ``endpoint`` and run a worker
+    for it until the station stops.
+
+    :param hwm: High-water mark of the runner's socket.
+    :param linger: Milliseconds to keep delivering the last messages after the
+        worker has exited.
+    :param server_key: The :attr:`~ZmqStation.public_key` of a station with a
+        CURVE secret key, which the runner then makes sure it talks to.
+    :param secret_key: The runner's own CURVE secret key, whose public key the
+        station has to know; required with ``server_key``.
+    """
+    _require_zmq()
+    if (server_key is None) != (secret_key is None):
+        raise ValueError("server_key and secret_key go together")
+    context = zmq.Context()
+    socket = context.socket(zmq.DEALER)
+    if server_key is not None and secret_key is not None:
+        socket.curve_serverkey = server_key
+        socket.curve_secretkey = secret_key
+        socket.curve_publickey = zmq.curve_public(secret_key)
+    socket.setsockopt(zmq.SNDHWM, hwm)
+    socket.setsockopt(zmq.RCVHWM, hwm)
+    socket.setsockopt(zmq.LINGER, linger)
+    try:
+        socket.connect(endpoint)
+        socket.send(_HELLO)
+        kind, *frames = socket.recv_multipart(copy=False)
+        if kind.bytes != _SETUP:
+            return
+        setup = buffers.loads_frames([frame.buffer for frame in frames])
+        _Runner(socket, setup).run()
+    finally:
+        socket.close()
+        context.term()
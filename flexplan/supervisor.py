@@ -1,51 +1,105 @@
+import os
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import InvalidStateError
+from functools import partial
+from inspect import isfunction
+from itertools import chain, count
 from queue import Empty
+from selectors import EVENT_READ, BaseSelector, DefaultSelector, SelectorKey
+from threading import Thread
 from types import TracebackType
 from weakref import ref
 
 from typing_extensions import (
     TYPE_CHECKING,
     Any,
+    Callable,
+    Deque,
     Dict,
+    Iterator,
     List,
     Optional,
     Tuple,
     Type,
+    Union,
     cast,
     override,
 )
 
-from flexplan.datastructures.deferredbox import DeferredBox
-from flexplan.datastructures.future import Future, ProcessFutureManager
+from flexplan.autoscaling import AutoscalePolicy, Autoscaler
+from flexplan.backpressure import Gate, InboxLimit
+from flexplan.balancers import Balancer
+from flexplan.datastructures.future import Future
 from flexplan.datastructures.instancecreator import InstanceCreator
 from flexplan.errors import (
     ArgumentTypeError,
     ArgumentValueError,
+    DeadlineExceededError,
+    InboxFullError,
     WorkerNotFoundError,
     WorkerRuntimeError,
 )
-from flexplan.messages.mail import Mail, MailBox
+from flexplan.hooks import MAIL_RELAYED, STATION_STARTED, STATION_STOPPED
+from flexplan.messages.mail import (
+    ContactInfo,
+    Inbox,
+    Mail,
+    MailBatch,
+    MailBox,
+    MailMeta,
+    MailTrace,
+    RemoteFuture,
+    Reply,
+)
 from flexplan.messages.message import Message
+from flexplan.metrics import WorkerMetrics
+from flexplan.serializers import Serializer, SerializerStats, get_serializer
 from flexplan.stations.base import Station, StationSpec
-from flexplan.stations.mixins import NotifyRuntimeInfoMixin, RuntimeInfo
+from flexplan.tracing import END, ENQUEUE, RELAY, RESULT, START, traced_meta
 from flexplan.utils.inspect import get_method_class
-from flexplan.workbench.base import Workbench, WorkbenchContext, enter_worker_context
+from flexplan.workbench.base import (
+    FAILED,
+    Workbench,
+    WorkbenchContext,
+    enter_worker_context,
+)
 from flexplan.workers.base import Worker
 
 if TYPE_CHECKING:
+    from weakref import ReferenceType
+
+    from flexplan.datastructures.cancelboard import CancelBoard
     from flexplan.datastructures.instancecreator import Creator
+    from flexplan.datastructures.notifyqueue import Selectable
     from flexplan.datastructures.types import EventLike
     from flexplan.types import WorkerId, WorkerSpec
 
+# a worker class is routed to its only station, or to the balancer of its replicas
+Route = Union[Station, Balancer]
+# a mail held back from a full inbox, and the balancer which picked the station
+HeldMail = Tuple[Union[Mail, MailBatch], Optional[Balancer]]
+
 
 class Supervisor(Worker):
+    # how often replicas of workers which steal work are looked at
+    steal_interval: float = 0.005
+    # how often mails held back from full inboxes are sent again
+    held_interval: float = 0.001
+    # traced mails kept, the oldest ones are dropped
+    max_traces: int = 10000
+
     def __init__(
         self,
         worker_specs: "Optional[List[WorkerSpec]]" = None,
+        gates: "Optional[Dict[Type[Worker], Gate]]" = None,
+        tracing: bool = False,
     ):
         super().__init__()
-        _specs: "Dict[WorkerId, Tuple[Optional[str], Creator[Station]]]" = {}
+        _specs: "Dict[WorkerId, WorkerSpec]" = {}
         if worker_specs:
-            for worker_id, name, station_creator in worker_specs:
+            for spec in worker_specs:
+                worker_id, name, replicas = spec.worker_id, spec.name, spec.replicas
                 if not isinstance(worker_id, str):
                     raise ArgumentTypeError(
                         f"Unexpected worker_id type: {type(worker_id)}"
@@ -56,38 +110,81 @@ class Supervisor(Worker):
                     name = f"station_{len(_specs)}"
                 elif not isinstance(name, str):
                     raise ArgumentTypeError(f"Unexpected name type: {type(name)}")
-                if not isinstance(station_creator, InstanceCreator):
+                if not isinstance(spec.station_creator, InstanceCreator):
                     raise ArgumentTypeError(
-                        f"Unexpected station creator type: {type(station_creator)}"
+                        f"Unexpected station creator type: {type(spec.station_creator)}"
+                    )
+                if not isinstance(replicas, int) or replicas < 1:
+                    raise ArgumentValueError(f"Unexpected replicas: {replicas!r}")
+                if (autoscale := spec.autoscale) is not None:
+                    if not isinstance(autoscale, AutoscalePolicy):
+                        raise ArgumentTypeError(
+                            f"Unexpected autoscale type: {type(autoscale)}"
+                        )
+                    replicas = min(
+                        max(replicas, autoscale.min_replicas), autoscale.max_replicas
                     )
-                _specs[worker_id] = (name, station_creator)
+                _specs[worker_id] = spec._replace(name=name, replicas=replicas)
         self._specs = _specs
-        self._worker_stations: "Dict[WorkerId, Station]" = {}
-        self._process_future_manager: Optional[ProcessFutureManager] = None
+        self._worker_stations: "Dict[WorkerId, List[Station]]" = {}
+        self._balancers: "Dict[WorkerId, Balancer]" = {}
+        self._scalers: "Dict[WorkerId, Autoscaler]" = {}
+        # replicas being started, and replicas being drained before they are stopped
+        self._starting: "Dict[WorkerId, Tuple[Station, Thread]]" = {}
+        self._draining: "Dict[WorkerId, Station]" = {}
+        self._next_autoscale = 0.0
+        # workers whose replicas take queued mails off each other
+        self._stealing: "Dict[WorkerId, Balancer]" = {}
+        self._next_steal = 0.0
+        self._inbox_limits: "Dict[Station, InboxLimit]" = {}
+        # mails held back from full inboxes, and the gates which keep further calls
+        # to their workers waiting in Workshop.submit meanwhile
+        self._held: "Dict[Station, Deque[HeldMail]]" = {}
+        self._gates: "Dict[Type[Worker], Gate]" = {} if gates is None else gates
+        self._context: "Optional[ReferenceType[SupervisorContext]]" = None
+        # how often workers report metrics, None if they record none
+        self._metrics_interval: Optional[float] = None
+        self._metrics_reports: "Dict[Tuple[Type[Worker], str], WorkerMetrics]" = {}
+        self._tracing = tracing
+        self._contact = ContactInfo("Supervisor", os.getpid())
+        # traced mails by span ID, the spans of mails sent to other processes by
+        # correlation ID and when their replies came back
+        self._traces: "OrderedDict[int, MailMeta]" = OrderedDict()
+        self._traced_replies: "Dict[int, int]" = {}
+        self._reply_times: "Dict[int, int]" = {}
+        self._class_routes: "Dict[Type[Worker], Route]" = {}
+        self._routes: "Dict[Callable, Optional[Route]]" = {}
+        self._correlation_ids = count()
+        self._pending_futures: Dict[int, Future] = {}
 
     def __post_init__(self):
         worker_stations = self._worker_stations
         if context := SupervisorContext.get_context():
             context.set_worker_stations(worker_stations)
-        info = RuntimeInfo(process_future_manager_address=None)
-        for worker_id, (name, station_creator) in self._specs.items():
-            station = station_creator.create()
-            if station.spec.use_process_future:
-                if self._process_future_manager is None:
-                    self._process_future_manager = ProcessFutureManager()
-                    self._process_future_manager.start()
-                    info.process_future_manager_address = (
-                        self._process_future_manager.address
-                    )
-                    print(f"{info.process_future_manager_address=}")
-            if isinstance(station, NotifyRuntimeInfoMixin):
-                station.notify_runtime_info(info)
-            print(f"Start, {station=}")
-            station.start()
-            print("Started")
-            worker_stations[worker_id] = station
-        print("222")
-        print(f"{worker_stations=}")
+            self._context = ref(context)
+            self._metrics_interval = context.station_spec.metrics_interval
+        for worker_id, spec in self._specs.items():
+            stations = worker_stations[worker_id] = []
+            for _ in range(spec.replicas):
+                station = self._create_station(spec.station_creator, spec.serializer)
+                station.start()
+                if STATION_STARTED:
+                    STATION_STARTED.fire(station)
+                stations.append(station)
+                self._limit_inbox(spec, station)
+            balancer: Optional[Balancer] = None
+            if spec.autoscale is not None:
+                balancer = self._scalers[worker_id] = Autoscaler(
+                    spec.balancer_creator.create(), spec.autoscale
+                )
+            elif spec.replicas > 1:
+                balancer = spec.balancer_creator.create()
+            if balancer is not None:
+                balancer.bind(stations)
+                self._balancers[worker_id] = balancer
+                if spec.steal:
+                    self._stealing[worker_id] = balancer
+        self._build_routes()
 
     def __exit__(
         self,
@@ -95,74 +192,560 @@ class Supervisor(Worker):
         exc_val: Optional[BaseException],
         exc_tb: Optional[TracebackType],
     ) -> None:
-        for station in self._worker_stations.values():
+        held, self._held = self._held, {}
+        for mails in held.values():
+            for mail, _ in mails:
+                if mail.future is not None and not mail.future.done():
+                    mail.future.set_exception(
+                        WorkerRuntimeError("Workshop stopped before relaying the mail")
+                    )
+        for gate in self._gates.values():
+            gate.set()
+        starting, self._starting = self._starting, {}
+        for station, thread in starting.values():
+            thread.join()
+            station.stop()
+        for station in self.iter_stations():
             station.stop()
-        if self._process_future_manager is not None:
-            self._process_future_manager.shutdown()
-            self._process_future_manager = None
+            if STATION_STOPPED:
+                STATION_STOPPED.fire(station)
+            while (item := station.recv(0)) is not None:
+                if isinstance(item, Reply):
+                    self.complete(item, station)
+                    continue
+                future = getattr(item, "future", None)
+                if future is not None and type(future) is not RemoteFuture:
+                    future.set_exception(
+                        WorkerRuntimeError("Workshop stopped before relaying the mail")
+                    )
+        pending_futures, self._pending_futures = self._pending_futures, {}
+        for future in pending_futures.values():
+            if not future.done():
+                future.set_exception(
+                    WorkerRuntimeError("Station stopped before replying")
+                )
 
-    def relay(self, mail: Mail):
-        instruction = mail.instruction
+    def maintain(self) -> Optional[float]:
+        """Scale the replicas of autoscaled workers and move queued mails between
+        replicas of workers which steal work, when it is due.
+
+        :return: Seconds until it is due again, or ``None`` if there is nothing to
+            maintain.
+        """
+        delay: Optional[float] = None
+        if self._held:
+            self._send_held()
+            if self._held:
+                delay = self.held_interval
+        if self._scalers or self._stealing:
+            now = time.monotonic()
+            if self._scalers:
+                if now >= self._next_autoscale:
+                    self._next_autoscale = now + self._autoscale(now)
+                if delay is None or self._next_autoscale - now < delay:
+                    delay = self._next_autoscale - now
+            if self._stealing:
+                if now >= self._next_steal:
+                    self._steal()
+                    self._next_steal = now + self.steal_interval
+                if delay is None or self._next_steal - now < delay:
+                    delay = self._next_steal - now
+        return delay
+
+    def _steal(self) -> None:
+        # an inbox which has run dry takes half of the deepest inbox of its siblings,
+        # whose mails wait for an earlier one; replicas being drained give their
+        # mails away but take none
+        for worker_id, balancer in self._stealing.items():
+            depths = {
+                station: station.inbox_depth()
+                for station in self._worker_stations[worker_id]
+            }
+            thieves = [station for station in balancer.stations if not depths[station]]
+            if not thieves:
+                continue
+            # what the thieves take is not taken from them again in the same round
+            for thief in thieves:
+                del depths[thief]
+            for thief in thieves:
+                if not depths:
+                    break
+                victim = max(depths, key=depths.__getitem__)
+                if not depths[victim]:
+                    break
+                mails = victim.steal((depths[victim] + 1) // 2)
+                for mail in mails:
+                    self._move(mail, victim, thief, balancer)
+                depths[victim] -= len(mails)
+
+    def _move(
+        self,
+        mail: Union[Mail, MailBatch],
+        victim: Station,
+        thief: Station,
+        balancer: Balancer,
+    ) -> None:
+        """Send a mail taken out of the inbox of ``victim`` to ``thief`` instead."""
+        future = mail.future
+        if type(future) is RemoteFuture:
+            # the thief replies with a correlation id of its own
+            correlation_id = future.correlation_id
+            future = self._pending_futures.pop(correlation_id, None)
+            if self._traced_replies:
+                self._traced_replies.pop(correlation_id, None)
+            if future is None:
+                # cancelled meanwhile
+                return
+            mail.future = future
+        elif future is not None and future.cancelled():
+            return
+        balancer.on_stolen(victim, future)
+        try:
+            if (
+                not self._inbox_limits
+                or (limit := self._inbox_limits.get(thief)) is None
+                or self._admit(thief, limit, mail, balancer)
+            ):
+                self._send(thief, mail, balancer)
+        except Exception as exc:
+            if future is not None and not future.done():
+                future.set_exception(exc)
+
+    def _autoscale(self, now: float) -> float:
+        """Scale the replicas of autoscaled workers.
+
+        A replica is started in the background and takes mails once it runs. A
+        replica to be removed takes no new mails, and is stopped once its inbox is
+        empty and all its futures are completed.
+        """
+        interval = None
+        for worker_id, scaler in self._scalers.items():
+            if worker_id in self._starting:
+                self._finish_start(worker_id, scaler)
+            elif worker_id in self._draining:
+                self._finish_drain(worker_id, scaler)
+            elif (decision := scaler.decide(now)) > 0:
+                self._start_replica(worker_id)
+            elif decision < 0:
+                self._drain_replica(worker_id, scaler)
+            if interval is None or scaler.policy.interval < interval:
+                interval = scaler.policy.interval
+        assert interval is not None
+        return interval
+
+    def _create_station(
+        self,
+        station_creator: "Creator[Station]",
+        serializer: "Optional[Union[str, Serializer]]" = None,
+    ) -> Station:
+        station = station_creator.create()
+        spec = station.spec
+        spec.metrics_interval = self._metrics_interval
+        spec.tracing = self._tracing
+        if serializer is not None:
+            spec.serializer = get_serializer(serializer)
+        return station
+
+    def _limit_inbox(self, spec: "WorkerSpec", station: Station) -> None:
+        inbox_limit = spec.inbox_limit or station.default_inbox_limit()
+        if inbox_limit is not None:
+            self._inbox_limits[station] = inbox_limit
+
+    def _start_replica(self, worker_id: "WorkerId") -> None:
+        spec = self._specs[worker_id]
+        station = self._create_station(spec.station_creator, spec.serializer)
+        thread = Thread(target=station.start, name="flexplan-scale-up", daemon=True)
+        thread.start()
+        self._starting[worker_id] = (station, thread)
+
+    def _finish_start(self, worker_id: "WorkerId", scaler: Autoscaler) -> None:
+        station, thread = self._starting[worker_id]
+        if thread.is_alive():
+            return
+        del self._starting[worker_id]
+        if not station.is_running():
+            # failed to start, the error has been reported by the thread
+            station.stop()
+            return
+        self._worker_stations[worker_id].append(station)
+        if STATION_STARTED:
+            STATION_STARTED.fire(station)
+        self._limit_inbox(self._specs[worker_id], station)
+        self._stations_changed()
+        scaler.bind([*scaler.stations, station])
+
+    def _drain_replica(self, worker_id: "WorkerId", scaler: Autoscaler) -> None:
+        stations = scaler.stations
+        station = min(
+            stations,
+            key=lambda station: (station.inbox_depth(), scaler.outstanding(station)),
+        )
+        scaler.bind([s for s in stations if s is not station])
+        self._draining[worker_id] = station
+
+    def _finish_drain(self, worker_id: "WorkerId", scaler: Autoscaler) -> None:
+        station = self._draining[worker_id]
+        if (
+            station.inbox_depth()
+            or scaler.outstanding(station)
+            or station in self._held
+        ):
+            return
+        del self._draining[worker_id]
+        station.stop()
+        if STATION_STOPPED:
+            STATION_STOPPED.fire(station)
+        while (item := station.recv(0)) is not None:
+            if isinstance(item, Reply):
+                self.complete(item, station)
+            elif not isinstance(item, BaseException):
+                self.relay(item, station)
+        self._worker_stations[worker_id].remove(station)
+        self._inbox_limits.pop(station, None)
+        self._stations_changed()
+        scaler.forget(station)
+
+    def _stations_changed(self) -> None:
+        context = None if self._context is None else self._context()
+        if context is not None:
+            context.set_worker_stations(self._worker_stations)
+
+    def iter_stations(self) -> Iterator[Station]:
+        """Iterate over the stations of all replicas of all workers."""
+        for stations in self._worker_stations.values():
+            yield from stations
+
+    def _build_routes(self) -> None:
+        """Index every function defined on a worker class by its target station, or
+        the balancer of its replicas.
+
+        ``None`` as a route means the instruction is handled by the supervisor itself.
+        """
+        class_routes: "Dict[Type[Worker], Route]" = {}
+        for worker_id, stations in self._worker_stations.items():
+            if not stations:
+                continue
+            # the first worker registered for a worker class takes its mails
+            class_routes.setdefault(
+                stations[0].worker_class,
+                self._balancers.get(worker_id) or stations[0],
+            )
+        routes: "Dict[Callable, Optional[Route]]" = {}
+        for attr in vars(type(self)).values():
+            if isfunction(attr):
+                routes[attr] = None
+        for worker_class, station in class_routes.items():
+            for attr in vars(worker_class).values():
+                if isfunction(attr):
+                    routes[attr] = station
+        self._class_routes = class_routes
+        self._routes = routes
+
+    def _resolve_route(self, instruction: Any) -> Optional[Route]:
         if isinstance(instruction, str):
             raise NotImplementedError("Preserved for string events/signals")
         elif not callable(instruction):
             raise ValueError(f"{instruction!r} is not callable")
 
+        cls = get_method_class(instruction)
+        if cls is None:
+            raise NotImplementedError("Simple functions are not supported yet")
+        elif cls is type(self):
+            station = None
+        elif (station := self._class_routes.get(cls)) is None:
+            raise WorkerNotFoundError(f"Worker not found: {cls!r}")
+        if isfunction(instruction):
+            # cache functions only, other callables (partials, bound methods) are
+            # usually created per call and would grow the table without bound
+            self._routes[instruction] = station
+        return station
+
+    def relay(self, mail: Union[Mail, MailBatch], origin: Optional[Station] = None):
+        """Deliver ``mail`` to the station (or supervisor method) it is meant for.
+
+        A mail from a worker process carries a :class:`RemoteFuture`; it is swapped
+        for a local future, whose outcome is replied to the ``origin`` station.
+        """
+        instruction = mail.instruction
+        if type(remote := mail.future) is RemoteFuture:
+            if origin is None:
+                raise WorkerRuntimeError(f"Cannot reply to {remote!r}")
+            mail.future = Future()
+            mail.future.add_done_callback(
+                partial(self._reply, origin, remote.correlation_id)
+            )
+        future = mail.future
+        meta = None
+        if self._tracing and (meta := traced_meta(mail)) is not None:
+            meta.record(RELAY, self._contact)
         try:
-            cls = get_method_class(instruction)
-            if cls is None:
-                raise NotImplementedError("Simple functions are not supported yet")
-            elif cls is type(self):
+            if future is not None and future.cancelled():
+                return
+            if (deadline := mail.deadline) is not None and time.time() >= deadline:
+                raise DeadlineExceededError(f"Deadline of {mail!r} has passed")
+            try:
+                route = self._routes[instruction]
+            except (KeyError, TypeError):
+                route = self._resolve_route(instruction)
+
+            balancer: Optional[Balancer] = None
+            if route is None:
                 # supervisor method
-                # TODO: refactor duplicated code
-                if (box := mail.future) is not None:
-                    if isinstance(box, DeferredBox):
-                        future: Future = Future()
-                        box.set(future)
-                        mail.future = future
-                    else:
-                        future = cast(Future, box)
-                    result = instruction(self, *mail.args, **mail.kwargs)
+                if isinstance(mail, MailBatch):
+                    raise ValueError("Batches cannot be relayed to the supervisor")
+                if meta is not None:
+                    meta.record(START, self._contact)
+                result = instruction(self, *mail.args, **mail.kwargs)
+                if future is not None:
                     future.set_result(result)
-                else:
-                    result = instruction(self, *mail.args, **mail.kwargs)
+                if meta is not None:
+                    meta.record(END, self._contact)
+                    self.record_trace(meta)
             else:
-                station: Optional[Station] = None
-                for worker_station in self._worker_stations.values():
-                    print(f"{cls=}, {worker_station.worker_class=}")
-                    if cls is worker_station.worker_class:
-                        station = worker_station
-                        break
-                if station is None:
-                    raise WorkerNotFoundError(f"Worker not found: {cls!r}")
-                if (box := mail.future) is not None:
-                    if isinstance(box, DeferredBox):
-                        if station.spec.use_process_future:
-                            print("ProcessFuture")
-                            future = self._process_future_manager.Future()
-                        else:
-                            print("Normal Future")
-                            future: Future = Future()
-                        box.set(future)
-                        mail.future = future
-                    else:
-                        future = cast(Future, box)
-                station.send(mail)
+                if isinstance(route, Balancer):
+                    balancer = route
+                    station = balancer.select()
+                else:
+                    station = route
+                if (
+                    not self._inbox_limits
+                    or (limit := self._inbox_limits.get(station)) is None
+                    or self._admit(station, limit, mail, balancer)
+                ):
+                    self._send(station, mail, balancer)
         except BaseException as exc:
-            if (box := mail.future) is not None:
-                if isinstance(box, DeferredBox):
-                    future: Future = Future()
-                    box.set(future)
-                    mail.future = future
-                future: Future = Future()
+            if future is not None and not future.done():
+                future.set_exception(exc)
             if not isinstance(exc, Exception):
                 raise
 
+    def _send(
+        self,
+        station: Station,
+        mail: Union[Mail, MailBatch],
+        balancer: Optional[Balancer],
+    ) -> None:
+        future = mail.future
+        correlation_id: Optional[int] = None
+        if (
+            future is not None
+            and type(future) is Future
+            and station.spec.use_process_future
+        ):
+            # the future stays here, the station replies with a correlation id
+            correlation_id = next(self._correlation_ids)
+            self._pending_futures[correlation_id] = future
+            mail.future = RemoteFuture(correlation_id)
+            if (board := station.spec.cancellations) is not None:
+                future.add_done_callback(
+                    partial(self._propagate_cancel, board, correlation_id)
+                )
+        if self._metrics_interval is not None:
+            mail.sent_at = time.monotonic_ns()
+        if self._tracing and (meta := traced_meta(mail)) is not None:
+            meta.record(ENQUEUE, self._contact)
+            if correlation_id is not None:
+                self._traced_replies[correlation_id] = meta.span_id
+        try:
+            station.send(mail)
+        except BaseException:
+            if correlation_id is not None:
+                self._pending_futures.pop(correlation_id, None)
+                mail.future = future
+            raise
+        if balancer is not None:
+            # relay has replaced remote futures by now
+            balancer.on_sent(station, cast(Optional[Future], future))
+        if MAIL_RELAYED:
+            MAIL_RELAYED.fire(mail, station)
+
+    def _propagate_cancel(
+        self, board: "CancelBoard", correlation_id: int, future: Future
+    ) -> None:
+        # the worker skips the mail without replying; mails moved to another replica
+        # since have been given another correlation id
+        if (
+            future.cancelled()
+            and self._pending_futures.pop(correlation_id, None) is not None
+        ):
+            board.cancel(correlation_id)
+
+    def _admit(
+        self,
+        station: Station,
+        limit: InboxLimit,
+        mail: Union[Mail, MailBatch],
+        balancer: Optional[Balancer],
+    ) -> bool:
+        """Apply the overflow policy of ``limit`` if the inbox of ``station`` is full.
+
+        :return: ``True`` if ``mail`` is to be sent now.
+        """
+        held = self._held.get(station)
+        if held is None and station.inbox_depth() < limit.max_inbox:
+            return True
+        overflow = limit.overflow
+        if overflow == "block":
+            if held is None:
+                held = self._held[station] = deque()
+                if (gate := self._gates.get(station.worker_class)) is not None:
+                    gate.clear()
+            held.append((mail, balancer))
+            return False
+        elif overflow == "fail":
+            raise InboxFullError(
+                f"Inbox of {station.worker_class.__name__} is full "
+                f"({limit.max_inbox} mails)"
+            )
+        elif overflow == "drop_oldest":
+            dropped = station.steal(1)
+            for oldest in dropped:
+                self._drop(oldest)
+            if dropped:
+                return True
+        self._drop(mail)
+        return False
+
+    def _drop(self, mail: Union[Mail, MailBatch]) -> None:
+        future = mail.future
+        if type(future) is RemoteFuture:
+            future = self._pending_futures.pop(future.correlation_id, None)
+        if future is not None:
+            future.cancel()
 
-def func(future):
-    import os
+    def _send_held(self) -> None:
+        for station in list(self._held):
+            held = self._held[station]
+            room = self._inbox_limits[station].max_inbox - station.inbox_depth()
+            while held and room > 0:
+                mail, balancer = held.popleft()
+                if mail.future is not None and mail.future.cancelled():
+                    continue
+                room -= 1
+                deadline = mail.deadline
+                try:
+                    if deadline is not None and time.time() >= deadline:
+                        raise DeadlineExceededError(f"Deadline of {mail!r} has passed")
+                    self._send(station, mail, balancer)
+                except Exception as exc:
+                    if mail.future is not None and not mail.future.done():
+                        mail.future.set_exception(exc)
+            if held:
+                continue
+            del self._held[station]
+            worker_class = station.worker_class
+            if (gate := self._gates.get(worker_class)) is not None and not any(
+                other.worker_class is worker_class for other in self._held
+            ):
+                gate.set()
+
+    def inbox_depths(self) -> "Dict[WorkerId, List[int]]":
+        """Get the number of mails waiting for each replica of every worker,
+        including mails held back from full inboxes."""
+        return {
+            worker_id: [
+                station.inbox_depth() + len(self._held.get(station, ()))
+                for station in stations
+            ]
+            for worker_id, stations in self._worker_stations.items()
+        }
+
+    def record_metrics(
+        self, worker_class: Type[Worker], reporter_id: str, metrics: WorkerMetrics
+    ) -> None:
+        """Keep the latest metrics a replica of ``worker_class`` has reported."""
+        self._metrics_reports[(worker_class, reporter_id)] = metrics
+
+    def record_trace(self, meta: MailMeta) -> None:
+        """Keep a traced mail a worker has handled."""
+        if (replied := self._reply_times.pop(meta.span_id, None)) is not None:
+            assert meta.trace is not None
+            meta.trace.append(MailTrace(RESULT, replied, self._contact))
+        traces = self._traces
+        traces[meta.span_id] = meta
+        while len(traces) > self.max_traces:
+            traces.popitem(last=False)
+
+    def traces(self) -> List[MailMeta]:
+        """Get the traced mails kept, oldest first."""
+        return list(self._traces.values())
+
+    def stats(self) -> "Dict[str, Any]":
+        """Get the metrics of the supervisor, which relays mails, and the metrics
+        and inbox depths of every worker, keyed by worker ID.
+
+        Metrics of all replicas of a worker are added up, including replicas which
+        have been stopped since. Workers in other processes report them every
+        ``metrics_interval`` seconds.
+        """
+        merged: "Dict[Type[Worker], WorkerMetrics]" = {}
+        for (worker_class, _), metrics in list(self._metrics_reports.items()):
+            if (total := merged.get(worker_class)) is None:
+                total = merged[worker_class] = WorkerMetrics()
+            total.merge(metrics)
+        depths = self.inbox_depths()
+        workers: "Dict[WorkerId, Dict[str, Any]]" = {}
+        for worker_id, stations in self._worker_stations.items():
+            metrics = (
+                merged.get(stations[0].worker_class) if stations else None
+            ) or WorkerMetrics()
+            serialization = SerializerStats()
+            serialization.merge(metrics.serialization)
+            # replies read and sent on this side, replicas may share a serializer
+            for serializer in {
+                id(s.spec.serializer): s.spec.serializer for s in stations
+            }.values():
+                serialization.merge(serializer.stats)
+            workers[worker_id] = {
+                "name": self._specs[worker_id].name,
+                "inbox_depth": depths[worker_id],
+                "methods": metrics.summary(),
+                "serialization": serialization.summary(),
+            }
+        context = None if self._context is None else self._context()
+        own = None if context is None else context.metrics
+        return {
+            "supervisor": (own or WorkerMetrics()).summary(),
+            "workers": workers,
+        }
+
+    @staticmethod
+    def _reply(origin: Station, correlation_id: int, future: Future) -> None:
+        serializer = origin.spec.serializer
+        if future.cancelled():
+            reply = Reply.new(
+                correlation_id,
+                exception=WorkerRuntimeError("Mail was cancelled"),
+                serializer=serializer,
+            )
+        elif (exc := future.exception()) is not None:
+            reply = Reply.new(correlation_id, exception=exc, serializer=serializer)
+        else:
+            reply = Reply.new(
+                correlation_id, result=future.result(), serializer=serializer
+            )
+        try:
+            origin.send_reply(reply)
+        except Exception:
+            # the origin has stopped meanwhile, nobody waits for the reply anymore
+            pass
 
-    print(f"Future done {future.result()=} {os.getpid()=}")
+    def complete(self, reply: Reply, origin: Optional[Station] = None) -> None:
+        """Complete the future a station (``origin``, if known) has replied to."""
+        future = self._pending_futures.pop(reply.correlation_id, None)
+        if future is not None and not future.done():
+            try:
+                reply.resolve(
+                    future, None if origin is None else origin.spec.serializer
+                )
+            except InvalidStateError:
+                # cancelled by the caller in the meantime
+                pass
+        if self._traced_replies:
+            span_id = self._traced_replies.pop(reply.correlation_id, None)
+            if span_id is not None:
+                # the worker reports the trace right after the reply
+                self._reply_times[span_id] = time.monotonic_ns()
 
 
 class SupervisorContext(WorkbenchContext):
@@ -177,37 +760,99 @@ class SupervisorContext(WorkbenchContext):
         super().__init__(station_spec=station_spec, worker=worker, outbox=outbox)
         self._workbench = ref(workbench)
 
-    def set_worker_stations(self, worker_stations: "Dict[WorkerId, Station]"):
+    def set_worker_stations(self, worker_stations: "Dict[WorkerId, List[Station]]"):
         workbench = self._workbench()
         if workbench is None:
             raise WorkerRuntimeError(f"Workbench {self._worker_cls!r} is not available")
         workbench.set_worker_stations(worker_stations)
 
     @override
-    def handle(self, mail: Mail) -> Any:
+    def handle(
+        self,
+        mail: "Union[Mail, MailBatch, Reply]",
+        origin: Optional[Station] = None,
+    ) -> Any:
         try:
             if supervisor := cast(Optional[Supervisor], self._worker_ref()):
-                supervisor.relay(mail)
+                if type(mail) is Reply:
+                    supervisor.complete(mail, origin)
+                else:
+                    supervisor.relay(mail, origin)
             else:
                 raise WorkerRuntimeError(
                     f"Supervisor {self._worker_cls!r} is not available"
                 )
         except BaseException as exc:
-            if mail.future:
-                mail.future.set_exception(exc)
+            future = getattr(mail, "future", None)
+            if future is not None and type(future) is not RemoteFuture:
+                future.set_exception(exc)
             if not isinstance(exc, Exception):
                 raise
+            return FAILED
         finally:
             del self, mail
 
 
 class SupervisorWorkbench(Workbench):
+    # interval used to poll stations (or an inbox) which cannot be selected on
+    poll_interval: float = 0.001
+
     def __init__(self):
         super().__init__()
-        self._worker_stations: Optional[Dict[WorkerId, Station]] = None
+        self._worker_stations: Optional[Dict[WorkerId, List[Station]]] = None
+        self._stations_changed = False
 
-    def set_worker_stations(self, worker_stations: "Dict[WorkerId, Station]"):
+    def set_worker_stations(self, worker_stations: "Dict[WorkerId, List[Station]]"):
         self._worker_stations = worker_stations
+        self._stations_changed = True
+
+    def _watch_stations(self, selector: BaseSelector) -> List[Station]:
+        """(Re)register the outboxes of worker stations with ``selector``.
+
+        :return: Stations that cannot be selected on and have to be polled.
+        """
+        self._stations_changed = False
+        for key in list(selector.get_map().values()):
+            if key.data is not None:
+                selector.unregister(key.fileobj)
+        polled: List[Station] = []
+        if self._worker_stations is None:
+            return polled
+        for station in chain.from_iterable(self._worker_stations.values()):
+            handle = station.recv_handle()
+            if handle is None:
+                polled.append(station)
+                continue
+            selector.register(
+                handle,
+                EVENT_READ,
+                (station, getattr(handle, "acknowledge", None)),
+            )
+        return polled
+
+    @staticmethod
+    def _drain_station(station: Station, context: "SupervisorContext") -> None:
+        while (worker_mail := station.recv(0)) is not None:
+            if isinstance(worker_mail, BaseException):
+                raise WorkerRuntimeError() from worker_mail
+            context.handle(worker_mail, station)
+
+    @staticmethod
+    def _drain_inbox(inbox: "Inbox", context: "SupervisorContext") -> bool:
+        """Handle all mails queued in ``inbox``.
+
+        :return: ``True`` if the stop sentinel has been received.
+        """
+        while True:
+            try:
+                mail = inbox.get_nowait()
+            except Empty:
+                return False
+            if mail is None:
+                return True
+            elif isinstance(mail, BaseException):
+                raise WorkerRuntimeError() from mail
+            context.handle(mail)
 
     @override
     def run(
@@ -215,7 +860,7 @@ class SupervisorWorkbench(Workbench):
         *,
         station_spec: "StationSpec",
         worker_creator: "Creator[Worker]",
-        inbox: "MailBox",
+        inbox: "Inbox",
         outbox: "MailBox",
         running_event: "Optional[EventLike]" = None,
         **kwargs,
@@ -245,26 +890,60 @@ class SupervisorWorkbench(Workbench):
                 Mail.new(message=Message(Supervisor.__post_init__).to(Supervisor))
             )
 
-        with enter_worker_context(supervisor):
-            while is_running():
-                if self._worker_stations is not None:
-                    for station in self._worker_stations.values():
-                        if worker_mail := station.recv(0):
-                            context.handle(worker_mail)
-                try:
-                    mail = inbox.get(timeout=0)
-                except Empty:
-                    continue
-                if mail is None:
-                    break
-                elif isinstance(mail, BaseException):
-                    raise WorkerRuntimeError() from mail
-                context.handle(mail)
+        # Instead of spinning over every queue, block on a single selector covering
+        # the inbox and the outboxes of all worker stations, and only drain the
+        # ones which are ready.
+        selector = DefaultSelector()
+        inbox_watched = hasattr(inbox, "fileno")
+        inbox_acknowledge = getattr(inbox, "acknowledge", None)
+        if inbox_watched:
+            selector.register(cast("Selectable", inbox), EVENT_READ, None)
+        polled = self._watch_stations(selector)
+
+        with enter_worker_context(supervisor), selector:
+            # mails may have been queued before the doorbells were created
+            ready: "Optional[List[Tuple[SelectorKey, int]]]" = [
+                (key, EVENT_READ) for key in selector.get_map().values()
+            ]
+            stopping = False
+            while not stopping and is_running():
+                if ready is None:
+                    timeout = (
+                        self.poll_interval if polled or not inbox_watched else None
+                    )
+                    if (delay := supervisor.maintain()) is not None and (
+                        timeout is None or delay < timeout
+                    ):
+                        timeout = delay
+                    ready = selector.select(timeout)
+                if self._stations_changed:
+                    polled = self._watch_stations(selector)
+                    ready.extend(
+                        (key, EVENT_READ)
+                        for key in selector.get_map().values()
+                        if key.data is not None
+                    )
+                check_inbox = not inbox_watched
+                for key, _ in ready:
+                    if key.data is None:
+                        check_inbox = True
+                        continue
+                    station, acknowledge = key.data
+                    if acknowledge is not None:
+                        acknowledge()
+                    self._drain_station(station, context)
+                for station in polled:
+                    self._drain_station(station, context)
+                if check_inbox:
+                    if inbox_acknowledge is not None:
+                        inbox_acknowledge()
+                    stopping = self._drain_inbox(inbox, context)
+                ready = None
+
             while not inbox.empty():
                 if self._worker_stations is not None:
-                    for station in self._worker_stations.values():
-                        if worker_mail := station.recv(0):
-                            context.handle(worker_mail)
+                    for station in chain.from_iterable(self._worker_stations.values()):
+                        self._drain_station(station, context)
                 mail = inbox.get()
                 if mail is None:
                     continue
@@ -0,0 +1,206 @@
+"""Tracing of mails through the workshop.
+
+A sampled mail records every hop it takes in its :class:`MailMeta`:
+
+``submit``: sent by the workshop, or by a worker handling a traced mail.
+``relay``: taken by the supervisor.
+``enqueue``: put into the inbox of a station.
+``dequeue``: taken from the inbox by the workbench.
+``start`` and ``end``: the worker method was called, and has returned with its
+result set (or sent back to the supervisor).
+``result``: the supervisor has completed the caller's future with the reply of a
+worker in another process.
+
+Timestamps are :func:`time.monotonic_ns` values, which are comparable across the
+processes of one host.
+"""
+
+import json
+import os
+import random
+import time
+from contextvars import ContextVar
+
+from typing_extensions import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from flexplan.messages.mail import ContactInfo, Mail, MailMeta, MailTrace
+
+__all__ = (
+    "TraceFormat",
+    "chrome_trace",
+    "otlp_trace",
+    "write_trace",
+)
+
+SUBMIT = "submit"
+RELAY = "relay"
+ENQUEUE = "enqueue"
+DEQUEUE = "dequeue"
+START = "start"
+END = "end"
+RESULT = "result"
+
+TraceFormat = Literal["chrome", "otlp"]
+
+# the traced mail being handled, whose span is the parent of mails sent meanwhile
+current_trace: "ContextVar[Optional[MailMeta]]" = ContextVar(
+    "flexplan_current_trace", default=None
+)
+
+
+def start_span(
+    mail: Mail, sender: ContactInfo, parent: Optional[MailMeta] = None
+) -> None:
+    """Trace ``mail`` from now on, as a child span of ``parent`` if given."""
+    instruction = mail.instruction
+    meta = mail.meta = MailMeta(
+        sender=sender,
+        receivers=[],
+        trace=[],
+        name=getattr(instruction, "__qualname__", None) or repr(instruction),
+        trace_id=random.getrandbits(128) if parent is None else parent.trace_id,
+        span_id=random.getrandbits(64),
+        parent_id=None if parent is None else parent.span_id,
+    )
+    meta.record(SUBMIT, sender)
+
+
+def traced_meta(mail: Any) -> Optional[MailMeta]:
+    """Get the meta of ``mail`` if it is traced."""
+    meta = getattr(mail, "meta", None)
+    if meta is None or meta.trace is None:
+        return None
+    return meta
+
+
+def _hops(meta: MailMeta) -> List[MailTrace]:
+    # hops recorded in different processes arrive in order of their processes
+    return sorted(meta.trace or (), key=lambda hop: hop.timestamp)
+
+
+def chrome_trace(spans: Iterable[MailMeta]) -> Dict[str, Any]:
+    """Convert traced mails into the Chrome trace event format, which
+    ``chrome://tracing`` and Perfetto open.
+
+    The time between two hops of a mail is an event named after the earlier hop,
+    on the track of where it took place.
+    """
+    events: List[Dict[str, Any]] = []
+    tracks: Dict[Tuple[int, str], int] = {}
+    for meta in spans:
+        hops = _hops(meta)
+        for hop, following in zip(hops, hops[1:]):
+            contact = hop.contact_info
+            key = (contact.pid, f"{contact.name} {contact.station}".strip())
+            if (tid := tracks.get(key)) is None:
+                tid = tracks[key] = len(tracks) + 1
+            events.append(
+                {
+                    "name": f"{meta.name} {hop.hop}",
+                    "cat": hop.hop,
+                    "ph": "X",
+                    "ts": hop.timestamp / 1000,
+                    "dur": (following.timestamp - hop.timestamp) / 1000,
+                    "pid": contact.pid,
+                    "tid": tid,
+                    "args": {
+                        "trace_id": f"{meta.trace_id:032x}",
+                        "span_id": f"{meta.span_id:016x}",
+                        "parent_id": None
+                        if meta.parent_id is None
+                        else f"{meta.parent_id:016x}",
+                    },
+                }
+            )
+    for (pid, name), tid in tracks.items():
+        events.append(
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": name},
+            }
+        )
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def otlp_trace(spans: Iterable[MailMeta]) -> Dict[str, Any]:
+    """Convert traced mails into OTLP/JSON spans, with every hop as an event of
+    the span of its mail."""
+    # monotonic timestamps to the wall clock, which OTLP expects
+    offset = time.time_ns() - time.monotonic_ns()
+    otlp_spans: List[Dict[str, Any]] = []
+    for meta in spans:
+        hops = _hops(meta)
+        if not hops:
+            continue
+        span: Dict[str, Any] = {
+            "traceId": f"{meta.trace_id:032x}",
+            "spanId": f"{meta.span_id:016x}",
+            "name": meta.name,
+            "kind": 1,
+            "startTimeUnixNano": str(hops[0].timestamp + offset),
+            "endTimeUnixNano": str(hops[-1].timestamp + offset),
+            "attributes": [
+                {"key": "flexplan.sender", "value": {"stringValue": meta.sender.name}}
+            ],
+            "events": [
+                {
+                    "timeUnixNano": str(hop.timestamp + offset),
+                    "name": hop.hop,
+                    "attributes": [
+                        {
+                            "key": "flexplan.contact",
+                            "value": {"stringValue": hop.contact_info.name},
+                        },
+                        {
+                            "key": "process.pid",
+                            "value": {"intValue": str(hop.contact_info.pid)},
+                        },
+                    ],
+                }
+                for hop in hops
+            ],
+        }
+        if meta.parent_id is not None:
+            span["parentSpanId"] = f"{meta.parent_id:016x}"
+        otlp_spans.append(span)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": "flexplan"}}
+                    ]
+                },
+                "scopeSpans": [{"scope": {"name": "flexplan"}, "spans": otlp_spans}],
+            }
+        ]
+    }
+
+
+def write_trace(
+    path: Union[str, "os.PathLike[str]"],
+    spans: Iterable[MailMeta],
+    format: TraceFormat = "chrome",
+) -> None:
+    """Write traced mails to ``path`` in the Chrome trace event format or as
+    OTLP/JSON."""
+    if format == "chrome":
+        data = chrome_trace(spans)
+    elif format == "otlp":
+        data = otlp_trace(spans)
+    else:
+        raise ValueError(f"Unexpected trace format: {format!r}")
+    with open(path, "w") as file:
+        json.dump(data, file)
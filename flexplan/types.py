@@ -1,12 +1,26 @@
-from typing_extensions import Optional, Tuple
+from typing_extensions import NamedTuple, Optional, Union
 
+from flexplan.autoscaling import AutoscalePolicy
+from flexplan.backpressure import InboxLimit
+from flexplan.balancers import Balancer
 from flexplan.datastructures.instancecreator import Creator
+from flexplan.serializers import Serializer
 from flexplan.stations.base import Station
 
 # Don't construct WorkerId with NewType as it will not work with mypy
 WorkerId = str
-WorkerSpec = Tuple[
-    WorkerId,
-    Optional[str],  # name
-    Creator[Station],
-]
+
+
+class WorkerSpec(NamedTuple):
+    """How a worker registered with the workshop is run, see
+    :meth:`Workshop.register`."""
+
+    worker_id: WorkerId
+    name: Optional[str]
+    station_creator: Creator[Station]
+    replicas: int
+    balancer_creator: Creator[Balancer]
+    autoscale: Optional[AutoscalePolicy] = None
+    steal: bool = False
+    inbox_limit: Optional[InboxLimit] = None
+    serializer: Optional[Union[str, Serializer]] = None
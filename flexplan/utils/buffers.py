@@ -0,0 +1,219 @@
+"""Pickling with out-of-band buffers carried by shared memory.
+
+Objects are pickled with protocol 5. Every buffer exposed through
+:class:`pickle.PickleBuffer` (NumPy arrays and, with this module's pickler,
+``memoryview``) that is at least ``threshold`` bytes long is copied once
+into a shared memory segment instead of into the pickle stream. All such buffers
+of one object share one segment.
+
+Pickle does not let ``bytes`` and ``bytearray`` be reduced differently, so classes
+that know where large ones may sit (such as mails and their arguments) define
+``__reduce_oob__(threshold)``, returning a reduce value built with
+:func:`wrap_large_bytes`, or ``None`` to be pickled as usual.
+
+The receiver maps the segment and unlinks its name right away, so the segment
+lives exactly as long as the views handed to the unpickled object: the mapping is
+released when the last of them is garbage collected.
+
+Transports that carry multipart messages of their own (such as ZeroMQ) use
+:func:`dumps_frames` instead, which hands the large buffers over as separate frames
+rather than through shared memory.
+"""
+
+import io
+import mmap
+import os
+import pickle
+import sys
+from multiprocessing.reduction import ForkingPickler
+from multiprocessing.shared_memory import SharedMemory
+
+from typing_extensions import Any, Iterable, List, Optional, Tuple, Union
+
+try:
+    if sys.platform == "win32":
+        raise ImportError("named mappings cannot outlive their creator on Windows")
+    # the module behind multiprocessing.shared_memory on POSIX systems
+    import _posixshmem
+    from multiprocessing import resource_tracker
+except ImportError:  # pragma: no cover
+    _posixshmem = None
+
+__all__ = (
+    "OOB_SUPPORTED",
+    "OOB_THRESHOLD",
+    "dumps",
+    "dumps_frames",
+    "loads",
+    "loads_frames",
+    "wrap_large_bytes",
+)
+
+OOB_SUPPORTED = _posixshmem is not None
+OOB_THRESHOLD = 1 << 17
+
+# a pickle stream starts with the PROTO opcode, anything else is a segment header
+_SEGMENT_MARK = b"S"
+
+# (segment name, [(offset, size, readonly), ...])
+SegmentInfo = Tuple[str, List[Tuple[int, int, bool]]]
+
+
+def _rebuild_bytes(buffer: Any) -> bytes:
+    return bytes(buffer)
+
+
+def _rebuild_memoryview(buffer: Any) -> memoryview:
+    return memoryview(buffer)
+
+
+class _LargeBytes:
+    __slots__ = ("data",)
+
+    def __init__(self, data: Union[bytes, bytearray]) -> None:
+        self.data = data
+
+    def __reduce__(self):
+        # the receiver still gets bytes (or a bytearray of its own), copied once
+        # out of shared memory
+        rebuild = _rebuild_bytes if type(self.data) is bytes else bytearray
+        return rebuild, (pickle.PickleBuffer(self.data),)
+
+
+def wrap_large_bytes(values: Iterable[Any], threshold: int) -> Optional[List[Any]]:
+    """Get ``values`` as a list whose ``bytes`` and ``bytearray`` objects of
+    ``threshold`` bytes or more are pickled out of band, or ``None`` if there are
+    no such objects."""
+    wrapped: Optional[List[Any]] = None
+    for i, value in enumerate(values):
+        if (type(value) is bytes or type(value) is bytearray) and len(
+            value
+        ) >= threshold:
+            if wrapped is None:
+                wrapped = list(values)
+            wrapped[i] = _LargeBytes(value)
+    return wrapped
+
+
+class OutOfBandPickler(ForkingPickler):
+    """A :class:`ForkingPickler` which exposes large ``memoryview`` objects as
+    :class:`pickle.PickleBuffer` and honours ``__reduce_oob__``."""
+
+    def __init__(self, file, protocol, buffer_callback, *, threshold: int) -> None:
+        # ForkingPickler only passes positional arguments on
+        super().__init__(file, protocol, True, buffer_callback)
+        self._threshold = threshold
+
+    def reducer_override(self, obj):
+        if type(obj) is memoryview:
+            if obj.c_contiguous:
+                # out of band, the receiver gets a view of shared memory without any
+                # copy; small views are pickled in-band, plain pickle refuses them
+                return _rebuild_memoryview, (pickle.PickleBuffer(obj),)
+        elif isinstance(obj, type):
+            pass
+        elif (reduce_oob := getattr(obj, "__reduce_oob__", None)) is not None:
+            if (rv := reduce_oob(self._threshold)) is not None:
+                return rv
+        return NotImplemented
+
+
+def _write_segment(buffers: List[pickle.PickleBuffer]) -> SegmentInfo:
+    raws = [buffer.raw() for buffer in buffers]
+    layout: List[Tuple[int, int, bool]] = []
+    offset = 0
+    for raw in raws:
+        layout.append((offset, raw.nbytes, raw.readonly))
+        # keep every buffer aligned for the sake of typed array views
+        offset += (raw.nbytes + 63) & ~63
+    shm = SharedMemory(create=True, size=max(offset, 1))
+    try:
+        buf = shm.buf
+        assert buf is not None
+        for (start, size, _), raw in zip(layout, raws):
+            buf[start : start + size] = raw
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+    # the segment is left registered with the resource tracker, which removes it
+    # if the receiver never gets to unlink it
+    shm.close()
+    return shm.name, layout
+
+
+def _read_segment(info: SegmentInfo) -> List[memoryview]:
+    name, layout = info
+    # the name is only needed to attach, dropping it at once leaves the mapping
+    # to the reference counting of the views below
+    path = "/" + name
+    fd = _posixshmem.shm_open(path, os.O_RDWR, mode=0o600)
+    try:
+        size = os.fstat(fd).st_size
+        mapping = mmap.mmap(fd, size)
+    finally:
+        os.close(fd)
+        _posixshmem.shm_unlink(path)
+        resource_tracker.unregister(path, "shared_memory")
+    view = memoryview(mapping)
+    return [
+        view[start : start + size].toreadonly()
+        if readonly
+        else view[start : start + size]
+        for start, size, readonly in layout
+    ]
+
+
+def dumps(obj: Any, threshold: int = OOB_THRESHOLD) -> bytes:
+    """Pickle ``obj``, moving buffers of ``threshold`` bytes or more out of band."""
+    buffers: List[pickle.PickleBuffer] = []
+
+    def buffer_callback(buffer: pickle.PickleBuffer) -> bool:
+        # a false return value takes the buffer out of the pickle stream
+        if OOB_SUPPORTED and buffer.raw().nbytes >= threshold:
+            buffers.append(buffer)
+            return False
+        return True
+
+    file = io.BytesIO()
+    OutOfBandPickler(file, 5, buffer_callback, threshold=threshold).dump(obj)
+    if not buffers:
+        return file.getvalue()
+    # prefix the stream with the segment layout
+    header = pickle.dumps(_write_segment(buffers), 5)
+    return b"".join(
+        (_SEGMENT_MARK, len(header).to_bytes(4, "little"), header, file.getbuffer())
+    )
+
+
+def loads(data: Union[bytes, memoryview]) -> Any:
+    """Unpickle what :func:`dumps` produced."""
+    if data[:1] != _SEGMENT_MARK:
+        return pickle.loads(data)
+    view = memoryview(data)
+    end = 5 + int.from_bytes(view[1:5], "little")
+    buffers = _read_segment(pickle.loads(view[5:end]))
+    return pickle.loads(view[end:], buffers=buffers)
+
+
+def dumps_frames(obj: Any, threshold: int = OOB_THRESHOLD) -> List[Any]:
+    """Pickle ``obj`` into the pickle stream followed by its buffers of
+    ``threshold`` bytes or more, each as a frame of its own."""
+    frames: List[Any] = [None]
+
+    def buffer_callback(buffer: pickle.PickleBuffer) -> bool:
+        raw = buffer.raw()
+        if raw.nbytes >= threshold:
+            frames.append(raw)
+            return False
+        return True
+
+    file = io.BytesIO()
+    OutOfBandPickler(file, 5, buffer_callback, threshold=threshold).dump(obj)
+    frames[0] = file.getbuffer()
+    return frames
+
+
+def loads_frames(frames: List[Any]) -> Any:
+    """Unpickle what :func:`dumps_frames` produced."""
+    return pickle.loads(frames[0], buffers=frames[1:])
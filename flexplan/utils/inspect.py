@@ -1,10 +1,14 @@
 from functools import cached_property, partial
 from inspect import getmodule, getmro, isbuiltin, isfunction, ismethod
+from types import MethodType
+from weakref import WeakKeyDictionary
 
-from typing_extensions import Any, Callable, Optional, Type, TypeVar
+from typing_extensions import Any, Callable, Dict, List, Optional, Tuple, Type, TypeVar
 
 __all__ = (
+    "clear_method_class_cache",
     "get_method_class",
+    "get_public_methods",
     "getmodule",
     "getmro",
     "isbuiltin",
@@ -30,6 +34,20 @@ def ispartialmethod(obj: Any) -> bool:
 _warn_nested_class = False
 
 
+_method_classes: "WeakKeyDictionary[Any, Optional[Type]]" = WeakKeyDictionary()
+# bound methods are created on every attribute access, so they are cached by their
+# underlying function and the type of the instance they are bound to
+_bound_method_classes: "WeakKeyDictionary[Any, Dict[Type, Optional[Type]]]" = (
+    WeakKeyDictionary()
+)
+
+
+def clear_method_class_cache() -> None:
+    """Forget all results memoized by :func:`get_method_class`."""
+    _method_classes.clear()
+    _bound_method_classes.clear()
+
+
 def get_method_class(method: Callable) -> Optional[Type]:
     """Get the class of a method, if not found then ``None`` is returned.
 
@@ -40,6 +58,9 @@ def get_method_class(method: Callable) -> Optional[Type]:
 
     If users call ``getmethodclass`` with these fucntion, then ``None`` is returned.
 
+    Results are memoized with weak references to the inspected functions, so that
+    resolving the same function again does no introspection at all.
+
     :type method: callable
     :param method: The function or method to be inspected.
 
@@ -47,6 +68,34 @@ def get_method_class(method: Callable) -> Optional[Type]:
     :return: Bounding class of ``method`` if exists.
     """
 
+    method_type = type(method)
+    if method_type is MethodType:
+        func = method.__func__  # type: ignore[attr-defined]
+        owner = type(method.__self__)  # type: ignore[attr-defined]
+        try:
+            return _bound_method_classes[func][owner]
+        except (KeyError, TypeError):
+            pass
+        cls = _get_method_class(method)
+        try:
+            _bound_method_classes.setdefault(func, {})[owner] = cls
+        except TypeError:
+            pass
+        return cls
+    if method_type is partial:
+        return get_method_class(method.func)  # type: ignore[attr-defined]
+    try:
+        return _method_classes[method]
+    except KeyError:
+        pass
+    except TypeError:
+        # neither hashable nor weakly referenceable
+        return _get_method_class(method)
+    cls = _method_classes[method] = _get_method_class(method)
+    return cls
+
+
+def _get_method_class(method: Callable) -> Optional[Type]:
     if isinstance(method, partial):
         return get_method_class(method.func)
     if ispartialmethod(method):
@@ -93,3 +142,17 @@ def get_method_class(method: Callable) -> Optional[Type]:
                         RuntimeWarning,
                     )
     return getattr(method, "__objclass__", None)
+
+
+def get_public_methods(cls: Type) -> List[Tuple[str, Callable]]:
+    """Get the public functions defined on ``cls`` itself, sorted by name.
+
+    Inherited functions are left out, in line with :func:`get_method_class` which
+    resolves a function to the class defining it. The position of a method in the
+    returned list can be used as a compact identifier of that method.
+    """
+    return sorted(
+        (name, attr)
+        for name, attr in vars(cls).items()
+        if not name.startswith("_") and isfunction(attr)
+    )
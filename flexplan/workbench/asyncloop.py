@@ -0,0 +1,298 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import InvalidStateError
+from inspect import isawaitable
+from queue import Empty
+from threading import BoundedSemaphore, Thread
+
+from typing_extensions import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Union,
+    override,
+)
+
+from flexplan.hooks import HANDLER_ENDED, HANDLER_STARTED
+from flexplan.messages.mail import MailBatch, RemoteFuture
+from flexplan.tracing import END, START, current_trace, traced_meta
+from flexplan.workbench.base import (
+    FAILED,
+    SKIPPED,
+    Workbench,
+    WorkbenchContext,
+    current_context,
+    enter_worker_context,
+)
+
+if TYPE_CHECKING:
+    from flexplan.datastructures.instancecreator import Creator
+    from flexplan.datastructures.types import EventLike
+    from flexplan.messages.mail import Inbox, Mail, MailBox, Outcome
+    from flexplan.stations.base import StationSpec
+    from flexplan.workers.base import Worker
+
+
+class AsyncWorkbenchContext(WorkbenchContext):
+    """A context which awaits what worker methods return, if it is awaitable."""
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        if self._metrics is not None:
+            self.handle_async = self._handle_async_metered  # type: ignore[method-assign]
+        if self._tracing:
+            self._untraced_handle_async = self.handle_async
+            self.handle_async = self._handle_async_traced  # type: ignore[method-assign]
+
+    async def _handle_batch_async(self, batch: "MailBatch") -> "List[Outcome]":
+        outcomes: "List[Outcome]" = []
+        worker = self._worker()
+        for i, (instruction, args, kwargs) in enumerate(batch.calls):
+            if (expired := batch.expired(i)) is not None:
+                outcomes.append((False, expired))
+                continue
+            try:
+                result = self._method(instruction)(worker, *args, **kwargs)
+                if isawaitable(result):
+                    result = await result
+                outcomes.append((True, result))
+            except Exception as exc:
+                outcomes.append((False, exc))
+        return outcomes
+
+    async def handle_async(self, mail: "Union[Mail, MailBatch]") -> Any:
+        current_context.set(self)
+        if HANDLER_STARTED:
+            HANDLER_STARTED.fire(self, mail)
+        result: Any = FAILED
+        try:
+            if type(future := mail.future) is RemoteFuture:
+                future.bind(self._outbox_ref(), self._serializer)
+            if self._abandoned(mail):
+                result = SKIPPED
+                return result
+            if type(mail) is MailBatch:
+                result = await self._handle_batch_async(mail)
+            else:
+                result = self._method(mail.instruction)(
+                    self._worker(), *mail.args, **mail.kwargs
+                )
+                if isawaitable(result):
+                    result = await result
+            if future is not None:
+                future.set_result(result)
+            return result
+        except Exception as exc:
+            result = FAILED
+            if mail.future:
+                try:
+                    mail.future.set_exception(exc)
+                except InvalidStateError:
+                    # cancelled by the caller in the meantime
+                    pass
+            return result
+        finally:
+            if HANDLER_ENDED:
+                HANDLER_ENDED.fire(self, mail, result)
+            del self, mail
+
+    async def _handle_async_metered(self, mail: "Union[Mail, MailBatch]") -> Any:
+        start = time.monotonic_ns()
+        method = self._begin_metered(mail)
+        result = await AsyncWorkbenchContext.handle_async(self, mail)
+        self._end_metered(method, mail, start, result)
+        return result
+
+    async def _handle_async_traced(self, mail: "Union[Mail, MailBatch]") -> Any:
+        if (meta := traced_meta(mail)) is None:
+            return await self._untraced_handle_async(mail)
+        self.trace_dequeue(mail)
+        meta.record(START, self._contact)
+        # the task of the mail has a copy of the context of its own
+        current_trace.set(meta)
+        try:
+            return await self._untraced_handle_async(mail)
+        finally:
+            meta.record(END, self._contact)
+            self._report_trace(meta)
+
+
+class AsyncLoopWorkbench(Workbench):
+    """Run the worker in an asyncio event loop, handling mails as concurrent tasks.
+
+    Coroutine methods (``async def``) overlap with each other, at most
+    ``max_concurrency`` at a time if it is given; plain methods run in the event
+    loop and block it while they do. A thread reads the inbox and hands mails to
+    the loop in bunches of up to ``read_batch``, taking a mail only once it can
+    start, so that mails waiting for a slot stay in the inbox, where inbox limits,
+    priorities and stealing apply to them.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        read_batch: int = 256,
+    ) -> None:
+        super().__init__()
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("max_concurrency must be >= 1")
+        if read_batch < 1:
+            raise ValueError("read_batch must be >= 1")
+        self._max_concurrency = max_concurrency
+        self._read_batch = read_batch
+
+    @override
+    def run(
+        self,
+        *,
+        station_spec: "StationSpec",
+        worker_creator: "Creator[Worker]",
+        inbox: "Inbox",
+        outbox: "MailBox",
+        running_event: "Optional[EventLike]" = None,
+        replybox: "Optional[MailBox]" = None,
+        **kwargs,
+    ) -> None:
+        worker = worker_creator.create()
+        context = AsyncWorkbenchContext(
+            station_spec=station_spec,
+            worker=worker,
+            outbox=outbox,
+            replybox=replybox,
+        )
+
+        if running_event is not None:
+            running_event.set()
+
+        context.post_init_worker()
+
+        with enter_worker_context(worker):
+            asyncio.run(self._serve(context, inbox, running_event))
+
+        if running_event is not None:
+            running_event.clear()
+
+    async def _serve(
+        self,
+        context: AsyncWorkbenchContext,
+        inbox: "Inbox",
+        running_event: "Optional[EventLike]",
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        received: "Deque[Optional[Union[Mail, MailBatch]]]" = deque()
+        arrived = asyncio.Event()
+
+        def deliver(mails: "Sequence[Optional[Union[Mail, MailBatch]]]") -> None:
+            received.extend(mails)
+            arrived.set()
+
+        # taken by the reader for every mail, so that mails which cannot start yet
+        # wait in the inbox, where the station counts, orders and steals them
+        slots = (
+            None
+            if self._max_concurrency is None
+            else BoundedSemaphore(self._max_concurrency)
+        )
+        reader = Thread(
+            target=self._read_inbox,
+            args=(inbox, running_event, loop, deliver, slots),
+            name="flexplan-inbox",
+            daemon=True,
+        )
+        reader.start()
+
+        tasks: "Set[asyncio.Task]" = set()
+
+        def done(task: "asyncio.Task") -> None:
+            tasks.discard(task)
+            if slots is not None:
+                slots.release()
+
+        tracing = context.tracing
+
+        def dispatch(mail: "Union[Mail, MailBatch]") -> None:
+            if tracing:
+                context.trace_dequeue(mail)
+            task = loop.create_task(context.handle_async(mail))
+            tasks.add(task)
+            task.add_done_callback(done)
+
+        stopping = False
+        while not stopping:
+            await arrived.wait()
+            arrived.clear()
+            while received:
+                mail = received.popleft()
+                if mail is None:
+                    # the reader delivers the sentinel last
+                    stopping = True
+                    break
+                dispatch(mail)
+        if tasks:
+            await asyncio.wait(tasks)
+
+    def _read_inbox(
+        self,
+        inbox: "Inbox",
+        running_event: "Optional[EventLike]",
+        loop: asyncio.AbstractEventLoop,
+        deliver: "Callable[[Sequence[Optional[Union[Mail, MailBatch]]]], None]",
+        slots: "Optional[BoundedSemaphore]",
+    ) -> None:
+        def take(block: bool) -> "Optional[Union[Mail, MailBatch]]":
+            # raises Empty with the slot given back
+            if slots is not None and not slots.acquire(blocking=block):
+                raise Empty
+            try:
+                mail = inbox.get(timeout=1) if block else inbox.get_nowait()
+            except Empty:
+                if slots is not None:
+                    slots.release()
+                raise
+            if mail is None and slots is not None:
+                slots.release()
+            return mail
+
+        read_batch = self._read_batch
+        while True:
+            try:
+                mail = take(True)
+            except Empty:
+                if running_event is None or running_event.is_set():
+                    continue
+                mail = None
+            mails: "List[Optional[Union[Mail, MailBatch]]]" = []
+            while mail is not None:
+                mails.append(mail)
+                if len(mails) >= read_batch:
+                    break
+                try:
+                    mail = take(False)
+                except Empty:
+                    break
+            if mails:
+                loop.call_soon_threadsafe(deliver, mails)
+            if mail is None:
+                break
+        # as with LoopWorkbench, mails queued behind the sentinel are handled, each
+        # once a slot is free
+        while True:
+            if slots is not None:
+                slots.acquire()
+            try:
+                late = inbox.get_nowait()
+            except Empty:
+                late = None
+                break
+            finally:
+                if late is None and slots is not None:
+                    slots.release()
+            if late is not None:
+                loop.call_soon_threadsafe(deliver, [late])
+        loop.call_soon_threadsafe(deliver, [None])
@@ -1,22 +1,76 @@
+import os
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import InvalidStateError
+from contextvars import ContextVar
+from inspect import isfunction
+from itertools import count
 from sys import _getframe as get_frame
+from threading import Lock, Thread
+from time import monotonic_ns
+from types import MethodType
 from weakref import ref
 
-from typing_extensions import TYPE_CHECKING, Any, Optional, Self, Type
+from typing_extensions import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Self,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
 
-from flexplan.datastructures.future import Future, ProcessFutureManager
-from flexplan.utils.inspect import get_method_class
+from flexplan.datastructures.future import Future
+from flexplan.errors import DeadlineExceededError
+from flexplan.hooks import FUTURE_CREATED, HANDLER_ENDED, HANDLER_STARTED
+from flexplan.messages.mail import (
+    ContactInfo,
+    Mail,
+    MailBatch,
+    MailMeta,
+    RemoteFuture,
+    Reply,
+)
+from flexplan.messages.message import Message
+from flexplan.metrics import MethodMetrics, WorkerMetrics
+from flexplan.tracing import (
+    DEQUEUE,
+    END,
+    START,
+    current_trace,
+    start_span,
+    traced_meta,
+)
+from flexplan.utils.identity import gen_worker_id
+from flexplan.utils.inspect import get_method_class, get_public_methods
 
 if TYPE_CHECKING:
     from weakref import ReferenceType
 
     from flexplan.datastructures.instancecreator import Creator
     from flexplan.datastructures.types import EventLike, TracebackType
-    from flexplan.messages.mail import Mail, MailBox
+    from flexplan.messages.mail import Inbox, MailBox, Outcome
     from flexplan.stations.base import StationSpec
     from flexplan.workers.base import Worker
 
 
+# the context of the mail being handled, for code the frames of which do not lead
+# back to WorkbenchContext.handle, such as coroutines run as asyncio tasks
+current_context: "ContextVar[Optional[WorkbenchContext]]" = ContextVar(
+    "flexplan_workbench_context", default=None
+)
+
+# returned by WorkbenchContext.handle for mails which failed, or which were skipped
+# as nobody waits for them anymore
+FAILED: Any = object()
+SKIPPED: Any = object()
+
+
 class WorkbenchContext:
     def __init__(
         self,
@@ -24,15 +78,50 @@ class WorkbenchContext:
         station_spec: "StationSpec",
         worker: "Worker",
         outbox: "MailBox",
-        process_future_manager_address: Any = None,
+        replybox: "Optional[MailBox]" = None,
         **_,
     ) -> None:
         self._station_spec = station_spec
+        self._serializer = station_spec.serializer
         self._worker_ref: "ReferenceType[Worker]" = ref(worker)
         self._outbox_ref: "ReferenceType[MailBox]" = ref(outbox)
         self._worker_cls = type(worker)
-        self._process_future_manager_address = process_future_manager_address
-        self._process_future_manager: Optional[ProcessFutureManager] = None
+        self._dispatch_table = self._build_dispatch_table(
+            self._worker_cls, station_spec.methods
+        )
+        self._replybox = replybox
+        self._reply_thread: Optional[Thread] = None
+        self._correlation_ids = count()
+        self._pending_futures: Dict[int, Future] = {}
+        self._pending_lock = Lock()
+        self._metrics: Optional[WorkerMetrics] = None
+        if station_spec.metrics_interval is not None:
+            self._metrics = WorkerMetrics()
+            self._reporter_id = gen_worker_id()
+            self._next_report = 0
+            # recording costs nothing at all unless it is enabled
+            self.handle = self._handle_metered  # type: ignore[method-assign]
+        self._tracing = station_spec.tracing
+        if self._tracing:
+            self._contact = ContactInfo(
+                self._worker_cls.__qualname__, os.getpid(), gen_worker_id()[:8]
+            )
+            self._untraced_handle = self.handle
+            self.handle = self._handle_traced  # type: ignore[method-assign]
+
+    @property
+    def station_spec(self) -> "StationSpec":
+        return self._station_spec
+
+    @property
+    def tracing(self) -> bool:
+        """Whether the station records the hops of traced mails."""
+        return self._tracing
+
+    @property
+    def metrics(self) -> Optional[WorkerMetrics]:
+        """Metrics of the mails handled so far, if the station records them."""
+        return self._metrics
 
     def post_init_worker(self) -> None:
         worker = self._worker_ref()
@@ -40,45 +129,315 @@ class WorkbenchContext:
             return
         worker.__post_init__()
 
-    def handle(self, mail: "Mail") -> Any:
+    @staticmethod
+    def _build_dispatch_table(
+        cls: "Type[Worker]", methods: "Optional[Tuple[str, ...]]" = None
+    ) -> "Dict[Any, Callable]":
+        """Map the public methods of ``cls`` to their functions, which are called
+        with the worker as first argument.
+
+        Each method can be looked up either by its function or by its compact
+        identifier: the position of its name in ``methods``, as the station has
+        numbered them, or else in :func:`get_public_methods`. The table holds
+        functions rather than bound methods, so that it does not keep the worker,
+        which the context only refers to weakly, alive.
+        """
+        table: "Dict[Any, Callable]" = {}
+        functions: "Dict[str, Callable]" = {}
+        for name, func in get_public_methods(cls):
+            table[func] = functions[name] = func
+        for method_id, name in enumerate(functions if methods is None else methods):
+            if (function := functions.get(name)) is not None:
+                table[method_id] = function
+        return table
+
+    def _resolve_method(self, instruction: Any) -> Callable:
+        if isinstance(instruction, str):
+            raise NotImplementedError()
+        elif isinstance(instruction, int):
+            raise ValueError(f"{self._worker_cls!r} has no method of ID {instruction}")
+        elif not callable(instruction):
+            raise ValueError(f"{instruction!r} is not callable")
+        cls = get_method_class(instruction)
+        if cls is not self._worker_cls:
+            raise ValueError(f"{instruction!r} is not a method of {self._worker_cls!r}")
+        if isfunction(instruction):
+            self._dispatch_table[instruction] = instruction
+        return instruction
+
+    def _method(self, instruction: Any) -> Callable:
+        """Get the function ``instruction`` stands for, to be called with the
+        worker as first argument."""
         try:
-            instruction = mail.instruction
-            if isinstance(instruction, str):
-                raise NotImplementedError()
-            elif callable(instruction):
-                cls = get_method_class(instruction)
-                if cls is not self._worker_cls:
-                    raise ValueError(
-                        f"{instruction!r} is not a method of {self._worker_cls!r}"
-                    )
-                result = instruction(cls, *mail.args, **mail.kwargs)
-                if mail.future:
-                    mail.future.set_result(result)
+            return self._dispatch_table[instruction]
+        except (KeyError, TypeError):
+            return self._resolve_method(instruction)
+
+    def _worker(self) -> "Worker":
+        worker = self._worker_ref()
+        if worker is None:
+            raise RuntimeError(f"Worker {self._worker_cls!r} is not available")
+        return worker
+
+    def lookup(self, instruction: Any) -> Callable:
+        """Get the bound worker method ``instruction`` stands for."""
+        return MethodType(self._method(instruction), self._worker())
+
+    def _handle_batch(self, batch: "MailBatch") -> "List[Outcome]":
+        outcomes: "List[Outcome]" = []
+        method = self._method
+        worker = self._worker()
+        for i, (instruction, args, kwargs) in enumerate(batch.calls):
+            if (expired := batch.expired(i)) is not None:
+                outcomes.append((False, expired))
+                continue
+            try:
+                outcomes.append((True, method(instruction)(worker, *args, **kwargs)))
+            except Exception as exc:
+                outcomes.append((False, exc))
+        return outcomes
+
+    def _abandoned(self, mail: "Union[Mail, MailBatch]") -> bool:
+        """Tell whether nobody waits for the outcome of ``mail`` anymore, as its
+        future has been cancelled or its deadline has passed; the future of an
+        expired mail fails with :class:`DeadlineExceededError`."""
+        future = mail.future
+        if future is not None:
+            if type(future) is RemoteFuture:
+                board = self._station_spec.cancellations
+                if board is not None and board.is_cancelled(future.correlation_id):
+                    return True
+            elif future.cancelled():
+                return True
+        if (deadline := mail.deadline) is not None and time.time() >= deadline:
+            if future is not None:
+                future.set_exception(
+                    DeadlineExceededError(f"Deadline of {mail!r} has passed")
+                )
+            return True
+        return False
+
+    def handle(self, mail: "Union[Mail, MailBatch]") -> Any:
+        if HANDLER_STARTED:
+            HANDLER_STARTED.fire(self, mail)
+        result: Any = FAILED
+        try:
+            if type(future := mail.future) is RemoteFuture:
+                future.bind(self._outbox_ref(), self._serializer)
+            if self._abandoned(mail):
+                result = SKIPPED
                 return result
+            if type(mail) is MailBatch:
+                result = self._handle_batch(mail)
             else:
-                raise ValueError(f"{instruction!r} is not callable")
+                instruction = mail.instruction
+                try:
+                    method = self._dispatch_table[instruction]
+                except (KeyError, TypeError):
+                    method = self._resolve_method(instruction)
+                result = method(self._worker(), *mail.args, **mail.kwargs)
+            if future is not None:
+                future.set_result(result)
+            return result
         except Exception as exc:
+            result = FAILED
             if mail.future:
-                mail.future.set_exception(exc)
+                try:
+                    mail.future.set_exception(exc)
+                except InvalidStateError:
+                    # cancelled by the caller in the meantime
+                    pass
+            return result
         finally:
+            if HANDLER_ENDED:
+                HANDLER_ENDED.fire(self, mail, result)
             del self, mail
 
-    def create_future(self, process_safe: bool = False) -> Future:
-        if process_safe or self._station_spec.use_process_future:
-            if self._process_future_manager_address is None:
-                raise RuntimeError("ProcessFutureManager is not set")
-            elif self._process_future_manager is None:
-                self._process_future_manager = ProcessFutureManager(
-                    self._process_future_manager_address
-                )
-            print("ProcessFuture")
-            return self._process_future_manager.Future()
+    def _handle_metered(self, mail: "Union[Mail, MailBatch]", *args) -> Any:
+        start = monotonic_ns()
+        method = self._begin_metered(mail)
+        # called through the class, so that get_context finds the frame of handle
+        result = type(self).handle(self, mail, *args)
+        self._end_metered(method, mail, start, result)
+        return result
+
+    def _begin_metered(self, mail: "Union[Mail, MailBatch]") -> MethodMetrics:
+        metrics = self._metrics
+        assert metrics is not None
+        try:
+            method = metrics.methods[mail.instruction]  # type: ignore[union-attr]
+        except (KeyError, AttributeError, TypeError):
+            method = metrics.method(getattr(mail, "instruction", None))
+        method.received += 1
+        return method
+
+    def _end_metered(
+        self,
+        method: MethodMetrics,
+        mail: "Union[Mail, MailBatch]",
+        start: int,
+        result: Any,
+    ) -> None:
+        end = monotonic_ns()
+        if result is SKIPPED:
+            method.skipped += 1
+            return
+        if result is FAILED:
+            method.errors += 1
         else:
-            print("Normal Future")
-            return Future()
+            method.completed += 1
+        sent_at = getattr(mail, "sent_at", None)
+        method.record(None if sent_at is None else start - sent_at, end - start)
+        if end >= self._next_report:
+            self._start_reports()
+
+    def _handle_traced(self, mail: "Union[Mail, MailBatch]", *args) -> Any:
+        if (meta := traced_meta(mail)) is None:
+            return self._untraced_handle(mail, *args)
+        self.trace_dequeue(mail)
+        contact = self._contact
+        meta.record(START, contact)
+        token = current_trace.set(meta)
+        try:
+            return self._untraced_handle(mail, *args)
+        finally:
+            current_trace.reset(token)
+            meta.record(END, contact)
+            self._report_trace(meta)
+
+    def trace_dequeue(self, mail: "Union[Mail, MailBatch]") -> None:
+        """Record that a traced mail has been taken from the inbox, for workbenches
+        which do not handle it right away."""
+        if (meta := traced_meta(mail)) is None:
+            return
+        trace = meta.trace
+        if not trace or trace[-1].hop != DEQUEUE:
+            meta.record(DEQUEUE, self._contact)
+
+    def _report_trace(self, meta: MailMeta) -> None:
+        # imported here, the supervisor module depends on this one
+        from flexplan.supervisor import Supervisor
+
+        outbox = self._outbox_ref()
+        if outbox is None:
+            return
+        outbox.put(Mail.new(message=Message(Supervisor.record_trace).params(meta)))
+
+    def _start_reports(self) -> None:
+        """Let the supervisor know the metrics of the worker.
+
+        A worker in the process of the supervisor hands over its metrics once,
+        later updates are seen in place. Otherwise a thread sends them every
+        ``metrics_interval`` seconds, if they have changed.
+        """
+        self._next_report = 1 << 63
+        if not self._station_spec.use_process_future:
+            assert self._metrics is not None
+            self._report(self._metrics)
+            return
+        Thread(target=self._send_reports, name="flexplan-metrics", daemon=True).start()
+
+    def _report(self, metrics: WorkerMetrics) -> None:
+        # imported here, the supervisor module depends on this one
+        from flexplan.supervisor import Supervisor
+
+        outbox = self._outbox_ref()
+        if outbox is None:
+            raise RuntimeError("Worker context is corrupted")
+        outbox.put(
+            Mail.new(
+                message=Message(Supervisor.record_metrics).params(
+                    self._worker_cls, self._reporter_id, metrics
+                )
+            )
+        )
+
+    def _send_reports(self) -> None:
+        metrics = self._metrics
+        interval = self._station_spec.metrics_interval
+        assert metrics is not None and interval is not None
+        reported = -1
+        while self._outbox_ref() is not None:
+            if (handled := metrics.handled()) != reported:
+                # a copy, which the worker does not change while it is pickled
+                snapshot = WorkerMetrics()
+                snapshot.merge(metrics)
+                snapshot.serialization.merge(self._serializer.stats)
+                try:
+                    self._report(snapshot)
+                    reported = handled
+                except Exception:
+                    # the station is stopping, the process goes along with this thread
+                    pass
+            time.sleep(interval)
+
+    def create_future(self) -> Future:
+        future: Future = Future()
+        if FUTURE_CREATED:
+            FUTURE_CREATED.fire(future)
+        return future
+
+    def send(self, mail: "Union[Mail, MailBatch]") -> None:
+        """Put a mail sent by the worker into the outbox.
+
+        If the station lives in another process, the mail's future stays here and
+        is replaced with a :class:`RemoteFuture`, whose reply comes back through
+        the reply box.
+        """
+        outbox = self._outbox_ref()
+        if outbox is None:
+            raise RuntimeError("Worker context is corrupted")
+        if (
+            self._tracing
+            and type(mail) is Mail
+            and (parent := current_trace.get()) is not None
+        ):
+            start_span(mail, self._contact, parent)
+        future = mail.future
+        if future is None or not self._station_spec.use_process_future:
+            outbox.put(mail)
+            return
+        if self._replybox is None:
+            raise RuntimeError("Station does not take replies")
+        with self._pending_lock:
+            correlation_id = next(self._correlation_ids)
+            # the worker sends mails with futures of its own
+            self._pending_futures[correlation_id] = cast(Future, future)
+            if self._reply_thread is None:
+                self._reply_thread = Thread(
+                    target=self._receive_replies,
+                    args=(self._replybox,),
+                    name="flexplan-replies",
+                    daemon=True,
+                )
+                self._reply_thread.start()
+        mail.future = RemoteFuture(correlation_id)
+        try:
+            outbox.put(mail)
+        except BaseException:
+            with self._pending_lock:
+                self._pending_futures.pop(correlation_id, None)
+            mail.future = future
+            raise
+
+    def _receive_replies(self, replybox: "MailBox") -> None:
+        while (reply := replybox.get()) is not None:
+            if type(reply) is not Reply:
+                continue
+            with self._pending_lock:
+                future = self._pending_futures.pop(reply.correlation_id, None)
+            if future is None or future.done():
+                continue
+            try:
+                reply.resolve(future, self._serializer)
+            except InvalidStateError:
+                # cancelled by the worker in the meantime
+                pass
 
     @classmethod
     def get_context(cls, depth: int = 2) -> Optional[Self]:
+        if isinstance(context := current_context.get(), cls):
+            return context
         try:
             frame = get_frame(depth)
         except ValueError:
@@ -101,11 +460,11 @@ class Workbench(ABC):
         *,
         station_spec: "StationSpec",
         worker_creator: "Creator[Worker]",
-        inbox: "MailBox",
+        inbox: "Inbox",
         outbox: "MailBox",
         running_event: "Optional[EventLike]" = None,
         terminate_event: "Optional[EventLike]" = None,
-        future_manager_address: "Optional[str]" = None,
+        replybox: "Optional[MailBox]" = None,
         **kwargs,
     ) -> None: ...
 
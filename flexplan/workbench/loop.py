@@ -1,16 +1,35 @@
+import os
+from collections import deque
 from queue import Empty
-
-from typing_extensions import TYPE_CHECKING, Optional, override
+from threading import BoundedSemaphore, Lock
+
+from flexexecutor import ThreadPoolExecutor
+from typing_extensions import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Optional,
+    TypeVar,
+    Union,
+    overload,
+    override,
+)
 
 from flexplan.workbench.base import Workbench, WorkbenchContext, enter_worker_context
 
 if TYPE_CHECKING:
     from flexplan.datastructures.instancecreator import Creator
     from flexplan.datastructures.types import EventLike
-    from flexplan.messages.mail import MailBox
+    from flexplan.messages.mail import Inbox, Mail, MailBatch, MailBox
     from flexplan.stations.base import StationSpec
     from flexplan.workers.base import Worker
 
+F = TypeVar("F", bound=Callable)
+
+_SERIAL_GROUP = "__flexplan_serial_group__"
+
 
 class LoopWorkbench(Workbench):
     @override
@@ -19,19 +38,18 @@ class LoopWorkbench(Workbench):
         *,
         station_spec: "StationSpec",
         worker_creator: "Creator[Worker]",
-        inbox: "MailBox",
+        inbox: "Inbox",
         outbox: "MailBox",
         running_event: "Optional[EventLike]" = None,
-        process_future_manager_address: Optional[str] = None,
+        replybox: "Optional[MailBox]" = None,
         **kwargs,
     ) -> None:
-        print(LoopWorkbench)
         worker = worker_creator.create()
         context = WorkbenchContext(
             station_spec=station_spec,
             worker=worker,
             outbox=outbox,
-            process_future_manager_address=process_future_manager_address,
+            replybox=replybox,
         )
 
         def is_running() -> bool:
@@ -63,26 +81,68 @@ class LoopWorkbench(Workbench):
             running_event.clear()
 
 
+@overload
+def serialized(func: F, /) -> F: ...
+
+
+@overload
+def serialized(*, group: Optional[str] = None) -> Callable[[F], F]: ...
+
+
+def serialized(
+    func: Optional[F] = None, /, *, group: Optional[str] = None
+) -> Union[F, Callable[[F], F]]:
+    """Mark a worker method as not thread-safe for :class:`ConcurrentLoopWorkbench`.
+
+    Calls to the method never overlap and run in the order they were received.
+    Methods marked with the same ``group`` share the restriction, for example
+    methods touching the same state.
+    """
+
+    def decorate(func: F) -> F:
+        setattr(func, _SERIAL_GROUP, group or func.__qualname__)
+        return func
+
+    if func is not None:
+        return decorate(func)
+    return decorate
+
+
 class ConcurrentLoopWorkbench(Workbench):
+    """Handle mails on a pool of up to ``max_workers`` threads sharing one worker.
+
+    Mails are taken from the inbox only while a thread is free, so a busy worker
+    leaves them queued in its inbox. Methods marked with :func:`serialized` are
+    handled one call at a time and in order; a batch follows the mark of its first
+    call.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None) -> None:
+        super().__init__()
+        if max_workers is None:
+            max_workers = min(32, (os.cpu_count() or 1) + 4)
+        elif max_workers < 1:
+            raise ValueError("max_workers must be >= 1")
+        self._max_workers = max_workers
+
     @override
     def run(
         self,
         *,
         station_spec: "StationSpec",
         worker_creator: "Creator[Worker]",
-        inbox: "MailBox",
+        inbox: "Inbox",
         outbox: "MailBox",
         running_event: "Optional[EventLike]" = None,
-        process_future_manager_address: Optional[str] = None,
+        replybox: "Optional[MailBox]" = None,
         **kwargs,
     ) -> None:
-        print(ConcurrentLoopWorkbench)
         worker = worker_creator.create()
         context = WorkbenchContext(
             station_spec=station_spec,
             worker=worker,
             outbox=outbox,
-            process_future_manager_address=process_future_manager_address,
+            replybox=replybox,
         )
 
         def is_running() -> bool:
@@ -95,6 +155,53 @@ class ConcurrentLoopWorkbench(Workbench):
 
         context.post_init_worker()
 
+        slots = BoundedSemaphore(self._max_workers)
+        # mails waiting for the running call of their serial group, a group is
+        # present while one of its calls runs
+        lanes: "Dict[Any, Deque[Union[Mail, MailBatch]]]" = {}
+        lanes_lock = Lock()
+
+        def serial_group(mail: "Union[Mail, MailBatch]") -> Any:
+            try:
+                method = context.lookup(mail.instruction)
+            except Exception:
+                # reported by handle
+                return None
+            return getattr(method, _SERIAL_GROUP, None)
+
+        def work(mail: "Union[Mail, MailBatch]", group: Any) -> None:
+            try:
+                while True:
+                    context.handle(mail)
+                    if group is None:
+                        return
+                    with lanes_lock:
+                        lane = lanes[group]
+                        if not lane:
+                            del lanes[group]
+                            return
+                        mail = lane.popleft()
+            finally:
+                slots.release()
+
+        tracing = context.tracing
+
+        def dispatch(mail: "Union[Mail, MailBatch]") -> None:
+            if tracing:
+                context.trace_dequeue(mail)
+            if (group := serial_group(mail)) is not None:
+                with lanes_lock:
+                    if (lane := lanes.get(group)) is not None:
+                        lane.append(mail)
+                        return
+                    lanes[group] = deque()
+            slots.acquire()
+            pool.submit(work, mail, group)
+
+        pool = ThreadPoolExecutor(
+            max_workers=self._max_workers,
+            thread_name_prefix="flexplan-worker",
+        )
         with enter_worker_context(worker):
             while is_running():
                 try:
@@ -103,12 +210,13 @@ class ConcurrentLoopWorkbench(Workbench):
                     continue
                 if mail is None:
                     break
-                context.handle(mail)
+                dispatch(mail)
             while not inbox.empty():
                 mail = inbox.get()
                 if mail is None:
                     continue
-                context.handle(mail)
+                dispatch(mail)
+            pool.shutdown(wait=True)
 
         if running_event is not None:
             running_event.clear()
@@ -5,14 +5,14 @@ from typing_extensions import TYPE_CHECKING
 from flexplan.workbench.base import Workbench
 
 if TYPE_CHECKING:
-    from flexplan.messages.mail import MailBox
+    from flexplan.messages.mail import Inbox, MailBox
 
 
 class SimpleWorkbench(Workbench):
     def run(
         self,
         *,
-        inbox: "MailBox",
+        inbox: "Inbox",
         outbox: "MailBox",
         **kwargs,
     ) -> None:
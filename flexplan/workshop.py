@@ -1,13 +1,23 @@
+import os
+import random
+import time
+from concurrent.futures import Future as BuiltinFuture
+from concurrent.futures import InvalidStateError, as_completed
+from itertools import count, islice
+
 from typing_extensions import (
     Any,
     Callable,
     Concatenate,
     Dict,
+    Iterable,
+    Iterator,
     List,
     Literal,
     Optional,
     ParamSpec,
     Set,
+    Tuple,
     Type,
     TypeVar,
     Union,
@@ -16,11 +26,14 @@ from typing_extensions import (
     override,
 )
 
-from flexplan.datastructures.deferredbox import DeferredBox
+from flexplan.autoscaling import AutoscalePolicy
+from flexplan.backpressure import Gate, InboxLimit, Overflow
+from flexplan.balancers import Balancer, balancer_specs
 from flexplan.datastructures.future import Future
 from flexplan.datastructures.instancecreator import Creator, InstanceCreator
-from flexplan.messages.mail import Mail
+from flexplan.messages.mail import ContactInfo, Mail, MailBatch, MailMeta
 from flexplan.messages.message import Message
+from flexplan.serializers import Serializer, get_serializer
 from flexplan.stations.base import Station
 from flexplan.stations.process import (
     ForkProcessStation,
@@ -28,12 +41,17 @@ from flexplan.stations.process import (
     ProcessStation,
     SpawnProcessStation,
 )
+from flexplan.stations.shm import SharedMemoryProcessStation
 from flexplan.stations.thread import ThreadStation
+from flexplan.stations.zmq import ZmqStation
 from flexplan.supervisor import Supervisor, SupervisorWorkbench
+from flexplan.tracing import TraceFormat, start_span, write_trace
 from flexplan.types import WorkerSpec
 from flexplan.utils.identity import gen_worker_id
+from flexplan.utils.inspect import get_method_class, get_public_methods
+from flexplan.workbench.asyncloop import AsyncLoopWorkbench
 from flexplan.workbench.base import Workbench
-from flexplan.workbench.loop import LoopWorkbench
+from flexplan.workbench.loop import ConcurrentLoopWorkbench, LoopWorkbench
 from flexplan.workers.base import Worker
 
 __all__ = (
@@ -53,9 +71,13 @@ class WorkshopRegistry:
         "fork": ForkProcessStation,
         "forkserver": ForkServerProcessStation,
         "spawn": SpawnProcessStation,
+        "shm": SharedMemoryProcessStation,
+        "zmq": ZmqStation,
     }
     _workbench_specs: Dict[str, Type[Workbench]] = {
         "loop": LoopWorkbench,
+        "asyncloop": AsyncLoopWorkbench,
+        "concurrent": ConcurrentLoopWorkbench,
     }
 
     @classmethod
@@ -196,12 +218,46 @@ class ScopedWorkshopRegistry(WorkshopRegistry):
 
 
 class Workshop(ThreadStation):
-    def __init__(self):
+    """Runs registered workers at their stations, with a supervisor relaying the
+    mails submitted to them.
+
+    With ``metrics``, the supervisor and every worker record what becomes of their
+    mails and how long they take (see :meth:`stats`); workers in other processes
+    report them every ``metrics_interval`` seconds.
+
+    A ``trace_sample_rate`` share of the mails submitted, and the mails workers
+    send while they handle them, record the hops they take (see
+    :mod:`flexplan.tracing` and :meth:`export_traces`).
+    """
+
+    def __init__(
+        self,
+        *,
+        metrics: bool = False,
+        metrics_interval: float = 1.0,
+        trace_sample_rate: float = 0.0,
+    ):
+        if metrics_interval <= 0:
+            raise ValueError("metrics_interval must be positive")
+        if not 0 <= trace_sample_rate <= 1:
+            raise ValueError("trace_sample_rate must be between 0 and 1")
+        # closed by the supervisor while calls to a worker are held back from its
+        # full inbox
+        gates: Dict[Type[Worker], Gate] = {}
         super().__init__(
             workbench_creator=InstanceCreator(SupervisorWorkbench),
-            worker_creator=InstanceCreator(Supervisor).bind(worker_specs=[]),
+            worker_creator=InstanceCreator(Supervisor).bind(
+                worker_specs=[], gates=gates, tracing=trace_sample_rate > 0
+            ),
         )
         self._registry = ScopedWorkshopRegistry()
+        self._gates = gates
+        # the gate of every method of the workers with one
+        self._gated: Dict[Callable, Gate] = {}
+        if metrics:
+            self._spec.metrics_interval = metrics_interval
+        self._trace_sample_rate = trace_sample_rate
+        self._contact = ContactInfo("Workshop", os.getpid())
 
     def register(
         self,
@@ -209,8 +265,33 @@ class Workshop(ThreadStation):
         name: Optional[str] = None,
         *,
         station: Optional[Union[Type[Station], Creator[Station], str]] = None,
-        workbench: Optional[Union[Type[Workbench], Creator[Workbench]]] = None,
+        workbench: Optional[Union[Type[Workbench], Creator[Workbench], str]] = None,
+        replicas: int = 1,
+        balancer: Union[Type[Balancer], Creator[Balancer], str] = "round_robin",
+        autoscale: Optional[AutoscalePolicy] = None,
+        steal: bool = False,
+        max_inbox: Optional[int] = None,
+        overflow: Overflow = "block",
+        serializer: Optional[Union[str, Serializer]] = None,
     ) -> str:
+        """Register a worker class, to be run by ``replicas`` stations of its own.
+
+        Mails to a worker with several replicas are spread by ``balancer``, one of
+        ``"round_robin"``, ``"least_outstanding"`` and ``"power_of_two"`` or a
+        :class:`Balancer`. With ``autoscale``, the number of replicas follows the
+        load of the worker within the bounds of the policy. With ``steal``, mails
+        queued for a busy replica are moved to replicas whose inboxes are empty,
+        which evens out mails of uneven duration at the cost of their order.
+
+        With ``max_inbox``, at most that many mails wait in the inbox of each
+        replica; ``overflow`` tells what becomes of further ones (see
+        :class:`InboxLimit`).
+
+        ``serializer`` is what the replicas send the outcomes of mails back with,
+        if they run in other processes: one of ``"pickle"``, ``"cloudpickle"`` (the
+        default), ``"marshal"`` and ``"msgpack"``, or a :class:`Serializer` (see
+        :mod:`flexplan.serializers`).
+        """
         if name is not None:
             if not isinstance(name, str):
                 raise TypeError(f"Unexpected name type: {type(name)}")
@@ -232,6 +313,8 @@ class Workshop(ThreadStation):
             workbench_creator = InstanceCreator(LoopWorkbench)
         elif isinstance(workbench, InstanceCreator):
             workbench_creator = workbench
+        elif isinstance(workbench, str):
+            workbench_creator = InstanceCreator(self._registry.get_workbench(workbench))
         elif issubclass(wb_t := cast(Type[Workbench], workbench), Workbench):
             workbench_creator = InstanceCreator(wb_t)
         else:
@@ -261,11 +344,112 @@ class Workshop(ThreadStation):
                 worker_creator=worker_creator,
             )
 
+        if not isinstance(replicas, int) or replicas < 1:
+            raise ValueError("replicas must be a positive integer")
+        balancer_creator: Creator[Balancer]
+        if isinstance(balancer, InstanceCreator):
+            balancer_creator = balancer
+        elif isinstance(balancer, str):
+            if (bl_t := balancer_specs.get(balancer)) is None:
+                raise ValueError(f"Balancer name not found: {balancer}")
+            balancer_creator = InstanceCreator(bl_t)
+        elif isinstance(balancer, type) and issubclass(balancer, Balancer):
+            balancer_creator = InstanceCreator(balancer)
+        else:
+            raise TypeError(f"Unexpected balancer type: {type(balancer)}")
+
+        inbox_limit: Optional[InboxLimit] = None
+        if max_inbox is not None:
+            inbox_limit = InboxLimit(max_inbox, overflow)
+            if overflow == "block":
+                gate = self._gates[worker_creator.type] = Gate()
+                gate.set()
+                for _, method in get_public_methods(worker_creator.type):
+                    self._gated[method] = gate
+
+        if serializer is not None:
+            # fails here on unknown names, or if msgpack is missing
+            get_serializer(serializer)
+
         worker_id = gen_worker_id()
         worker_specs: List[WorkerSpec] = self._worker_creator.kwargs["worker_specs"]
-        worker_specs.append((worker_id, name, station_creator))
+        worker_specs.append(
+            WorkerSpec(
+                worker_id,
+                name,
+                station_creator,
+                replicas,
+                balancer_creator,
+                autoscale=autoscale,
+                steal=steal,
+                inbox_limit=inbox_limit,
+                serializer=serializer,
+            )
+        )
         return worker_id
 
+    @override
+    def send(self, mail: "Union[Mail, MailBatch]") -> None:
+        if (gate := self._gate_of(mail)) is not None:
+            # the inbox of the worker is full, wait for the supervisor to make room
+            # rather than pile mails up in its own inbox
+            while not gate.wait(0.1) and self.is_running():
+                pass
+        self._deliver(mail)
+
+    def _gate_of(self, mail: "Union[Mail, MailBatch]") -> Optional[Gate]:
+        if not self._gated:
+            return None
+        try:
+            return self._gated.get(mail.instruction)
+        except TypeError:
+            # unhashable callables are not worker methods
+            return None
+
+    def _deliver(self, mail: "Union[Mail, MailBatch]") -> None:
+        if self._spec.metrics_interval is not None:
+            mail.sent_at = time.monotonic_ns()
+        if (
+            self._trace_sample_rate
+            and type(mail) is Mail
+            and random.random() < self._trace_sample_rate
+        ):
+            start_span(mail, self._contact)
+        super().send(mail)
+
+    def inbox_depths(self) -> Dict[str, List[int]]:
+        """Get the number of mails waiting for each replica of every registered
+        worker, keyed by the IDs :meth:`register` returned."""
+        return self.submit(Supervisor.inbox_depths).result()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the metrics recorded since the workshop started, if it was created
+        with ``metrics=True``.
+
+        ``"supervisor"`` holds the metrics of the mails relayed by the supervisor,
+        ``"workers"`` the name, the inbox depth of every replica and the metrics of
+        every registered worker, keyed by the IDs :meth:`register` returned. The
+        metrics of a method are the number of mails ``received``, ``completed``,
+        failed with ``errors`` and ``skipped``, and summaries of their
+        ``queue_wait`` and ``execution`` times in seconds. ``"serialization"`` of a
+        worker counts the replies serialized and read for it, with their bytes and
+        time in seconds.
+        """
+        return self.submit(Supervisor.stats).result()
+
+    def traces(self) -> List[MailMeta]:
+        """Get the traced mails which have been handled, oldest first; at most
+        :attr:`Supervisor.max_traces` of them are kept."""
+        return self.submit(Supervisor.traces).result()
+
+    def export_traces(
+        self, path: Union[str, "os.PathLike[str]"], format: TraceFormat = "chrome"
+    ) -> None:
+        """Write the traced mails to ``path`` in the Chrome trace event format
+        (``"chrome"``, for ``chrome://tracing`` and Perfetto) or as OTLP/JSON
+        (``"otlp"``)."""
+        write_trace(path, self.traces(), format)
+
     @overload
     def submit(
         self,
@@ -285,25 +469,247 @@ class Workshop(ThreadStation):
     ) -> Future[R]: ...
 
     @overload
-    def submit(self, fn: "Message", /) -> Future: ...
+    def submit(
+        self,
+        fn: "Message",
+        /,
+        *,
+        priority: Optional[int] = None,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> Future: ...
 
     def submit(
         self,
         fn,
         /,
         *args,
+        # left unannotated like the arguments, as the overloads for callables let
+        # any keyword through
+        priority=None,
+        timeout=None,
+        deadline=None,
         **kwargs,
     ) -> Future:
+        """Submit a call to a registered worker and return its future at once.
+
+        The result is delivered into the future when the worker's station replies.
+        A mail with a higher ``priority`` overtakes mails waiting in the same inbox
+        (see :meth:`Message.priority`). A call which has not started ``timeout``
+        seconds from now, or by ``deadline`` (a :func:`time.time` timestamp), is
+        skipped and its future fails with :class:`DeadlineExceededError`; so is a
+        call whose future is cancelled. These arguments are not passed on to the
+        worker, submit a :class:`Message` to call a method with arguments of these
+        names.
+        """
+        mail = self._new_mail(fn, args, kwargs, priority, timeout, deadline)
+        self.send(mail)
+        return cast(Future, mail.future)
+
+    def _new_mail(
+        self,
+        fn: Any,
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+        priority: Optional[int],
+        timeout: Optional[float],
+        deadline: Optional[float],
+    ) -> Mail:
+        future: Future = Future()
         if isinstance(fn, Message):
-            message = fn
-        else:
             if args or kwargs:
                 raise ValueError(
                     "No args or kwargs should be specified if a Message is submitted"
                 )
-            message = Message(fn).params(*args, **kwargs)
+            mail = Mail.new(message=fn, future=future)
+        else:
+            mail = Mail.new(message=Message(fn).params(*args, **kwargs), future=future)
+        if priority is not None:
+            if not isinstance(priority, int):
+                raise TypeError(f"Unexpected priority type: {type(priority)}")
+            mail.priority = priority
+        if timeout is not None:
+            if deadline is not None:
+                raise ValueError("Only one of timeout and deadline can be specified")
+            deadline = time.time() + timeout
+        if deadline is not None:
+            mail.deadline = deadline
+        return mail
 
-        box: DeferredBox[Future] = DeferredBox()
-        self.send(Mail.new(message=message, future=box))
-        future = box.get()
-        return future
+    @overload
+    async def asubmit(
+        self,
+        fn: Callable[Concatenate[Any, P], R],
+        /,
+        *args: P.args,
+        **kwargs: P.kwargs,
+    ) -> R: ...
+
+    @overload
+    async def asubmit(
+        self,
+        fn: Callable[P, R],
+        /,
+        *args: P.args,
+        **kwargs: P.kwargs,
+    ) -> R: ...
+
+    @overload
+    async def asubmit(self, fn: "Message", /) -> Any: ...
+
+    async def asubmit(
+        self,
+        fn,
+        /,
+        *args,
+        # left unannotated like the arguments, as the overloads for callables let
+        # any keyword through
+        priority=None,
+        timeout=None,
+        deadline=None,
+        **kwargs,
+    ) -> Any:
+        """Submit a call like :meth:`submit` and await its result.
+
+        The awaiting task is woken through its event loop, no thread is blocked
+        while the call is pending, nor while it waits for room in the inbox of a
+        worker registered with ``overflow="block"``.
+        """
+        mail = self._new_mail(fn, args, kwargs, priority, timeout, deadline)
+        if (gate := self._gate_of(mail)) is not None and not gate.is_set():
+            await gate.wait_async()
+        self._deliver(mail)
+        return await cast(Future, mail.future)
+
+    def submit_many(self, messages: Iterable[Message]) -> List[Future]:
+        """Submit several messages and return their futures in the same order.
+
+        Messages addressed to the same worker with the same priority are packed into
+        one :class:`MailBatch`, which crosses the supervisor and station queues once.
+        Each call keeps the deadline of its message.
+        """
+        groups: Dict[Any, List[int]] = {}
+        priorities: List[int] = []
+        deadlines: List[Optional[float]] = []
+        calls: List[Tuple[Callable, Tuple[Any, ...], Dict[str, Any]]] = []
+        for message in messages:
+            if not isinstance(message, Message):
+                raise TypeError(f"Unexpected message type: {type(message)}")
+            instruction = message.instruction
+            try:
+                key = get_method_class(instruction)
+            except Exception:
+                key = None
+            priority = message.meta.priority
+            # unresolvable instructions are sent alone, so they only fail themselves
+            group = object() if key is None else (key, priority)
+            groups.setdefault(group, []).append(len(calls))
+            calls.append((instruction, message.args or (), message.kwargs or {}))
+            priorities.append(priority)
+            deadlines.append(message.meta.deadline)
+
+        futures: List[Future] = [Future() for _ in calls]
+        for indices in groups.values():
+            self._send_batch(
+                [calls[i] for i in indices],
+                [futures[i] for i in indices],
+                priorities[indices[0]],
+                [deadlines[i] for i in indices],
+            )
+        return futures
+
+    def map(
+        self,
+        fn: Callable[..., R],
+        /,
+        *iterables: Iterable[Any],
+        timeout: Optional[float] = None,
+        chunksize: int = 1,
+        ordered: bool = True,
+    ) -> Iterator[R]:
+        """Call a worker method for every set of arguments taken from ``iterables``.
+
+        Every ``chunksize`` calls travel as one batch mail. All calls are submitted
+        at once, while results are consumed lazily, either in submission order or,
+        if ``ordered`` is false, as they complete. Exceptions are raised when their
+        result is reached; pending calls are cancelled if the iterator is abandoned.
+        """
+        if chunksize < 1:
+            raise ValueError("chunksize must be >= 1")
+        end_time = None if timeout is None else time.monotonic() + timeout
+
+        futures: List[Future] = []
+        args_iter = zip(*iterables)
+        while chunk := list(islice(args_iter, chunksize)):
+            batch_futures: List[Future] = [Future() for _ in chunk]
+            self._send_batch([(fn, args, {}) for args in chunk], batch_futures)
+            futures.extend(batch_futures)
+
+        def result_iterator() -> Iterator[R]:
+            try:
+                if ordered:
+                    # reversed so that yielded futures can be dropped as we go
+                    futures.reverse()
+                    while futures:
+                        future = futures.pop()
+                        if end_time is None:
+                            yield future.result()
+                        else:
+                            yield future.result(end_time - time.monotonic())
+                else:
+                    remaining = (
+                        None if end_time is None else end_time - time.monotonic()
+                    )
+                    for completed in as_completed(futures, remaining):
+                        yield completed.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+        return result_iterator()
+
+    def _send_batch(
+        self,
+        calls: List[Tuple[Callable, Tuple[Any, ...], Dict[str, Any]]],
+        futures: List[Future],
+        priority: int = 0,
+        deadlines: Optional[List[Optional[float]]] = None,
+    ) -> None:
+        batch_future: Future = Future()
+
+        def fan_out(batch_future: BuiltinFuture) -> None:
+            if batch_future.cancelled():
+                for future in futures:
+                    future.cancel()
+                return
+            exc = batch_future.exception()
+            outcomes = batch_future.result() if exc is None else None
+            for i, future in enumerate(futures):
+                try:
+                    if outcomes is None:
+                        future.set_exception(exc)
+                    elif outcomes[i][0]:
+                        future.set_result(outcomes[i][1])
+                    else:
+                        future.set_exception(outcomes[i][1])
+                except InvalidStateError:
+                    # cancelled by the caller meanwhile
+                    pass
+
+        # nobody waits for the batch once all its calls are cancelled, so that it
+        # is skipped rather than run; futures are cancelled at most once, and
+        # next() on a count is atomic, whichever thread cancels them
+        cancelled = count(1)
+
+        def cancel_batch(future: BuiltinFuture) -> None:
+            if future.cancelled() and next(cancelled) == len(futures):
+                batch_future.cancel()
+
+        batch_future.add_done_callback(fan_out)
+        for future in futures:
+            future.add_done_callback(cancel_batch)
+        self.send(
+            MailBatch(
+                calls, future=batch_future, priority=priority, deadlines=deadlines
+            )
+        )
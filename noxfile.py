@@ -155,3 +155,9 @@ def lint(session: Session, autoflake: str, ruff: str):
     session.run("ruff", "--version")
     session.run("ruff", "check", "--select", "I", "--diff", *SOURCES)
     session.run("ruff", "format", "--check", "--diff", *SOURCES)
+
+
+@nox.session(python=PYTHON_VERSION, reuse_venv=True)
+def benchmark(session: Session):
+    session.install("-e", ".")
+    session.run("python", "benchmarks/bench_workshop.py", *session.posargs)
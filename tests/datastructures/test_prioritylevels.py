@@ -0,0 +1,66 @@
+import time
+from queue import Empty
+
+import pytest
+
+from flexplan.datastructures.notifyqueue import PriorityNotifyQueue
+from flexplan.datastructures.prioritylevels import PriorityLevels
+from flexplan.datastructures.processqueue import PriorityProcessQueue
+
+
+class Item:
+    def __init__(self, name, priority=0):
+        self.name = name
+        self.priority = priority
+
+
+ITEMS = [("a", 0), ("b", -1), ("c", 5), ("d", 0), ("e", 5)]
+ORDER = ["c", "e", "a", "d", "b"]
+
+
+def test_priority_levels():
+    levels = PriorityLevels()
+    for name, priority in ITEMS:
+        levels.append(Item(name, priority))
+    levels.append(None)
+    assert len(levels) == 6
+    assert [levels.popleft().name for _ in range(4)] == ORDER[:4]
+    assert levels.popleft() is None
+    assert levels.popleft().name == "b"
+    with pytest.raises(IndexError):
+        levels.popleft()
+
+
+def test_priority_levels_lowest():
+    levels = PriorityLevels()
+    for name, priority in ITEMS:
+        levels.append(Item(name, priority))
+    assert levels.popleft().name == "c"
+    assert [levels.popleft_lowest().name for _ in ITEMS[1:]] == ["b", "a", "d", "e"]
+    with pytest.raises(IndexError):
+        levels.popleft_lowest()
+
+
+@pytest.mark.parametrize("queue_type", [PriorityNotifyQueue, PriorityProcessQueue])
+def test_priority_queues(queue_type):
+    queue = queue_type()
+    for name, priority in ITEMS:
+        queue.put(Item(name, priority))
+    # let the feeder thread of a process queue flush the pipe
+    time.sleep(0.2)
+    assert queue.qsize() == len(ITEMS)
+    assert queue.get(timeout=5).name == ORDER[0]
+    assert queue.qsize() == len(ITEMS) - 1
+    assert [queue.get(timeout=5).name for _ in ITEMS[1:]] == ORDER[1:]
+    assert queue.empty()
+
+
+def test_priority_notify_queue_take():
+    queue = PriorityNotifyQueue()
+    for name, priority in ITEMS:
+        queue.put(Item(name, priority))
+    assert queue.take_nowait().name == "b"
+    assert queue.take_nowait().name == "a"
+    assert [queue.get(timeout=5).name for _ in ITEMS[2:]] == ["c", "e", "d"]
+    with pytest.raises(Empty):
+        queue.take_nowait()
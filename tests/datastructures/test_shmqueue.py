@@ -0,0 +1,57 @@
+import multiprocessing
+import threading
+from queue import Empty, Full
+
+import pytest
+
+from flexplan.datastructures.shmqueue import ShmQueue
+
+
+def _echo(inbox: ShmQueue, outbox: ShmQueue) -> None:
+    while (item := inbox.get(timeout=10)) is not None:
+        outbox.put(item)
+
+
+def test_shmqueue_wraps_around_and_splits_large_items():
+    queue = ShmQueue(4096)
+    try:
+        for i in range(1000):
+            queue.put(i)
+            assert queue.qsize() == 1
+            assert queue.get_nowait() == i
+        big = bytes(range(256)) * 100
+        consumer = threading.Thread(target=lambda: result.append(queue.get(timeout=5)))
+        result = []
+        consumer.start()
+        queue.put(big)
+        consumer.join()
+        assert result == [big]
+        assert queue.empty()
+        with pytest.raises(Empty):
+            queue.get(timeout=0.01)
+        with pytest.raises(Full):
+            while True:
+                queue.put_nowait(b"x" * 1000)
+    finally:
+        queue.unlink()
+
+
+def test_shmqueue_across_processes():
+    ctx = multiprocessing.get_context("spawn")
+    inbox, outbox = ShmQueue(mp_context=ctx), ShmQueue(mp_context=ctx)
+    process = ctx.Process(target=_echo, args=(inbox, outbox), daemon=True)
+    process.start()
+    try:
+        items = [{"n": i, "payload": b"\0" * (i * 997)} for i in range(200)]
+        for item in items:
+            inbox.put(item)
+            assert outbox.get(timeout=10) == item
+        for i in range(1000):
+            inbox.put(i)
+        assert [outbox.get(timeout=10) for _ in range(1000)] == list(range(1000))
+        inbox.put(None)
+        process.join(10)
+        assert process.exitcode == 0
+    finally:
+        inbox.unlink()
+        outbox.unlink()
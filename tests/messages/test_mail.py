@@ -0,0 +1,70 @@
+import pickle
+from queue import Queue
+
+import pytest
+
+from flexplan import Worker, Workshop
+from flexplan.messages.mail import UNTRACED, CompactMail, Mail, RemoteFuture
+from flexplan.utils import buffers
+
+
+class Calculator(Worker):
+    def add(self, a, b):
+        return a + b
+
+    def negate(self, value):
+        return -value
+
+
+METHOD_IDS = {Calculator.add: 0, Calculator.negate: 1}
+
+
+def test_compact_mail_roundtrip():
+    mail = Mail(Calculator.negate, args=(3,), meta=UNTRACED, future=RemoteFuture(7))
+    compact = CompactMail.encode(mail, METHOD_IDS)
+    assert type(compact) is CompactMail
+    data = buffers.dumps(compact)
+    assert len(data) < len(buffers.dumps(mail)) / 2
+    received = buffers.loads(data)
+    assert type(received) is Mail
+    assert received.instruction == 1
+    assert received.args == (3,)
+    assert received.kwargs == {}
+    assert received.future.correlation_id == 7
+    # large buffers still travel out of band
+    large = Mail(Calculator.add, args=(b"x" * (1 << 20), b""), meta=UNTRACED)
+    received = buffers.loads(buffers.dumps(CompactMail.encode(large, METHOD_IDS), 1024))
+    assert received.args[0] == b"x" * (1 << 20)
+    assert (
+        pickle.loads(pickle.dumps(CompactMail.encode(large, METHOD_IDS))).future is None
+    )
+
+
+def test_compact_mail_keeps_full_mails():
+    for mail in (
+        Mail(Calculator.add, args=(1, 2), meta=UNTRACED, priority=1),
+        Mail(Calculator.add, args=(1, 2), meta=UNTRACED, deadline=1.0),
+        Mail(print, args=(), meta=UNTRACED),
+    ):
+        assert CompactMail.encode(mail, METHOD_IDS) is mail
+
+
+@pytest.mark.parametrize("station", ["process", "zmq"])
+def test_workshop_compact_mails(station):
+    if station == "zmq":
+        pytest.importorskip("zmq")
+    workshop = Workshop()
+    workshop.register(Calculator, station=station)
+    with workshop:
+        assert workshop.submit(Calculator.add, 1, b=2).result(timeout=10) == 3
+        assert workshop.submit(Calculator.negate, 3).result(timeout=10) == -3
+
+
+def test_remote_future_state():
+    outbox = Queue()
+    future = RemoteFuture(3)
+    future.bind(outbox)
+    assert not future.done() and not future.cancelled()
+    future.set_result(1)
+    assert future.done() and not future.cancelled()
+    assert outbox.get_nowait().correlation_id == 3
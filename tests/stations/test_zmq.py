@@ -0,0 +1,222 @@
+import os
+import socket
+import time
+
+import pytest
+
+from flexplan import Message, Worker, Workshop
+from flexplan.datastructures.instancecreator import InstanceCreator
+from flexplan.errors import WorkerRuntimeError
+
+zmq = pytest.importorskip("zmq")
+
+
+class Echo(Worker):
+    def echo(self, value):
+        return value
+
+    def pid(self):
+        return os.getpid()
+
+
+class Forwarder(Worker):
+    def forward(self, value):
+        return Message(Echo.echo).params(value).submit().result(timeout=10)
+
+
+class Pinger(Worker):
+    def ping(self):
+        return "pong"
+
+
+@pytest.mark.parametrize("endpoint", [None, "tcp://127.0.0.1:*"])
+def test_zmq_station(endpoint):
+    from flexplan.stations.zmq import ZmqStation
+
+    workshop = Workshop()
+    workshop.register(
+        Echo,
+        station=InstanceCreator(ZmqStation).bind(
+            endpoint=endpoint, processes=2, hwm=16, batch_size=4
+        ),
+    )
+    with workshop:
+        assert list(workshop.map(Echo.echo, range(200), chunksize=8)) == list(
+            range(200)
+        )
+        pids = {workshop.submit(Echo.pid).result(timeout=10) for _ in range(20)}
+        assert len(pids) == 2
+        data = bytes(1 << 20)
+        assert workshop.submit(Echo.echo, data).result(timeout=10) == data
+
+
+def test_zmq_station_futures_of_runners():
+    workshop = Workshop()
+    workshop.register(Forwarder, station="zmq")
+    workshop.register(Echo)
+    with workshop:
+        futures = [workshop.submit(Forwarder.forward, i) for i in range(20)]
+        assert [f.result(timeout=20) for f in futures] == list(range(20))
+
+
+def test_zmq_station_remote_runner(tmp_path):
+    import multiprocessing
+
+    from flexplan.runner import main
+    from flexplan.stations.zmq import ZmqStation
+
+    endpoint = f"ipc://{tmp_path}/station.sock"
+    workshop = Workshop()
+    workshop.register(
+        Echo,
+        station=InstanceCreator(ZmqStation).bind(endpoint=endpoint, processes=0),
+    )
+    with workshop:
+        # mails wait for the runner to connect
+        future = workshop.submit(Echo.pid)
+        runner = multiprocessing.get_context("spawn").Process(
+            target=main, args=([endpoint],)
+        )
+        runner.start()
+        assert future.result(timeout=20) == runner.pid
+    runner.join(timeout=10)
+    assert runner.exitcode == 0
+
+
+def test_zmq_station_holds_mails_without_blocking(tmp_path):
+    import multiprocessing
+
+    from flexplan.runner import main
+    from flexplan.stations.zmq import ZmqStation
+
+    endpoint = f"ipc://{tmp_path}/station.sock"
+    workshop = Workshop()
+    echo_id = workshop.register(
+        Echo,
+        station=InstanceCreator(ZmqStation).bind(endpoint=endpoint, processes=0, hwm=2),
+    )
+    workshop.register(Pinger)
+    with workshop:
+        futures = [workshop.submit(Echo.echo, i) for i in range(10)]
+        # the supervisor holds back what the station cannot take, and goes on
+        # relaying other mails meanwhile
+        assert workshop.submit(Pinger.ping).result(timeout=10) == "pong"
+        assert workshop.inbox_depths()[echo_id] == [10]
+        runner = multiprocessing.get_context("spawn").Process(
+            target=main, args=([endpoint],)
+        )
+        runner.start()
+        assert [f.result(timeout=20) for f in futures] == list(range(10))
+    runner.join(timeout=10)
+    assert runner.exitcode == 0
+
+
+class Crasher(Worker):
+    def crash(self):
+        os._exit(1)
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+def test_zmq_station_refuses_remote_endpoints_without_keys():
+    from flexplan.stations.zmq import ZmqStation
+    from flexplan.workbench.loop import LoopWorkbench
+
+    options = dict(
+        workbench_creator=InstanceCreator(LoopWorkbench),
+        worker_creator=InstanceCreator(Echo),
+    )
+    with pytest.raises(ValueError, match="secret_key"):
+        ZmqStation(endpoint="tcp://*:*", **options)
+    ZmqStation(endpoint="tcp://*:*", insecure=True, **options)
+    ZmqStation(endpoint="tcp://*:*", secret_key=zmq.curve_keypair()[1], **options)
+
+
+@pytest.mark.skipif(not zmq.has("curve"), reason="libzmq without CURVE")
+def test_zmq_station_curve(tmp_path):
+    import multiprocessing
+
+    from flexplan.runner import main
+    from flexplan.stations.zmq import ZmqStation
+
+    server_key, server_secret = zmq.curve_keypair()
+    runner_public, runner_secret = zmq.curve_keypair()
+    key_file = tmp_path / "runner.key"
+    key_file.write_bytes(runner_secret)
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        endpoint = "tcp://127.0.0.1:%d" % probe.getsockname()[1]
+    station = InstanceCreator(ZmqStation).bind(
+        endpoint=endpoint,
+        processes=1,
+        secret_key=server_secret,
+        authorized_keys=[runner_public],
+    )
+    workshop = Workshop()
+    workshop.register(Echo, station=station)
+    with workshop:
+        assert workshop.submit(Echo.echo, 1).result(timeout=10) == 1
+
+        # a runner with a key of its own is not let in
+        context = zmq.Context()
+        intruder = context.socket(zmq.DEALER)
+        intruder.curve_serverkey = server_key
+        intruder.curve_publickey, intruder.curve_secretkey = zmq.curve_keypair()
+        intruder.connect(endpoint)
+        intruder.send(b"H")
+        assert not intruder.poll(1000)
+        intruder.close(linger=0)
+        context.term()
+
+        runner = multiprocessing.get_context("spawn").Process(
+            target=main,
+            args=(
+                [
+                    "--server-key",
+                    server_key.decode(),
+                    "--secret-key-file",
+                    str(key_file),
+                    endpoint,
+                ],
+            ),
+        )
+        runner.start()
+        deadline = time.monotonic() + 20
+        while workshop.submit(Echo.pid).result(timeout=10) != runner.pid:
+            assert time.monotonic() < deadline
+    runner.join(timeout=10)
+    assert runner.exitcode == 0
+
+
+def test_zmq_station_fails_mails_of_lost_runners():
+    from flexplan.stations.zmq import ZmqStation
+
+    workshop = Workshop()
+    workshop.register(
+        Crasher,
+        station=InstanceCreator(ZmqStation).bind(processes=2, heartbeat_timeout=1),
+    )
+    with workshop:
+        with pytest.raises(WorkerRuntimeError, match="lost"):
+            workshop.submit(Crasher.crash).result(timeout=20)
+        # the remaining runner takes the mails
+        for _ in range(4):
+            assert workshop.submit(Crasher.sleep, 0).result(timeout=10) is None
+
+
+def test_zmq_station_stop_timeout():
+    from flexplan.stations.zmq import ZmqStation
+
+    workshop = Workshop()
+    workshop.register(
+        Crasher,
+        station=InstanceCreator(ZmqStation).bind(processes=1, stop_timeout=1),
+    )
+    with workshop:
+        future = workshop.submit(Crasher.sleep, 60)
+        time.sleep(0.5)
+        started = time.monotonic()
+    assert time.monotonic() - started < 10
+    with pytest.raises(WorkerRuntimeError):
+        future.result(timeout=0)
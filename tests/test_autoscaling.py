@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+
+from flexplan import Worker, Workshop
+from flexplan.autoscaling import AutoscalePolicy, Autoscaler
+from flexplan.balancers import RoundRobinBalancer
+from flexplan.datastructures.future import Future
+
+
+class Sleeper(Worker):
+    def sleep(self, delay):
+        time.sleep(delay)
+        return threading.get_ident()
+
+
+class FakeStation:
+    def inbox_depth(self):
+        return 0
+
+
+def test_autoscaler_decide():
+    policy = AutoscalePolicy(
+        max_replicas=2,
+        scale_up_load=2,
+        scale_down_load=1,
+        scale_up_cooldown=0,
+        scale_down_cooldown=0,
+    )
+    a, b = FakeStation(), FakeStation()
+    scaler = Autoscaler(RoundRobinBalancer(), policy)
+    scaler.bind([a])
+    futures = [Future() for _ in range(3)]
+    for future in futures:
+        scaler.on_sent(scaler.select(), future)
+    assert scaler.outstanding(a) == 3
+    assert scaler.decide() == 1
+    scaler.bind([a, b])
+    assert scaler.decide() == 0
+    for future in futures:
+        future.set_result(None)
+    assert scaler.decide() == -1
+
+
+def test_autoscaler_stolen():
+    policy = AutoscalePolicy(max_replicas=2)
+    a, b = FakeStation(), FakeStation()
+    scaler = Autoscaler(RoundRobinBalancer(), policy)
+    scaler.bind([a, b])
+    future = Future()
+    scaler.on_sent(a, future)
+    scaler.on_stolen(a, future)
+    scaler.on_sent(b, future)
+    assert (scaler.outstanding(a), scaler.outstanding(b)) == (0, 1)
+    future.set_result(None)
+    assert (scaler.outstanding(a), scaler.outstanding(b)) == (0, 0)
+
+
+def test_autoscale_policy_bounds():
+    with pytest.raises(ValueError):
+        AutoscalePolicy(min_replicas=3, max_replicas=2)
+
+
+def test_workshop_autoscale():
+    policy = AutoscalePolicy(
+        max_replicas=3,
+        scale_up_load=1,
+        scale_down_load=0.5,
+        scale_up_cooldown=0,
+        scale_down_cooldown=0.2,
+        interval=0.05,
+    )
+    workshop = Workshop()
+    workshop.register(Sleeper, station="thread", autoscale=policy)
+    with workshop:
+        # mails already queued stay with their replica, so keep them coming
+        futures = []
+        for _ in range(200):
+            futures.append(workshop.submit(Sleeper.sleep, 0.02))
+            time.sleep(0.005)
+        busy = {future.result(timeout=20) for future in futures}
+        assert len(busy) > 1
+        # idle long enough for the extra replicas to be drained and stopped
+        time.sleep(1.5)
+        idle = {workshop.submit(Sleeper.sleep, 0).result(timeout=5) for _ in range(6)}
+        assert len(idle) == 1
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from flexplan import Worker, Workshop
+from flexplan.backpressure import InboxLimit
+from flexplan.errors import InboxFullError
+
+started = threading.Event()
+release = threading.Event()
+
+
+class Gated(Worker):
+    def hold(self):
+        started.set()
+        release.wait(10)
+
+    def echo(self, value):
+        return value
+
+
+def start_holding(workshop):
+    started.clear()
+    release.clear()
+    holding = workshop.submit(Gated.hold)
+    assert started.wait(10)
+    return holding
+
+
+def test_inbox_limit_validation():
+    with pytest.raises(ValueError):
+        InboxLimit(0)
+    with pytest.raises(ValueError):
+        InboxLimit(1, "drop_all")
+
+
+@pytest.mark.parametrize("overflow", ["fail", "drop_newest", "drop_oldest"])
+def test_workshop_inbox_overflow(overflow):
+    workshop = Workshop()
+    workshop.register(Gated, max_inbox=2, overflow=overflow)
+    with workshop:
+        start_holding(workshop)
+        futures = [workshop.submit(Gated.echo, i) for i in range(3)]
+        time.sleep(0.1)
+        release.set()
+        if overflow == "fail":
+            with pytest.raises(InboxFullError):
+                futures[2].result(timeout=10)
+            assert [f.result(timeout=10) for f in futures[:2]] == [0, 1]
+        elif overflow == "drop_newest":
+            assert futures[2].cancelled()
+            assert [f.result(timeout=10) for f in futures[:2]] == [0, 1]
+        else:
+            assert futures[0].cancelled()
+            assert [f.result(timeout=10) for f in futures[1:]] == [1, 2]
+
+
+def test_workshop_inbox_drop_oldest_priorities():
+    workshop = Workshop()
+    workshop.register(Gated, max_inbox=2, overflow="drop_oldest")
+    with workshop:
+        start_holding(workshop)
+        urgent = workshop.submit(Gated.echo, 0, priority=5)
+        futures = [workshop.submit(Gated.echo, i) for i in range(1, 3)]
+        time.sleep(0.1)
+        release.set()
+        # the mail which would have started last makes room
+        assert futures[0].cancelled()
+        assert urgent.result(timeout=10) == 0
+        assert futures[1].result(timeout=10) == 2
+
+
+def test_workshop_inbox_block():
+    workshop = Workshop()
+    worker_id = workshop.register(Gated, max_inbox=2)
+    with workshop:
+        start_holding(workshop)
+        futures = []
+
+        def produce():
+            for i in range(10):
+                futures.append(workshop.submit(Gated.echo, i))
+                # submits racing the supervisor may get past the gate before it
+                # closes
+                time.sleep(0.01)
+
+        producer = threading.Thread(target=produce)
+        producer.start()
+        time.sleep(0.2)
+        # two mails in the inbox, one held back by the supervisor, and the producer
+        # waiting to submit the next
+        assert producer.is_alive()
+        assert len(futures) == 3
+        assert workshop.inbox_depths() == {worker_id: [3]}
+        release.set()
+        producer.join(10)
+        assert [f.result(timeout=10) for f in futures] == list(range(10))
+
+
+def test_workshop_inbox_block_asubmit():
+    workshop = Workshop()
+    workshop.register(Gated, max_inbox=1)
+    with workshop:
+        holding = start_holding(workshop)
+        # one mail in the inbox, one held back, and the gate closed
+        futures = [workshop.submit(Gated.echo, i) for i in range(2)]
+        time.sleep(0.1)
+
+        async def main():
+            task = asyncio.ensure_future(workshop.asubmit(Gated.echo, 2))
+            started = time.monotonic()
+            for _ in range(10):
+                await asyncio.sleep(0.01)
+            # the loop has been running meanwhile
+            assert time.monotonic() - started < 1
+            assert not task.done()
+            release.set()
+            return await asyncio.wait_for(task, 10)
+
+        assert asyncio.run(main()) == 2
+        holding.result(timeout=10)
+        assert [f.result(timeout=10) for f in futures] == [0, 1]
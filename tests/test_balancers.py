@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+
+import pytest
+
+from flexplan import Worker, Workshop
+from flexplan.balancers import LeastOutstandingBalancer, PowerOfTwoBalancer
+from flexplan.datastructures.future import Future
+
+
+class Pid(Worker):
+    def pid(self, delay=0.0):
+        time.sleep(delay)
+        return os.getpid()
+
+
+@pytest.mark.parametrize(
+    "balancer", ["round_robin", "least_outstanding", "power_of_two"]
+)
+def test_workshop_replicas(balancer):
+    workshop = Workshop()
+    workshop.register(Pid, station="process", replicas=3, balancer=balancer)
+    with workshop:
+        futures = [workshop.submit(Pid.pid, 0.05) for _ in range(30)]
+        pids = [future.result(timeout=20) for future in futures]
+    assert len(set(pids)) == 3
+    if balancer == "round_robin":
+        assert pids[:3] * 10 == pids
+
+
+class FakeStation:
+    def __init__(self, depth):
+        self.depth = depth
+
+    def inbox_depth(self):
+        return self.depth
+
+
+def test_least_outstanding_balancer():
+    a, b = FakeStation(0), FakeStation(0)
+    balancer = LeastOutstandingBalancer()
+    balancer.bind([a, b])
+    futures = []
+    for _ in range(4):
+        station = balancer.select()
+        futures.append(future := Future())
+        balancer.on_sent(station, future)
+    assert balancer.select() is a
+    futures[1].set_result(None)
+    assert balancer.select() is b
+
+
+def test_least_outstanding_balancer_stolen():
+    a, b = FakeStation(0), FakeStation(0)
+    balancer = LeastOutstandingBalancer()
+    balancer.bind([a, b])
+    future = Future()
+    balancer.on_sent(a, future)
+    balancer.on_sent(a, Future())
+    # taken out of the inbox of a and sent to b instead
+    balancer.on_stolen(a, future)
+    balancer.on_sent(b, future)
+    assert balancer.select() is a
+    future.set_result(None)
+    balancer.on_sent(b, Future())
+    # a has one outstanding future left, b has one
+    assert balancer.select() is a
+
+
+def test_power_of_two_balancer():
+    stations = [FakeStation(5), FakeStation(0)]
+    balancer = PowerOfTwoBalancer(seed=0)
+    balancer.bind(stations)
+    assert all(balancer.select() is stations[1] for _ in range(10))
+
+
+class Ident(Worker):
+    def ident(self, delay=0.0):
+        time.sleep(delay)
+        return os.getpid(), threading.get_ident()
+
+
+@pytest.mark.parametrize("station", ["thread", "process"])
+def test_workshop_steal(station):
+    workshop = Workshop()
+    workshop.register(Ident, station=station, replicas=2, steal=True)
+    with workshop:
+        workshop.submit(Ident.ident).result(timeout=20)
+        slow = workshop.submit(Ident.ident, 2)
+        time.sleep(0.1)
+        # every other mail is queued behind the slow one, to be taken by the other
+        # replica
+        futures = [workshop.submit(Ident.ident, 0.01) for _ in range(20)]
+        pids = {future.result(timeout=1.5) for future in futures}
+        assert not slow.done()
+        assert len(pids) == 1
+        assert slow.result(timeout=20) not in pids
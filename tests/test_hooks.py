@@ -0,0 +1,65 @@
+import logging
+
+from flexplan import Worker, Workshop, hooks
+from flexplan.workbench.base import FAILED
+
+
+class Hooked(Worker):
+    def echo(self, value):
+        return value
+
+    def fail(self):
+        raise ValueError("failed")
+
+
+def test_hook_subscribe():
+    hook = hooks.Hook("test")
+    assert not hook
+    calls = []
+    unsubscribe = hooks.subscribe(hook, lambda *args: calls.append(args))
+    assert hook
+    hook.fire(1, 2)
+    unsubscribe()
+    unsubscribe()
+    assert not hook
+    hook.fire(3)
+    assert calls == [(1, 2)]
+
+
+def test_workshop_hooks():
+    events = []
+    unsubscribes = [
+        hooks.subscribe(hook, lambda *args, name=hook.name: events.append((name, args)))
+        for hook in hooks.HOOKS
+    ]
+    try:
+        workshop = Workshop()
+        workshop.register(Hooked)
+        with workshop:
+            assert workshop.submit(Hooked.echo, 1).result(timeout=10) == 1
+            workshop.submit(Hooked.fail).exception(timeout=10)
+    finally:
+        for unsubscribe in unsubscribes:
+            unsubscribe()
+    names = [name for name, _ in events]
+    assert names.count("station_started") == 1
+    assert names.count("station_stopped") == 1
+    relayed = [args[0].instruction for name, args in events if name == "mail_relayed"]
+    assert relayed == [Hooked.echo, Hooked.fail]
+    ended = [args[2] for name, args in events if name == "handler_ended"]
+    assert ended[-2:] == [1, FAILED]
+    assert "instance_created" in names
+
+
+def test_log_events(caplog):
+    stop = hooks.log_events()
+    try:
+        with caplog.at_level(logging.DEBUG, logger="flexplan"):
+            workshop = Workshop()
+            workshop.register(Hooked)
+            with workshop:
+                workshop.submit(Hooked.echo, 1).result(timeout=10)
+    finally:
+        stop()
+    assert any("mail_relayed" in record.getMessage() for record in caplog.records)
+    assert not any(hooks.HOOKS)
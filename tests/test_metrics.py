@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from flexplan import Worker, Workshop
+from flexplan.metrics import Histogram, WorkerMetrics
+
+
+class Measured(Worker):
+    def echo(self, value):
+        return value
+
+    def fail(self):
+        raise ValueError("failed")
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    for value in range(1, 1001):
+        histogram.record(value * 1000)
+    assert histogram.count == 1000
+    assert histogram.max == 1_000_000
+    # values are known within 1/8 of themselves
+    assert 500_000 <= histogram.percentile(50) <= 500_000 * 9 / 8
+    assert 990_000 <= histogram.percentile(99) <= 990_000 * 9 / 8
+    assert histogram.percentile(100) == 1_000_000
+
+
+def test_worker_metrics_merge():
+    first, second = WorkerMetrics(), WorkerMetrics()
+    for metrics in (first, second):
+        method = metrics.method(Measured.echo)
+        method.received += 1
+        method.completed += 1
+        method.record(10, 20)
+    first.merge(second)
+    summary = first.summary()["echo"]
+    assert summary["completed"] == 2
+    assert summary["queue_wait"]["count"] == 2
+    assert summary["execution"]["count"] == 2
+
+
+@pytest.mark.parametrize("station", ["thread", "process"])
+def test_workshop_stats(station):
+    workshop = Workshop(metrics=True, metrics_interval=0.05)
+    worker_id = workshop.register(Measured, "measured", station=station, replicas=2)
+    with workshop:
+        for future in [workshop.submit(Measured.echo, i) for i in range(20)]:
+            future.result(timeout=10)
+        with pytest.raises(ValueError):
+            workshop.submit(Measured.fail).result(timeout=10)
+        time.sleep(0.3)
+        stats = workshop.stats()
+    worker = stats["workers"][worker_id]
+    assert worker["name"] == "measured"
+    assert worker["inbox_depth"] == [0, 0]
+    echo = worker["methods"]["echo"]
+    assert (echo["received"], echo["completed"], echo["errors"]) == (20, 20, 0)
+    assert echo["queue_wait"]["count"] == 20
+    assert echo["execution"]["count"] == 20
+    assert worker["methods"]["fail"]["errors"] == 1
+    assert stats["supervisor"]["echo"]["completed"] == 20
+
+
+def test_workshop_stats_disabled():
+    workshop = Workshop()
+    worker_id = workshop.register(Measured)
+    with workshop:
+        workshop.submit(Measured.echo, 1).result(timeout=10)
+        stats = workshop.stats()
+    assert stats["workers"][worker_id]["methods"] == {}
+    assert stats["supervisor"] == {}
@@ -0,0 +1,144 @@
+import pickle
+import time
+
+import pytest
+
+from flexplan import Worker, Workshop
+from flexplan.serializers import (
+    CloudPickleSerializer,
+    MarshalSerializer,
+    PickleSerializer,
+    get_serializer,
+    loads,
+)
+
+
+class Serialized(Worker):
+    def plain(self):
+        return {"values": [1, 2.5, "three", b"four", None]}
+
+    def closure(self, offset):
+        return lambda value: value + offset
+
+
+@pytest.mark.parametrize("name", ["pickle", "cloudpickle", "marshal"])
+def test_serializer_roundtrip(name):
+    serializer = get_serializer(name)
+    value = {"key": (1, 2.5, "text", b"bytes", None, True, {3, 4})}
+    assert serializer.loads(serializer.dumps(value)) == value
+    assert loads(serializer.dumps(value)) == value
+    stats = serializer.stats.summary()
+    assert (stats["dumps"], stats["loads"]) == (2, 1)
+    assert stats["dumps_bytes"] > 0
+
+
+class Int(int):
+    pass
+
+
+class List(list):
+    pass
+
+
+def type_tree(value):
+    """Get the types of ``value`` and of everything it holds."""
+    if isinstance(value, dict):
+        return (type(value), [(type_tree(k), type_tree(v)) for k, v in value.items()])
+    if isinstance(value, (tuple, list)):
+        return (type(value), [type_tree(item) for item in value])
+    return type(value)
+
+
+@pytest.mark.parametrize("name", ["marshal", "msgpack"])
+@pytest.mark.parametrize(
+    "value",
+    [
+        [1, {"a": bytearray(b"x")}],
+        {"set": (frozenset({1}), bytearray(3))},
+        [Int(1), List([2])],
+        {"key": [True, 1.5, b"x"]},
+    ],
+)
+def test_serializer_roundtrip_types(name, value):
+    if name == "msgpack":
+        pytest.importorskip("msgpack")
+    serializer = get_serializer(name)
+    result = loads(serializer.dumps(value))
+    assert result == value
+    assert type_tree(result) == type_tree(value)
+
+
+@pytest.mark.parametrize("name", ["marshal", "msgpack"])
+def test_serializer_large_bytes_out_of_band(name):
+    if name == "msgpack":
+        pytest.importorskip("msgpack")
+    serializer = get_serializer(name)
+    data = bytes(range(256)) * 1024
+    value = [data, 1]
+    buffers = []
+    payload = serializer.dumps(value, buffers)
+    assert payload[0] == pickle.PROTO[0]
+    assert [memoryview(buffer).nbytes for buffer in buffers] == [len(data)]
+    assert len(payload) < 1024
+    assert serializer.loads(payload, buffers) == value
+    # not a fallback, the faster format for this value
+    assert serializer.stats.fallbacks == 0
+    assert serializer.dumps([b"small"], [])[:1] != pickle.PROTO
+
+
+def test_serializer_fallbacks():
+    offset = 1
+    closure = lambda value: value + offset  # noqa: E731
+    with pytest.raises((pickle.PicklingError, AttributeError)):
+        PickleSerializer().dumps(closure)
+    serializer = CloudPickleSerializer()
+    assert loads(serializer.dumps(closure))(1) == 2
+    assert serializer.stats.fallbacks == 1
+    # plain data does not pay for cloudpickle
+    serializer.dumps([1, 2, 3])
+    assert serializer.stats.fallbacks == 1
+
+    serializer = MarshalSerializer()
+    assert serializer.dumps((1, "a"))[:1] == b"M"
+    # instances of subclasses of the built-in types are pickled
+    assert loads(serializer.dumps(pytest.ExitCode.OK)) is pytest.ExitCode.OK
+    assert serializer.stats.fallbacks == 1
+
+
+def test_serializer_out_of_band_buffers():
+    serializer = PickleSerializer()
+    buffers = []
+    data = serializer.dumps(pickle.PickleBuffer(bytearray(1000)), buffers)
+    assert len(buffers) == 1
+    assert serializer.stats.dumps_bytes == len(data) + 1000
+    assert bytes(serializer.loads(data, buffers)) == bytes(1000)
+
+
+def test_get_serializer_unknown():
+    with pytest.raises(ValueError):
+        get_serializer("json")
+    with pytest.raises(ValueError):
+        Workshop().register(Serialized, serializer="json")
+
+
+@pytest.mark.parametrize("serializer", ["marshal", "cloudpickle"])
+def test_workshop_serializer(serializer):
+    workshop = Workshop(metrics=True, metrics_interval=0.05)
+    worker_id = workshop.register(Serialized, station="process", serializer=serializer)
+    with workshop:
+        assert workshop.submit(Serialized.plain).result(timeout=10) == {
+            "values": [1, 2.5, "three", b"four", None]
+        }
+        assert workshop.submit(Serialized.closure, 1).result(timeout=10)(1) == 2
+        stats = workshop.stats()
+        deadline = time.monotonic() + 5
+        while (
+            stats["workers"][worker_id]["serialization"]["dumps"] < 2
+            and time.monotonic() < deadline
+        ):
+            time.sleep(0.05)
+            stats = workshop.stats()
+    serialization = stats["workers"][worker_id]["serialization"]
+    assert serialization["dumps"] >= 2
+    assert serialization["loads"] >= 2
+    assert serialization["fallbacks"] >= 1
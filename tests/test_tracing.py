@@ -0,0 +1,64 @@
+import json
+import time
+
+import pytest
+
+from flexplan import Message, Worker, Workshop
+
+
+class First(Worker):
+    def start(self):
+        Message(Second.finish).emit()
+        return "started"
+
+
+class Second(Worker):
+    def finish(self):
+        pass
+
+
+@pytest.mark.parametrize("station", ["thread", "process"])
+def test_workshop_traces_chain(station, tmp_path):
+    workshop = Workshop(trace_sample_rate=1.0)
+    workshop.register(First, station=station)
+    workshop.register(Second, station=station)
+    with workshop:
+        assert workshop.submit(First.start).result(timeout=10) == "started"
+        time.sleep(0.3)
+        traces = {meta.name: meta for meta in workshop.traces()}
+        workshop.export_traces(tmp_path / "trace.json")
+        workshop.export_traces(tmp_path / "trace.otlp.json", "otlp")
+    first, second = traces["First.start"], traces["Second.finish"]
+    hops = ["submit", "relay", "enqueue", "dequeue", "start", "end"]
+    if station == "process":
+        assert [hop.hop for hop in first.trace] == [*hops, "result"]
+    else:
+        assert [hop.hop for hop in first.trace] == hops
+    assert [hop.hop for hop in second.trace] == hops
+    assert second.trace_id == first.trace_id
+    assert second.parent_id == first.span_id
+    timestamps = [hop.timestamp for hop in first.trace]
+    assert timestamps == sorted(timestamps)
+
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    assert {event["name"] for event in events if event["ph"] == "X"} >= {
+        "First.start start",
+        "Second.finish start",
+    }
+    spans = json.loads((tmp_path / "trace.otlp.json").read_text())["resourceSpans"][0][
+        "scopeSpans"
+    ][0]["spans"]
+    # the calls fetching the traces are traced as well
+    chain = [span for span in spans if span["name"] in ("First.start", "Second.finish")]
+    assert len(chain) == 2
+    assert len({span["traceId"] for span in chain}) == 1
+
+
+def test_workshop_traces_nothing_by_default():
+    workshop = Workshop()
+    workshop.register(First)
+    workshop.register(Second)
+    with workshop:
+        workshop.submit(First.start).result(timeout=10)
+        time.sleep(0.1)
+        assert workshop.traces() == []
@@ -0,0 +1,280 @@
+import time
+
+import pytest
+
+from flexplan import Message, Worker, Workshop
+
+
+class Echo(Worker):
+    def echo(self, value):
+        return value
+
+
+def test_workshop_idle_supervisor_does_not_spin():
+    workshop = Workshop()
+    workshop.register(Echo)
+    with workshop:
+        assert workshop.submit(Message(Echo.echo).params(1)).result(timeout=5) == 1
+        cpu_start = time.process_time()
+        time.sleep(0.3)
+        assert time.process_time() - cpu_start < 0.1
+        assert workshop.submit(Message(Echo.echo).params(2)).result(timeout=5) == 2
+
+
+class Unregistered(Worker):
+    def echo(self, value):
+        return value
+
+
+def test_workshop_unknown_worker():
+    from flexplan.errors import WorkerNotFoundError
+
+    workshop = Workshop()
+    workshop.register(Echo)
+    with workshop:
+        future = workshop.submit(Message(Unregistered.echo).params(1))
+        with pytest.raises(WorkerNotFoundError):
+            future.result(timeout=5)
+
+
+class Failing(Worker):
+    def fail(self, message):
+        raise KeyError(message)
+
+    def unpicklable(self):
+        import threading
+
+        return threading.Lock()
+
+
+@pytest.mark.parametrize("station", ["process", "shm"])
+def test_workshop_submit_to_process_station(station):
+    from flexplan.errors import WorkerRuntimeError
+
+    workshop = Workshop()
+    workshop.register(Echo, station=station)
+    workshop.register(Failing, station=station)
+    with workshop:
+        futures = [workshop.submit(Echo.echo, i) for i in range(100)]
+        assert [future.result(timeout=10) for future in futures] == list(range(100))
+        with pytest.raises(KeyError):
+            workshop.submit(Failing.fail, "message").result(timeout=10)
+        with pytest.raises(WorkerRuntimeError):
+            workshop.submit(Failing.unpicklable).result(timeout=10)
+
+
+def test_workshop_bulk_submission():
+    workshop = Workshop()
+    workshop.register(Echo, station="process")
+    workshop.register(Failing)
+    with workshop:
+        assert list(workshop.map(Echo.echo, range(100), chunksize=8)) == list(
+            range(100)
+        )
+        assert sorted(workshop.map(Echo.echo, range(10), ordered=False)) == list(
+            range(10)
+        )
+        futures = workshop.submit_many(
+            [
+                Message(Echo.echo).params(1),
+                Message(Failing.fail).params("message"),
+                Message(Echo.echo).params(2),
+            ]
+        )
+        assert futures[0].result(timeout=10) == 1
+        with pytest.raises(KeyError):
+            futures[1].result(timeout=10)
+        assert futures[2].result(timeout=10) == 2
+
+
+class Buffers(Worker):
+    def describe(self, data):
+        return type(data).__name__, len(data), bytes(data[:4])
+
+    def blob(self, size):
+        return bytes(size)
+
+
+@pytest.mark.parametrize("station", ["process", "shm"])
+def test_workshop_large_buffers_to_process_station(station):
+    workshop = Workshop()
+    workshop.register(Buffers, station=station)
+    size = 4 << 20
+    with workshop:
+        view = memoryview(bytearray(b"abcd" * (size // 4)))
+        assert workshop.submit(Buffers.describe, view).result(timeout=10) == (
+            "memoryview",
+            size,
+            b"abcd",
+        )
+        assert workshop.submit(Buffers.describe, bytes(view)).result(timeout=10) == (
+            "bytes",
+            size,
+            b"abcd",
+        )
+        assert workshop.submit(Buffers.blob, size).result(timeout=10) == bytes(size)
+
+
+class Forwarder(Worker):
+    def forward(self, value):
+        future = Message(Echo.echo).params(value).submit()
+        return future.result(timeout=10), type(future).__name__
+
+
+@pytest.mark.parametrize(
+    "forwarder_station,echo_station",
+    [("process", "thread"), ("process", "process"), ("shm", "shm")],
+)
+def test_workshop_futures_of_process_workers(forwarder_station, echo_station):
+    workshop = Workshop()
+    workshop.register(Forwarder, station=forwarder_station)
+    workshop.register(Echo, station=echo_station)
+    with workshop:
+        futures = [workshop.submit(Forwarder.forward, i) for i in range(20)]
+        assert [f.result(timeout=20) for f in futures] == [
+            (i, "Future") for i in range(20)
+        ]
+
+
+@pytest.mark.parametrize("station", ["thread", "process"])
+def test_workshop_asubmit(station):
+    import asyncio
+
+    workshop = Workshop()
+    workshop.register(Echo, station=station)
+    workshop.register(Failing)
+
+    async def main():
+        results = await asyncio.gather(
+            *(workshop.asubmit(Echo.echo, i) for i in range(2000))
+        )
+        assert results == list(range(2000))
+        assert await workshop.submit(Message(Echo.echo).params(1)) == 1
+        with pytest.raises(KeyError):
+            await workshop.asubmit(Failing.fail, "message")
+
+    with workshop:
+        asyncio.run(main())
+
+
+class Recorder(Worker):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def hold(self, seconds):
+        time.sleep(seconds)
+
+    def record(self, name):
+        self.calls.append(name)
+        return list(self.calls)
+
+
+@pytest.mark.parametrize("station", ["thread", "process"])
+def test_workshop_priority(station):
+    workshop = Workshop()
+    workshop.register(Recorder, station=station)
+    with workshop:
+        workshop.submit(Recorder.record, "warm up").result(timeout=10)
+        workshop.submit(Recorder.hold, 0.5)
+        time.sleep(0.1)
+        bulk = [
+            workshop.submit(Recorder.record, f"bulk {i}", priority=-1) for i in range(3)
+        ]
+        workshop.submit(Message(Recorder.record).params("control").priority(10))
+        workshop.submit(Recorder.record, "normal")
+        calls = bulk[-1].result(timeout=10)
+    assert calls == ["warm up", "control", "normal", "bulk 0", "bulk 1", "bulk 2"]
+
+
+@pytest.mark.parametrize("station", ["thread", "process"])
+def test_workshop_skips_abandoned_mails(station):
+    from flexplan.errors import DeadlineExceededError
+
+    workshop = Workshop()
+    workshop.register(Recorder, station=station)
+    with workshop:
+        workshop.submit(Recorder.record, "warm up").result(timeout=10)
+        workshop.submit(Recorder.hold, 0.5)
+        expired = workshop.submit(Recorder.record, "expired", timeout=0.1)
+        cancelled = workshop.submit(Recorder.record, "cancelled")
+        time.sleep(0.1)
+        assert cancelled.cancel()
+        calls = workshop.submit(Recorder.record, "kept").result(timeout=10)
+        with pytest.raises(DeadlineExceededError):
+            expired.result(timeout=10)
+    assert calls == ["warm up", "kept"]
+
+
+@pytest.mark.parametrize("station", ["thread", "process"])
+def test_workshop_submit_many_deadlines(station):
+    from flexplan.errors import DeadlineExceededError
+
+    workshop = Workshop()
+    workshop.register(Recorder, station=station)
+    with workshop:
+        workshop.submit(Recorder.record, "warm up").result(timeout=10)
+        futures = workshop.submit_many(
+            [
+                Message(Recorder.record).params("expired").deadline(time.time()),
+                Message(Recorder.record).params("also expired").timeout(0),
+            ]
+        )
+        for future in futures:
+            with pytest.raises(DeadlineExceededError):
+                future.result(timeout=10)
+        workshop.submit(Recorder.hold, 0.3)
+        futures = workshop.submit_many(
+            [
+                Message(Recorder.record).params("late").timeout(0.1),
+                Message(Recorder.record).params("kept").timeout(10),
+            ]
+        )
+        with pytest.raises(DeadlineExceededError):
+            futures[0].result(timeout=10)
+        calls = futures[1].result(timeout=10)
+    assert calls == ["warm up", "kept"]
+
+
+def test_workshop_cancelled_batch():
+    workshop = Workshop()
+    workshop.register(Recorder)
+    with workshop:
+        workshop.submit(Recorder.hold, 0.3)
+        kept = workshop.submit_many(
+            [Message(Recorder.record).params(f"kept {i}") for i in range(3)]
+        )
+        dropped = workshop.submit_many(
+            [Message(Recorder.record).params(f"dropped {i}") for i in range(3)]
+        )
+        assert kept[0].cancel() and kept[1].cancel()
+        assert all(future.cancel() for future in dropped)
+        calls = workshop.submit(Recorder.record, "last").result(timeout=10)
+        assert kept[2].result(timeout=10)[-1] == "kept 2"
+    # calls of a batch run together, unless all of them are cancelled
+    assert calls == ["kept 0", "kept 1", "kept 2", "last"]
+
+
+class Slow(Worker):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def work(self, value):
+        self.calls += 1
+        time.sleep(0.05)
+        return value
+
+    def count(self):
+        return self.calls
+
+
+@pytest.mark.parametrize("station", ["thread", "process"])
+def test_workshop_abandoned_map_stops(station):
+    workshop = Workshop()
+    workshop.register(Slow, station=station)
+    with workshop:
+        results = workshop.map(Slow.work, range(40), chunksize=2)
+        assert next(results) == 0
+        results.close()
+        assert workshop.submit(Slow.count).result(timeout=10) < 10
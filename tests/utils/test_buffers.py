@@ -0,0 +1,43 @@
+import pickle
+from multiprocessing.shared_memory import SharedMemory
+
+import pytest
+
+from flexplan.messages.mail import Mail
+from flexplan.messages.message import Message
+from flexplan.utils import buffers
+
+
+def echo(value):
+    return value
+
+
+def test_buffers_small_objects_stay_in_band():
+    data = buffers.dumps({"key": b"value"})
+    assert pickle.loads(data) == {"key": b"value"}
+    assert buffers.loads(data) == {"key": b"value"}
+
+
+@pytest.mark.skipif(not buffers.OOB_SUPPORTED, reason="no out-of-band support")
+def test_buffers_large_objects_go_out_of_band():
+    blob = bytes(range(256)) * 1024
+    view = memoryview(bytearray(blob))
+    mail = Mail.new(message=Message(echo).params(blob, view, array=bytearray(blob)))
+    data = buffers.dumps(mail, threshold=1024)
+    assert len(data) < 1024
+
+    loaded = buffers.loads(data)
+    loaded_blob, loaded_view = loaded.args
+    assert type(loaded_blob) is bytes and loaded_blob == blob
+    assert type(loaded.kwargs["array"]) is bytearray
+    assert loaded.kwargs["array"] == blob
+    # a writable view straight over shared memory
+    assert type(loaded_view) is memoryview and not loaded_view.readonly
+    assert loaded_view == view
+    loaded_view[0] = 255
+    assert loaded_view[0] == 255
+
+    # the receiver has unlinked the segment already
+    header = memoryview(data)[5 : 5 + int.from_bytes(data[1:5], "little")]
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=pickle.loads(header)[0])
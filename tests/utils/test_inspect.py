@@ -0,0 +1,41 @@
+from functools import partial, wraps
+
+from flexplan.utils.inspect import get_method_class
+
+
+def decorate(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        return fn(*args, **kwargs)
+
+    return wrapper
+
+
+class A:
+    def method(self): ...
+
+    @decorate
+    def wrapped(self): ...
+
+    @classmethod
+    def create(cls): ...
+
+
+class B(A):
+    @classmethod
+    def create(cls): ...
+
+
+def plain(): ...
+
+
+def test_get_method_class_is_stable_when_cached():
+    b = B()
+    for _ in range(2):
+        assert get_method_class(A.method) is A
+        assert get_method_class(b.method) is A
+        assert get_method_class(partial(A.method, b)) is A
+        assert get_method_class(A.wrapped) is A
+        assert get_method_class(A.create) is A
+        assert get_method_class(B.create) is B
+        assert get_method_class(plain) is None
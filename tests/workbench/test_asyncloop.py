@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+import pytest
+
+from flexplan import Message, Worker, Workshop
+from flexplan.datastructures.instancecreator import InstanceCreator
+from flexplan.errors import InboxFullError
+from flexplan.workbench.asyncloop import AsyncLoopWorkbench
+
+
+class Echo(Worker):
+    def echo(self, value):
+        return value
+
+
+class Sleeper(Worker):
+    def __init__(self):
+        super().__init__()
+        self.running = 0
+        self.peak = 0
+
+    async def sleep(self, value):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(0.2)
+        self.running -= 1
+        return value
+
+    def get_peak(self):
+        return self.peak
+
+    async def nap(self, value):
+        await asyncio.sleep(0.05)
+        return value
+
+    async def forward(self, value):
+        return await Message(Echo.echo).params(value).asubmit()
+
+
+@pytest.mark.parametrize("station", ["thread", "process"])
+def test_async_loop_workbench(station):
+    workshop = Workshop()
+    workshop.register(Sleeper, station=station, workbench="asyncloop")
+    workshop.register(Echo)
+    with workshop:
+        start = time.perf_counter()
+        futures = [workshop.submit(Sleeper.sleep, i) for i in range(500)]
+        assert [f.result(timeout=10) for f in futures] == list(range(500))
+        assert time.perf_counter() - start < 2
+        assert workshop.submit(Sleeper.get_peak).result(timeout=10) > 100
+        futures = [workshop.submit(Sleeper.forward, i) for i in range(20)]
+        assert [f.result(timeout=10) for f in futures] == list(range(20))
+
+
+def test_async_loop_workbench_concurrency_limit():
+    workshop = Workshop()
+    workshop.register(
+        Sleeper,
+        workbench=InstanceCreator(AsyncLoopWorkbench).bind(max_concurrency=5),
+    )
+    with workshop:
+        futures = [workshop.submit(Sleeper.sleep, i) for i in range(20)]
+        assert [f.result(timeout=10) for f in futures] == list(range(20))
+        assert workshop.submit(Sleeper.get_peak).result(timeout=10) == 5
+
+
+def test_async_loop_workbench_inbox_limit():
+    workshop = Workshop()
+    worker_id = workshop.register(
+        Sleeper,
+        workbench=InstanceCreator(AsyncLoopWorkbench).bind(max_concurrency=1),
+        max_inbox=2,
+        overflow="fail",
+    )
+    with workshop:
+        futures = []
+        depths = []
+        for i in range(40):
+            futures.append(workshop.submit(Sleeper.nap, i))
+            depths.append(workshop.inbox_depths()[worker_id][0])
+            time.sleep(0.005)
+        # mails waiting for a slot stay in the inbox and count towards its limit
+        assert max(depths) == 2
+        failed = 0
+        for i, future in enumerate(futures):
+            try:
+                assert future.result(timeout=10) == i
+            except InboxFullError:
+                failed += 1
+        assert failed > 20
@@ -0,0 +1,62 @@
+import gc
+import weakref
+from queue import Queue
+
+from flexplan.workers.base import Worker
+
+
+class Counter(Worker):
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def add(self, value: int) -> int:
+        self.count += value
+        return self.count
+
+    def get(self) -> int:
+        return self.count
+
+
+def test_workbench_context_dispatch():
+    from flexplan.datastructures.future import Future
+    from flexplan.messages.mail import ContactInfo, Mail, MailMeta
+    from flexplan.stations.base import StationSpec
+    from flexplan.utils.inspect import get_public_methods
+    from flexplan.workbench.base import WorkbenchContext
+
+    worker = Counter()
+    context = WorkbenchContext(
+        station_spec=StationSpec(use_process_future=False),
+        worker=worker,
+        outbox=Queue(),
+    )
+    meta = MailMeta(sender=ContactInfo(), receivers=[])
+    assert context.handle(Mail(Counter.add, args=(2,), meta=meta)) == 2
+
+    method_id = [name for name, _ in get_public_methods(Counter)].index("add")
+    assert context.handle(Mail(method_id, args=(3,), meta=meta)) == 5
+    assert worker.count == 5
+
+    future: Future = Future()
+    context.handle(Mail(Worker.on, meta=meta, future=future))
+    assert isinstance(future.exception(), ValueError)
+
+
+def test_workbench_context_holds_worker_weakly():
+    from flexplan.messages.mail import UNTRACED, Mail
+    from flexplan.stations.base import StationSpec
+    from flexplan.workbench.base import WorkbenchContext
+
+    worker = Counter()
+    context = WorkbenchContext(
+        station_spec=StationSpec(use_process_future=False),
+        worker=worker,
+        outbox=Queue(),
+    )
+    assert context.handle(Mail(Counter.add, args=(2,), meta=UNTRACED)) == 2
+    assert context.lookup(Counter.get)() == 2
+    worker_ref = weakref.ref(worker)
+    del worker
+    gc.collect()
+    assert worker_ref() is None
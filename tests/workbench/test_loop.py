@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pytest
+
+from flexplan import Worker, Workshop
+from flexplan.datastructures.instancecreator import InstanceCreator
+from flexplan.workbench.loop import ConcurrentLoopWorkbench, serialized
+
+
+class Blocking(Worker):
+    def __init__(self):
+        super().__init__()
+        self.log = []
+        self.running = 0
+        self.overlapped = False
+        self.lock = threading.Lock()
+
+    def wait(self, value):
+        time.sleep(0.1)
+        return value
+
+    @serialized
+    def append(self, value):
+        with self.lock:
+            self.running += 1
+            self.overlapped |= self.running > 1
+        time.sleep(0.001)
+        self.log.append(value)
+        with self.lock:
+            self.running -= 1
+
+    def get_log(self):
+        return self.log, self.overlapped
+
+
+@pytest.mark.parametrize("station", ["thread", "process"])
+def test_concurrent_loop_workbench(station):
+    workshop = Workshop()
+    workshop.register(
+        Blocking,
+        station=station,
+        workbench=InstanceCreator(ConcurrentLoopWorkbench).bind(max_workers=8),
+    )
+    with workshop:
+        start = time.perf_counter()
+        futures = [workshop.submit(Blocking.wait, i) for i in range(40)]
+        assert [f.result(timeout=10) for f in futures] == list(range(40))
+        assert time.perf_counter() - start < 2
+
+        futures = [workshop.submit(Blocking.append, i) for i in range(200)]
+        for future in futures:
+            future.result(timeout=10)
+        assert workshop.submit(Blocking.get_log).result(timeout=10) == (
+            list(range(200)),
+            False,
+        )